@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon ベンチマーク
+
+決まった乱数の種から1k〜1M件のタスクを生成し、読み込み・絞り込みと並び替え・描画・保存・
+タグ抽出の各段階の処理時間を別々に測ってJSONで出力する。
+読み込んだタスクが使うメモリ量も、辞書で持つ場合とタスクレコードで持つ場合とで比べる。
+起動は、アプリを作り始めてから最初の行を描画するまで（time_to_first_paint）と読み込みを終えるまで
+（startup）を、スナップショットのキャッシュがない場合（cold）とある場合（warm）とで測る。
+Tkの部分は test_taskcon.py のモック（tkcalendar / tkinterdnd2）を使って動かし、
+ディスプレイがなければ仮想Xサーバー（Xvfb）を起動する。
+
+使い方:
+    python bench_taskcon.py --sizes 1000 10000 100000 --output bench.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 0
+BASE_DATE = date(2025, 1, 1)  # 期限日を決める基準日（実行日によって生成データが変わらないよう固定）
+XVFB_DISPLAY = ":99"
+XVFB_START_TIMEOUT = 5.0  # Xvfb の起動を待つ時間（秒）
+STARTUP_POLL_INTERVAL = 0.001  # 起動の計測でイベントを処理する間隔（秒）
+
+# --- 生成するタスクの材料 ---
+NAME_SUBJECTS = ["週次レポート", "見積書", "議事録", "請求書", "企画書", "データ移行", "ログイン画面", "テスト計画",
+                 "採用面接", "予算案", "リリースノート", "バックアップ", "サーバー設定", "マニュアル", "アンケート",
+                 "発注書", "契約書", "プレゼン資料", "問い合わせ", "ミーティング", "経費精算", "在庫表", "障害報告",
+                 "デザイン案", "研修資料"]
+NAME_ACTIONS = ["作成", "確認", "修正", "提出", "レビュー", "準備", "共有", "更新", "整理", "送付", "調査", "対応"]
+NAME_CLIENTS = ["A社", "B社", "C社", "営業部", "開発チーム", "経理", "総務", "本社"]
+# 先頭ほどよく使われるタグ（出現頻度は順位に反比例）
+TAG_POOL = ["仕事", "急ぎ", "会議", "家", "買い物", "経理", "開発", "レビュー待ち", "電話", "メール", "資料",
+            "週次", "月次", "外出", "健康", "勉強", "読書", "旅行", "家族", "趣味", "定例", "顧客", "採用", "契約",
+            "保守", "改善", "調査", "障害", "リリース", "その他"]
+TAG_WEIGHTS = [1.0 / (rank + 1) for rank in range(len(TAG_POOL))]
+TAG_COUNT_WEIGHTS = [30, 40, 20, 10]  # タグ0〜3個のタスクの割合
+PRIORITY_WEIGHTS = {"高": 20, "中": 50, "低": 30}
+COMPLETED_RATIO = 0.3
+TODAY_RATIO = 0.1
+DUE_DATE_RATIO = 0.6
+DUE_DATE_RANGE = (-30, 90)  # 基準日からの日数
+
+# 絞り込みと並び替えを測る条件（タブ, 並び替え, 検索語）
+FILTER_CASES = [
+    ("一覧", "追加順", ""),
+    ("一覧", "期限順", ""),
+    ("一覧", "優先度順", ""),
+    ("一覧", "タグ順", ""),
+    ("一覧", "追加順", "レポート"),
+    ("一覧", "期限順", "りりーす 作成"),
+    ("今日", "追加順", ""),
+    ("完了", "期限順", ""),
+    # 検索欄の条件（タグ・期限日の範囲・優先度）はクエリのプランナーが索引を選ぶ
+    ("一覧", "期限順", "タグ:契約"),
+    ("一覧", "追加順", f"期限:{BASE_DATE}..{BASE_DATE + timedelta(days=6)}"),
+    ("一覧", "優先度順", "優先度:高 タグ:仕事"),
+]
+
+
+def generate_tasks(count, seed=DEFAULT_SEED, base_date=BASE_DATE):
+    """同じ引数なら常に同じ内容になるタスクのリストを生成する"""
+    rng = random.Random(seed)
+    priorities = list(PRIORITY_WEIGHTS)
+    priority_weights = list(PRIORITY_WEIGHTS.values())
+    tasks = []
+    for _ in range(count):
+        name = rng.choice(NAME_SUBJECTS) + "の" + rng.choice(NAME_ACTIONS)
+        if rng.random() < 0.4:
+            name = rng.choice(NAME_CLIENTS) + " " + name
+        if rng.random() < 0.2:
+            name += f"（第{rng.randint(1, 12)}版）"
+        tag_count = rng.choices(range(len(TAG_COUNT_WEIGHTS)), weights=TAG_COUNT_WEIGHTS)[0]
+        tags = []
+        while len(tags) < tag_count:
+            tag = rng.choices(TAG_POOL, weights=TAG_WEIGHTS)[0]
+            if tag not in tags:
+                tags.append(tag)
+        due_date = ""
+        if rng.random() < DUE_DATE_RATIO:
+            due_date = (base_date + timedelta(days=rng.randint(*DUE_DATE_RANGE))).strftime("%Y-%m-%d")
+        tasks.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "name": name,
+            "status": "完了" if rng.random() < COMPLETED_RATIO else "未着手",
+            "priority": rng.choices(priorities, weights=priority_weights)[0],
+            "due_date": due_date,
+            "tags": ",".join(tags),
+            "today": "〇" if rng.random() < TODAY_RATIO else "",
+        })
+    return tasks
+
+
+def start_virtual_display(display=XVFB_DISPLAY):
+    """
+    ディスプレイがなければ Xvfb を起動して DISPLAY を設定する
+
+    起動したプロセスを返す（ディスプレイがあるか、Linux以外ならNone）。
+    Xvfb がないか起動できなければ RuntimeError。
+    """
+    if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise RuntimeError("ディスプレイがなく、Xvfb も見つかりません")
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':')}"
+    deadline = time.monotonic() + XVFB_START_TIMEOUT
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"Xvfb を起動できませんでした（{display}）")
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def _timed(func, repeat, prepare=None):
+    """func の処理時間（秒）を repeat 回測ったリストを返す（prepare は毎回の準備で、時間に含めない）"""
+    seconds = []
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def _result(stage, size, seconds, case=None):
+    result = {
+        "stage": stage,
+        "size": size,
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+    }
+    if case is not None:
+        result["case"] = case
+    return result
+
+
+def _traced_bytes(build):
+    """build() が返したものが保持しているメモリ量（バイト）を測る"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        built = build()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del built
+    return used
+
+
+def measure_task_memory(tasks):
+    """tasks をCSVに保存して読み直したときのメモリ量を、辞書とタスクレコードで比べた結果を返す"""
+    from storage import CSV_HEADERS, read_tasks_csv, write_tasks_csv
+
+    folder = tempfile.mkdtemp(prefix="taskcon_bench_")
+    try:
+        path = os.path.join(folder, "tasks.csv")
+        write_tasks_csv(path, tasks)
+
+        def read_dicts():
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                return [{key: row[key] for key in CSV_HEADERS} for row in csv.DictReader(f)]
+
+        results = []
+        for record, build in (("dict", read_dicts), ("TaskRecord", lambda: read_tasks_csv(path))):
+            used = _traced_bytes(build)
+            results.append({
+                "stage": "task_memory",
+                "size": len(tasks),
+                "case": {"record": record},
+                "bytes": used,
+                "bytes_per_task": used / max(1, len(tasks)),
+            })
+        return results
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def measure_startup(tasks, repeat, storage_backend="csv"):
+    """tasks を保存したデータフォルダでアプリを起動し、最初の描画と読み込み完了までの時間を測る"""
+    # test_taskcon を読み込むと tkcalendar / tkinterdnd2 がモックに置き換わる
+    import test_taskcon
+    import main
+    from snapshot_cache import SNAPSHOT_FILE_NAME
+
+    folder = tempfile.mkdtemp(prefix="taskcon_bench_")
+    try:
+        main.save_settings(folder, {"storage_backend": storage_backend})
+        storage = main.create_storage(storage_backend, folder)
+        storage.save(tasks)
+        storage.close()
+        results = []
+        for cache in ("cold", "warm"):
+            def prepare():
+                if cache == "cold" and os.path.exists(os.path.join(folder, SNAPSHOT_FILE_NAME)):
+                    os.remove(os.path.join(folder, SNAPSHOT_FILE_NAME))
+
+            first_paint, startup = [], []
+            for _ in range(repeat):
+                prepare()
+                painted, loaded = _start_app(test_taskcon.tk, main, folder)
+                first_paint.append(painted)
+                startup.append(loaded)
+            results.append(_result("time_to_first_paint", len(tasks), first_paint, {"cache": cache}))
+            results.append(_result("startup", len(tasks), startup, {"cache": cache}))
+        return results
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def _start_app(tk, main, folder):
+    """アプリを作ってイベントを処理し、(最初の行を描画するまでの秒数, 読み込みを終えるまでの秒数) を返す"""
+    root = tk.Tk()
+    root.withdraw()
+    start = time.perf_counter()
+    with patch.object(main, "DEFAULT_DATA_FOLDER", folder):
+        app = main.TaskApp(root)
+    painted = None
+    try:
+        while True:
+            root.update()
+            now = time.perf_counter() - start
+            if painted is None and any(tree.get_children() for tree in (app.task_tree, app.today_tree,
+                                                                         app.completed_tree)):
+                painted = now
+            if not app.loading:
+                return (now if painted is None else painted), now
+            time.sleep(STARTUP_POLL_INTERVAL)
+    finally:
+        app.writer.close()
+        app.watcher.close()
+        app.storage.close()
+        root.destroy()
+
+
+class AppBenchmark:
+    """
+    テスト用のモックで作った TaskApp で各段階の処理時間を測るクラス
+
+    データフォルダは一時フォルダに作り、close() で削除する。
+    各段階はほかの段階の処理を含まないよう、描画などを止めて測る。
+    """
+
+    def __init__(self, storage_backend="csv"):
+        # test_taskcon を読み込むと tkcalendar / tkinterdnd2 がモックに置き換わる
+        import test_taskcon
+        import main
+        self.main = main
+        self.data_folder = tempfile.mkdtemp(prefix="taskcon_bench_")
+        main.save_settings(self.data_folder, {"storage_backend": storage_backend})
+        self.root = test_taskcon.tk.Tk()
+        self.root.withdraw()
+        with patch.object(main, "DEFAULT_DATA_FOLDER", self.data_folder):
+            self.app = main.TaskApp(self.root)
+
+    def close(self):
+        """アプリを終了して一時フォルダを削除する"""
+        self.app.writer.close()
+        self.app.watcher.close()
+        self.app.storage.close()
+        self.root.destroy()
+        shutil.rmtree(self.data_folder, ignore_errors=True)
+
+    def run(self, tasks, repeat):
+        """tasks を保存したデータで各段階を測り、結果のリストを返す"""
+        app = self.app
+        size = len(tasks)
+        app.storage.save(tasks)
+        results = []
+
+        # 読み込み（読み込み後の表示は描画の段階で測る）
+        with patch.object(self.main, "BACKGROUND_LOAD_THRESHOLD", float("inf")), \
+                patch.object(app, "apply_filters_and_sort"), patch.object(app, "_populate_listbox"):
+            results.append(_result("load_tasks", size, _timed(app.load_tasks, repeat)))
+
+        # 絞り込みと並び替え（キャッシュを使わない1回分の計算）
+        def clear_caches():
+            app._search_cache = None
+            app._tab_cache.clear()
+
+        with patch.object(app, "_populate_listbox"):
+            # 全文検索インデックスは最初の検索で作られるので、先に作っておく
+            app.store.search("")
+            for tab, sort, query in FILTER_CASES:
+                app.sort_var.set(sort)
+                app.search_entry.delete(0, "end")
+                app.search_entry.insert(0, query)
+                seconds = _timed(lambda: app.apply_filters_and_sort(tab=tab), repeat, clear_caches)
+                case = {"tab": tab, "sort": sort, "query": query}
+                results.append(_result("apply_filters_and_sort", size, seconds, case))
+            app.sort_var.set("追加順")
+            app.search_entry.delete(0, "end")
+            for tab in self.main.VIEW_TABS:
+                app.apply_filters_and_sort(tab=tab)
+
+        # 描画（空の表示からすべてのタブの行を作る）
+        def clear_views():
+            for view in (app.task_view, app.completed_view, app.today_view):
+                view.set_rows([])
+
+        results.append(_result("_populate_listbox", size, _timed(app._populate_listbox, repeat, clear_views)))
+
+        # タグ抽出（タグリストが空の状態から）
+        def clear_tags():
+            app.tags = []
+
+        results.append(_result("extract_tags_from_tasks", size,
+                               _timed(app.extract_tags_from_tasks, repeat, clear_tags)))
+
+        # 保存（書き込み待ちの変更を書き終えてから測る）
+        results.append(_result("save_tasks", size, _timed(app.save_tasks, repeat, app.writer.flush)))
+        return results
+
+
+def run_benchmarks(sizes, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, storage_backend="csv", base_date=BASE_DATE):
+    """各件数でベンチマークを実行し、結果のリストを返す"""
+    results = []
+    for size in sizes:
+        tasks = generate_tasks(size, seed, base_date)
+        results.extend(measure_task_memory(tasks))
+        results.extend(measure_startup(tasks, repeat, storage_backend))
+        bench = AppBenchmark(storage_backend)
+        try:
+            results.extend(bench.run(tasks, repeat))
+        finally:
+            bench.close()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="taskcon の各処理の時間を測ってJSONで出力する")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="タスク数（複数指定可）")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="各段階を測る回数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="タスク生成の乱数の種")
+    parser.add_argument("--base-date", type=date.fromisoformat, default=BASE_DATE,
+                        help="期限日の基準日（YYYY-MM-DD）")
+    parser.add_argument("--storage", choices=["csv", "journal", "sqlite"], default="csv", help="保存形式")
+    parser.add_argument("--label", default="", help="結果に記録する名前（リリース名など）")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル（省略時は標準出力）")
+    parser.add_argument("--no-xvfb", action="store_true", help="ディスプレイがなくても Xvfb を起動しない")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    xvfb = None if args.no_xvfb else start_virtual_display()
+    try:
+        results = run_benchmarks(args.sizes, args.repeat, args.seed, args.storage, args.base_date)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    report = {
+        "label": args.label,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage": args.storage,
+        "seed": args.seed,
+        "base_date": args.base_date.isoformat(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for result in results:
+        case = result.get("case")
+        if "bytes" in result:
+            label = f"{result['stage']} {case['record']}"
+            print(f"{result['size']:>8} {label:<48} {result['bytes_per_task']:10.1f} B/task", file=sys.stderr)
+            continue
+        if case and "tab" in case:
+            label = f"{result['stage']} {case['tab']}/{case['sort']}/{case['query'] or '-'}"
+        else:
+            label = result["stage"] + "".join(f" {value}" for value in (case or {}).values())
+        print(f"{result['size']:>8} {label:<48} {result['median'] * 1000:10.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
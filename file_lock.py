@@ -0,0 +1,97 @@
+"""
+taskcon データフォルダのロック
+
+複数のインスタンスが同じデータフォルダを使うとき、タスクファイルの読み書きを
+ロックファイル（tasks.lock）への勧告ロックで1つずつに限る。
+POSIXでは fcntl.flock、Windowsでは msvcrt.locking を使う。
+ロックを取れるまで少しずつ待ち、LOCK_TIMEOUT 秒たっても取れなければ TimeoutError にする。
+"""
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_FILE_NAME = "tasks.lock"
+LOCK_TIMEOUT = 10.0  # ロックを待つ最大の秒数
+LOCK_RETRY_INTERVAL = 0.05  # ロックを取り直すまでの秒数
+
+
+class FileLock:
+    """
+    ロックファイルへの排他ロック（with 文で使う）
+
+    同じインスタンスの中ではスレッドのロックも兼ね、同じスレッドなら入れ子にできる。
+    ファイルのロックは最も外側の with 文で取り、抜けるときに外す。
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"データフォルダのロックを取得できません: {self.path}")
+        if self._depth == 0:
+            try:
+                self._file = self._acquire_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            file, self._file = self._file, None
+            try:
+                _unlock(file)
+            finally:
+                file.close()
+                self._thread_lock.release()
+        else:
+            self._thread_lock.release()
+        return False
+
+    def _acquire_file(self):
+        """ロックファイルを開いてロックを取る（取れるまで待つ）"""
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        file = open(self.path, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _try_lock(file)
+                return file
+            except OSError:
+                if time.monotonic() >= deadline:
+                    file.close()
+                    raise TimeoutError(f"データフォルダが他のインスタンスにロックされています: {self.path}")
+                time.sleep(LOCK_RETRY_INTERVAL)
+
+
+def _try_lock(file):
+    """ファイルのロックを待たずに取る（取れなければ OSError）"""
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,136 @@
+"""
+taskcon ファイル監視
+
+データフォルダのファイルが外部で変更されたことを検知する。
+Linuxでは inotify でフォルダの変更通知を受け、通知のあったファイルだけを調べる。
+inotify が使えない環境では、毎回すべてのファイルの更新時刻とサイズを比べる。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+
+WATCH_INTERVAL_MS = 1000  # 外部の変更を確認する間隔（ミリ秒）
+
+# inotify のイベント（ファイルは一時ファイルからの置き換えで更新されるため、移動と作成も見る）
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def file_signature(path):
+    """ファイルの (更新時刻, サイズ)（なければNone）"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class _Inotify:
+    """inotify のフォルダ監視（使えなければ open が None を返す）"""
+
+    def __init__(self, fd, libc):
+        self.fd = fd
+        self._libc = libc
+
+    @classmethod
+    def open(cls, folders):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        for folder in folders:
+            if libc.inotify_add_watch(fd, os.fsencode(folder), _WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+        return cls(fd, libc)
+
+    def read_names(self):
+        """届いているイベントのファイル名の集合を返す（取りこぼしがあればNone）"""
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            except OSError:
+                return None
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.add(os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """
+    ファイルの外部変更を検知するクラス
+
+    poll() は前回確認したときから更新時刻かサイズが変わったファイルの集合を返す。
+    自分で書き込んだファイルは acknowledge() で現在の状態を既知にしておくと変更として扱わない。
+    acknowledge() は書き込みスレッドからも呼べる。
+    """
+
+    def __init__(self, paths):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self._lock = threading.Lock()
+        self._known = {path: file_signature(path) for path in self.paths}
+        folders = sorted({os.path.dirname(path) for path in self.paths})
+        self._inotify = _Inotify.open(folders)
+
+    @property
+    def uses_inotify(self):
+        """inotify で監視しているか（Falseなら更新時刻とサイズの比較）"""
+        return self._inotify is not None
+
+    def poll(self):
+        """前回から外部で変更されたファイルの集合を返す"""
+        candidates = self.paths
+        if self._inotify is not None:
+            names = self._inotify.read_names()
+            if names is not None:
+                candidates = [path for path in self.paths if os.path.basename(path) in names]
+        changed = set()
+        with self._lock:
+            for path in candidates:
+                signature = file_signature(path)
+                if signature != self._known[path]:
+                    self._known[path] = signature
+                    changed.add(path)
+        return changed
+
+    def acknowledge(self, paths=None):
+        """ファイルの現在の状態を既知にする（自分で書き込んだ変更を無視するため）"""
+        with self._lock:
+            for path in (self.paths if paths is None else paths):
+                path = os.path.abspath(path)
+                if path in self._known:
+                    self._known[path] = file_signature(path)
+
+    def close(self):
+        """監視を終了する"""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
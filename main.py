@@ -1,20 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from tkcalendar import DateEntry
-from tkinterdnd2 import DND_FILES, TkinterDnD
-import csv
 import os
-import uuid
+import sqlite3
+import time
 from datetime import datetime
+from storage import CSV_HEADERS, DEFAULT_STORAGE_BACKEND, create_storage, load_settings, save_settings
+from file_watcher import WATCH_INTERVAL_MS, FileWatcher
+from perf_monitor import PERF_LOG_ENV, PERF_LOG_FILE_NAME, PERF_SETTING, PerfMonitor, perf_enabled, timed
+from search_index import normalize_text, parse_query
+from selection_model import SelectionModel
+from task_archive import ARCHIVE_SETTING, archive_after_days
+from task_import import TaskImporter
+from task_loader import BackgroundLoader
+from task_model import (DEFAULT_DATA_FOLDER, PRIORITY_LEVELS, SORT_OPTIONS, STATUS_OPTIONS, TODAY_OPTIONS, VIEW_TABS,
+                        TaskModel, format_due_date)
+from task_query import TextMatches, split_search
+from write_queue import WriteBehindQueue
+from virtual_tree import VirtualTreeview
 
 # --- 定数定義 ---
-DEFAULT_DATA_FOLDER = "taskcon_data"
-DEFAULT_DATA_FILE = os.path.join(DEFAULT_DATA_FOLDER, "tasks.csv")
-DEFAULT_TAGS_FILE = os.path.join(DEFAULT_DATA_FOLDER, "tags.txt")  # タグを保存するファイル
 WINDOW_TITLE = "taskcon"
 WINDOW_GEOMETRY = "700x650"
-# CSVヘッダーに新しい項目を追加
-CSV_HEADERS = ["id", "name", "status", "priority", "due_date", "tags", "today"]
 
 # --- デザイン/文言定義 ---
 FONT_FAMILY = "Yu Gothic UI"
@@ -22,10 +28,22 @@ FONT_FAMILY = "Yu Gothic UI"
 FONT_SIZE_NORMAL = 11
 FONT_SIZE_LARGE = 14
 MONOSPACE_FONT = "Consolas"  # 固定幅フォント
-PRIORITY_LEVELS = ["高", "中", "低"]
-STATUS_OPTIONS = ["すべて", "未着手", "完了"]
-SORT_OPTIONS = ["追加順", "期限順", "優先度順", "タグ順"]
-TODAY_OPTIONS = ["〇", ""]
+# 保存形式の表示名とバックエンド名
+STORAGE_BACKEND_LABELS = {"ジャーナル": "journal", "CSV": "csv", "SQLite": "sqlite"}
+SEARCH_DEBOUNCE_MS = 150  # 検索入力が止まってから絞り込むまでの待ち時間（ミリ秒）
+SEARCH_CHUNK_SIZE = 5000  # 検索の絞り込みを1回のアイドル処理で進めるタスク数
+BACKGROUND_LOAD_THRESHOLD = 1024 * 1024  # データがこのバイト数以上ならバックグラウンドで読み込む
+# スナップショットのキャッシュから読めるときは、データがこのバイト数以上のときだけバックグラウンドで読み込む
+CACHED_BACKGROUND_LOAD_THRESHOLD = 16 * 1024 * 1024
+LOAD_POLL_MS = 30  # 読み込み中にキューを確認する間隔（ミリ秒）
+LOAD_REFRESH_INTERVAL = 0.5  # 読み込み中に表示を更新する間隔（秒）
+LOAD_MAX_BATCHES_PER_POLL = 20  # 1回の確認で取り込むバッチ数の上限（GUIを止めないため）
+IMPORT_COMMIT_BUDGET = 0.05  # ファイルの取り込みで1回の確認に使う時間の目安（秒）
+OVERDUE_CHECK_MAX_MS = 60 * 60 * 1000  # 期限切れの確認を待つ最長の時間（スリープや時計の変更に備える）
+# ステータスバーに処理時間を表示する段階と表示名
+PERF_STATUS_STAGES = {"load_tasks": "読込", "background_load": "読込(裏)", "apply_filters_and_sort": "絞込",
+                      "_populate_listbox": "描画", "save_tasks": "保存", "save_tags": "タグ保存",
+                      "sync_tags": "タグ整理"}
 
 COLOR_BG = "#f0f0f0"
 COLOR_FRAME_BG = "#ffffff"
@@ -37,14 +55,21 @@ COLOR_INCOMPLETE = "black"
 class SettingsWindow:
     """設定ウィンドウクラス"""
     
-    def __init__(self, parent, data_folder):
+    def __init__(self, parent, data_folder, storage_backend=DEFAULT_STORAGE_BACKEND, perf_monitor=False,
+                 archive_after_days=0):
         self.parent = parent
         self.data_folder = data_folder
         self.result_data_folder = data_folder
+        self.storage_backend = storage_backend
+        self.result_storage_backend = storage_backend
+        self.perf_monitor = perf_monitor
+        self.result_perf_monitor = perf_monitor
+        self.archive_after_days = archive_after_days
+        self.result_archive_after_days = archive_after_days
         
         self.window = tk.Toplevel(parent)
         self.window.title("設定")
-        self.window.geometry("500x150")
+        self.window.geometry("500x270")
         self.window.resizable(False, False)
         self.window.transient(parent)
         self.window.grab_set()
@@ -54,8 +79,8 @@ class SettingsWindow:
         # ウィンドウを中央に配置
         self.window.update_idletasks()
         x = (self.window.winfo_screenwidth() // 2) - (500 // 2)
-        y = (self.window.winfo_screenheight() // 2) - (150 // 2)
-        self.window.geometry(f"500x150+{x}+{y}")
+        y = (self.window.winfo_screenheight() // 2) - (270 // 2)
+        self.window.geometry(f"500x270+{x}+{y}")
         
     def _create_widgets(self):
         """ウィジェットを作成"""
@@ -75,9 +100,28 @@ class SettingsWindow:
         
         ttk.Button(folder_frame, text="参照", command=self._browse_data_folder).grid(row=0, column=1)
         
+        # 保存形式設定
+        ttk.Label(main_frame, text="保存形式:", font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=2, column=0, sticky="w", pady=5)
+        backend_label = next((label for label, name in STORAGE_BACKEND_LABELS.items() if name == self.storage_backend),
+                             next(iter(STORAGE_BACKEND_LABELS)))
+        self.storage_backend_var = tk.StringVar(value=backend_label)
+        backend_combo = ttk.Combobox(main_frame, textvariable=self.storage_backend_var,
+                                     values=list(STORAGE_BACKEND_LABELS), state="readonly", width=12)
+        backend_combo.grid(row=2, column=1, sticky="w", pady=5)
+        
+        # 処理時間の計測（ステータスバーに表示し、データフォルダの perf.jsonl に記録する）
+        self.perf_monitor_var = tk.BooleanVar(value=self.perf_monitor)
+        ttk.Checkbutton(main_frame, text="処理時間を計測してステータスバーに表示する",
+                        variable=self.perf_monitor_var).grid(row=3, column=0, columnspan=2, sticky="w", pady=5)
+        
+        # 完了タスクのアーカイブ（0日ならアーカイブしない）
+        ttk.Label(main_frame, text="完了から何日後にアーカイブ:", font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=4, column=0, sticky="w", pady=5)
+        self.archive_days_var = tk.StringVar(value=str(self.archive_after_days))
+        ttk.Spinbox(main_frame, textvariable=self.archive_days_var, from_=0, to=3650, width=8).grid(row=4, column=1, sticky="w", pady=5)
+        
         # ボタンフレーム
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=2, column=0, columnspan=2, pady=20)
+        button_frame.grid(row=5, column=0, columnspan=2, pady=20)
         button_frame.columnconfigure([0, 1], weight=1)
         
         ttk.Button(button_frame, text="OK", command=self._ok_clicked).grid(row=0, column=0, padx=5)
@@ -96,6 +140,12 @@ class SettingsWindow:
     def _ok_clicked(self):
         """OKボタンクリック時の処理"""
         self.result_data_folder = self.data_folder_var.get()
+        self.result_storage_backend = STORAGE_BACKEND_LABELS.get(self.storage_backend_var.get(), self.storage_backend)
+        self.result_perf_monitor = self.perf_monitor_var.get()
+        try:
+            self.result_archive_after_days = max(0, int(self.archive_days_var.get()))
+        except ValueError:
+            self.result_archive_after_days = self.archive_after_days
         self.window.destroy()
         
     def _cancel_clicked(self):
@@ -108,6 +158,78 @@ class SettingsWindow:
         return self.result_data_folder
 
 
+class BulkEditWindow:
+    """チェックしたタスクをまとめて変更する項目を選ぶウィンドウクラス"""
+
+    # 項目 -> (ラベル, 選択肢（Noneなら自由入力）)
+    FIELDS = [
+        ("status", "状態:", STATUS_OPTIONS[1:]),
+        ("priority", "優先度:", PRIORITY_LEVELS),
+        ("due_date", "期限日:", None),
+        ("tags", "タグ:", None),
+        ("today", "今日やる:", TODAY_OPTIONS),
+    ]
+
+    def __init__(self, parent, count):
+        self.parent = parent
+        self.count = count
+        self.result_changes = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("一括変更")
+        self.window.resizable(False, False)
+        self.window.transient(parent)
+        self.window.grab_set()
+
+        self._create_widgets()
+
+    def _create_widgets(self):
+        """ウィジェットを作成"""
+        main_frame = ttk.Frame(self.window, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(main_frame, text=f"チェックした{self.count}個のタスクの、選んだ項目を変更します",
+                  font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=0, column=0, columnspan=3, sticky="w", pady=(0, 10))
+
+        self.enabled_vars = {}
+        self.value_vars = {}
+        for row, (field, label, options) in enumerate(self.FIELDS, start=1):
+            self.enabled_vars[field] = tk.BooleanVar(value=False)
+            ttk.Checkbutton(main_frame, variable=self.enabled_vars[field]).grid(row=row, column=0, sticky="w")
+            ttk.Label(main_frame, text=label, font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=row, column=1, sticky="w", pady=3)
+            if options is None:
+                self.value_vars[field] = tk.StringVar(value="")
+                widget = ttk.Entry(main_frame, textvariable=self.value_vars[field], width=30)
+            else:
+                self.value_vars[field] = tk.StringVar(value=options[0])
+                widget = ttk.Combobox(main_frame, textvariable=self.value_vars[field], values=options,
+                                      state="readonly", width=10)
+            widget.grid(row=row, column=2, sticky="w", pady=3)
+        ttk.Label(main_frame, text="期限日は YYYY-MM-DD（空欄で期限なし）、タグはカンマ区切りで置き換えます",
+                  font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=len(self.FIELDS) + 1, column=0, columnspan=3,
+                                                             sticky="w", pady=(5, 0))
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=len(self.FIELDS) + 2, column=0, columnspan=3, pady=(15, 0))
+        ttk.Button(button_frame, text="OK", command=self._ok_clicked).grid(row=0, column=0, padx=5)
+        ttk.Button(button_frame, text="キャンセル", command=self._cancel_clicked).grid(row=0, column=1, padx=5)
+
+    def _ok_clicked(self):
+        """OKボタンクリック時の処理（チェックした項目だけを変更内容にする）"""
+        self.result_changes = {field: self.value_vars[field].get().strip()
+                               for field, _, _ in self.FIELDS if self.enabled_vars[field].get()}
+        self.window.destroy()
+
+    def _cancel_clicked(self):
+        """キャンセルボタンクリック時の処理"""
+        self.window.destroy()
+
+    def show(self):
+        """ウィンドウを表示し、変更内容（キャンセルならNone）を返す"""
+        self.window.wait_window()
+        return self.result_changes
+
+
 class TaskApp:
     """
     多機能タスク管理アプリケーションのメインクラス
@@ -115,21 +237,122 @@ class TaskApp:
 
     def __init__(self, root):
         self.root = root
-        self.tasks = []  # すべてのタスクのマスターリスト
         self.view_tasks = [] # 現在表示されているタスクのリスト
         self.view_completed_tasks = [] # 完了タスクのリスト
         self.view_today_tasks = [] # 今日やるタスクのリスト
-        self.tags = []  # 既存のタグリスト
-        
-        # データフォルダの設定
-        self.data_folder = DEFAULT_DATA_FOLDER
-        self.data_file = DEFAULT_DATA_FILE
-        self.tags_file = DEFAULT_TAGS_FILE
+        self.last_refresh_tk_calls = 0 # 直近の表示更新で発行したTk呼び出し回数
+        self._search_after_id = None  # 遅延実行を待っている検索のafter ID
+        self._search_query = None  # 直近の絞り込みに使った検索語（入力のまま）
+        self._search_generation = 0  # 絞り込みの世代番号（古い絞り込みの打ち切りに使う）
+        self._search_cache = None  # (条件, 検索語, 結果) 直前の絞り込み結果
+        self._tab_cache = {}  # タブ名 -> (キャッシュキー, 表示中のタスクのリスト)
+        self._loader = None  # バックグラウンド読み込み中のローダー
+        self._load_refreshed_at = 0.0  # 読み込み中に最後に表示を更新した時刻
+        self._importer = None  # ドロップしたファイルを取り込み中の TaskImporter
+        self._import_loader = None  # 取り込み中のワーカースレッド
+        self._edit_buttons = []  # 読み込み中は無効にするボタン
+        self._overdue_after_id = None  # 次に期限切れになるタスクの色を変えるafter ID
+        self.selection = SelectionModel()  # チェックボックスでチェックされたタスクID（表示を作り直しても残す）
+        self._archive_tasks = []  # 完了タブに読み込んだアーカイブのタスク（新しい月から）
+        self._archive_months_loaded = 0  # 完了タブに読み込んだアーカイブの月の数
+        self._archive_version = 0  # 完了タブに表示するアーカイブのタスクの変更番号
+        self._archive_search = None  # (検索語のリスト, ローダー, 一致したタスク) アーカイブの検索
+        self._archive_after_id = None  # 続きのアーカイブの読み込みを待っているafter ID
+        
+        # タスクとタグの管理（変更の書き込みは書き込みキューに積む）
+        self.model = TaskModel(DEFAULT_DATA_FOLDER, record_changes=self.record_changes)
+        # 各段階の処理時間の計測（設定か環境変数で有効にしたときだけ測る）
+        self.perf = PerfMonitor(context=lambda: {"tasks": len(self.tasks)}, on_record=self._show_perf)
+        self._load_started_at = None  # バックグラウンド読み込みを始めた時刻（計測用）
+        self._open_writer_and_watcher()
+        self._reloader = None  # 外部の変更を読み直している間のローダー
+        self._reload_version = None  # 読み直しを始めたときのタスクの変更番号
+        self._reload_tasks = []
         
         self._setup_window()
         self._create_widgets()
+        self._configure_perf()
         self.load_tags()  # タグを先に読み込む
         self.load_tasks()
+        # データフォルダの外部からの変更を定期的に確認する
+        self.root.after(WATCH_INTERVAL_MS, self._check_external_changes)
+
+    def _open_writer_and_watcher(self):
+        """現在のストレージ用の書き込みキューとファイル監視を作る"""
+        # 外部の変更の監視では、書き込みキューが書き込んだファイルの変更は無視する
+        self.watcher = FileWatcher(self.storage.watch_paths())
+        # 変更の書き込みはワーカースレッドでまとめて行う
+        self.writer = WriteBehindQueue(self.storage, on_written=self.watcher.acknowledge)
+
+    def _configure_perf(self):
+        """データフォルダの設定と環境変数に合わせて処理時間の計測とステータスバーを切り替える"""
+        enabled = perf_enabled(load_settings(self.data_folder))
+        log_path = os.environ.get(PERF_LOG_ENV) or os.path.join(self.data_folder, PERF_LOG_FILE_NAME)
+        self.perf.set_enabled(enabled, log_path)
+        if enabled:
+            self.perf_status_label.configure(text="処理時間 (直近/p50/p95/最大 ms)")
+            self.perf_status_label.grid()
+        else:
+            self.perf_status_label.grid_remove()
+
+    def _show_perf(self, stage, stats):
+        """ステータスバーに段階ごとの処理時間を表示する"""
+        if stage not in PERF_STATUS_STAGES:
+            return
+        parts = []
+        for name, label in PERF_STATUS_STAGES.items():
+            stage_stats = self.perf.stats(name)
+            if stage_stats is not None:
+                parts.append(f"{label} {stage_stats['last']:.0f}/{stage_stats['p50']:.0f}/"
+                             f"{stage_stats['p95']:.0f}/{stage_stats['max']:.0f}")
+        self.perf_status_label.configure(text="処理時間(直近/p50/p95/最大 ms)  " + "  ".join(parts))
+
+    @property
+    def store(self):
+        """すべてのタスクのマスターリストとID索引"""
+        return self.model.store
+
+    @property
+    def tasks(self):
+        """すべてのタスクのマスターリスト"""
+        return self.model.tasks
+
+    @tasks.setter
+    def tasks(self, tasks):
+        self.model.tasks = tasks
+
+    @property
+    def tags(self):
+        """既存のタグリスト"""
+        return self.model.tags
+
+    @tags.setter
+    def tags(self, tags):
+        self.model.tags = tags
+
+    @property
+    def storage(self):
+        return self.model.storage
+
+    @storage.setter
+    def storage(self, storage):
+        self.model.storage = storage
+
+    @property
+    def data_folder(self):
+        return self.model.data_folder
+
+    @data_folder.setter
+    def data_folder(self, data_folder):
+        self.model.data_folder = data_folder
+
+    @property
+    def data_file(self):
+        return self.model.data_file
+
+    @property
+    def tags_file(self):
+        return self.model.tags_file
 
     def _setup_window(self):
         """ウィンドウの基本的な設定"""
@@ -146,7 +369,7 @@ class TaskApp:
         self.root.columnconfigure(0, weight=1)
         self.notebook = ttk.Notebook(self.root)
         self.notebook.grid(row=3, column=0, sticky="nsew", padx=10, pady=(0, 5))
-        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.apply_filters_and_sort())
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
         # --- タスク一覧タブ ---
         self.tab_incomplete = ttk.Frame(self.notebook)
@@ -184,6 +407,8 @@ class TaskApp:
         priority_combo.grid(row=1, column=1, sticky="w", pady=2)
 
         ttk.Label(input_frame, text="期限日:", font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=2, column=0, sticky="w", padx=5, pady=2)
+        # tkcalendar は読み込みに時間がかかる（babel を読む）ので、main を読み込んだだけでは読まない
+        from tkcalendar import DateEntry
         self.due_date_entry = DateEntry(input_frame, date_pattern='yyyy-mm-dd', width=12)
         self.due_date_entry.grid(row=2, column=1, sticky="w", pady=2)
         
@@ -202,6 +427,7 @@ class TaskApp:
         # 追加・更新ボタン
         add_button = ttk.Button(input_frame, text="追加・更新", command=self.add_or_update_task)
         add_button.grid(row=0, column=3, rowspan=3, sticky="ns", padx=10)
+        self._edit_buttons.append(add_button)
         
         # クリアボタン
         clear_button = ttk.Button(input_frame, text="クリア", command=self.clear_inputs)
@@ -215,7 +441,7 @@ class TaskApp:
         ttk.Label(filter_frame, text="検索:", font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=0, column=0, sticky="w", padx=5)
         self.search_entry = ttk.Entry(filter_frame)
         self.search_entry.grid(row=0, column=1, sticky="ew", padx=5)
-        self.search_entry.bind("<KeyRelease>", lambda e: self.apply_filters_and_sort())
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
 
         ttk.Label(filter_frame, text="状態:", font=(FONT_FAMILY, FONT_SIZE_NORMAL)).grid(row=0, column=2, sticky="w", padx=5)
         self.status_filter_var = tk.StringVar(value=STATUS_OPTIONS[0])
@@ -240,7 +466,7 @@ class TaskApp:
         self.task_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
         
         # 列の設定
-        self.task_tree.heading('選択', text='選択')
+        self.task_tree.heading('選択', text='選択', command=lambda: self.toggle_check_all("一覧"))
         self.task_tree.heading('優先度', text='優先度')
         self.task_tree.heading('状態', text='状態')
         self.task_tree.heading('タスク名', text='タスク名')
@@ -258,10 +484,12 @@ class TaskApp:
         self.task_tree.grid(row=0, column=0, sticky="nsew")
         self.task_tree.bind("<<TreeviewSelect>>", self.on_task_select)
         self.task_tree.bind("<Button-1>", self.on_tree_click)
+        self._register_drop_target(self.task_tree)
 
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.task_tree.yview)
-        self.task_tree.config(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
         scrollbar.grid(row=0, column=1, sticky="ns")
+        # 表示範囲の行だけを実体化する仮想リスト（スクロールバーの連携もここで行う）
+        self.task_view = VirtualTreeview(self.task_tree, scrollbar)
 
         # --- 完了タスクリストフレーム ---
         completed_frame = ttk.Frame(self.tab_completed, padding=(0, 0, 0, 5))
@@ -273,7 +501,7 @@ class TaskApp:
         self.completed_tree = ttk.Treeview(completed_frame, columns=columns, show='headings', height=15)
         
         # 列の設定
-        self.completed_tree.heading('選択', text='選択')
+        self.completed_tree.heading('選択', text='選択', command=lambda: self.toggle_check_all("完了"))
         self.completed_tree.heading('優先度', text='優先度')
         self.completed_tree.heading('状態', text='状態')
         self.completed_tree.heading('タスク名', text='タスク名')
@@ -290,10 +518,14 @@ class TaskApp:
         
         self.completed_tree.grid(row=0, column=0, sticky="nsew")
         self.completed_tree.bind("<Button-1>", self.on_completed_tree_click)
+        self._register_drop_target(self.completed_tree)
 
-        completed_scrollbar = ttk.Scrollbar(completed_frame, orient=tk.VERTICAL, command=self.completed_tree.yview)
-        self.completed_tree.config(yscrollcommand=completed_scrollbar.set)
+        completed_scrollbar = ttk.Scrollbar(completed_frame, orient=tk.VERTICAL)
         completed_scrollbar.grid(row=0, column=1, sticky="ns")
+        # 表示範囲の行だけを実体化する仮想リスト（スクロールバーの連携もここで行う）
+        self.completed_view = VirtualTreeview(self.completed_tree, completed_scrollbar)
+        # 末尾までスクロールしたら、アーカイブした完了タスクを1か月分ずつ読み込む
+        self.completed_view.on_scroll_end = self._on_completed_scroll_end
 
         # --- 今日やるタスクリストフレーム ---
         today_frame = ttk.Frame(self.tab_today, padding=(0, 0, 0, 5))
@@ -305,7 +537,7 @@ class TaskApp:
         self.today_tree = ttk.Treeview(today_frame, columns=columns, show='headings', height=15)
         
         # 列の設定
-        self.today_tree.heading('選択', text='選択')
+        self.today_tree.heading('選択', text='選択', command=lambda: self.toggle_check_all("今日"))
         self.today_tree.heading('優先度', text='優先度')
         self.today_tree.heading('状態', text='状態')
         self.today_tree.heading('タスク名', text='タスク名')
@@ -323,187 +555,259 @@ class TaskApp:
         self.today_tree.grid(row=0, column=0, sticky="nsew")
         self.today_tree.bind("<<TreeviewSelect>>", self.on_today_task_select)
         self.today_tree.bind("<Button-1>", self.on_today_tree_click)
+        self._register_drop_target(self.today_tree)
 
-        today_scrollbar = ttk.Scrollbar(today_frame, orient=tk.VERTICAL, command=self.today_tree.yview)
-        self.today_tree.config(yscrollcommand=today_scrollbar.set)
+        today_scrollbar = ttk.Scrollbar(today_frame, orient=tk.VERTICAL)
         today_scrollbar.grid(row=0, column=1, sticky="ns")
+        # 表示範囲の行だけを実体化する仮想リスト（スクロールバーの連携もここで行う）
+        self.today_view = VirtualTreeview(self.today_tree, today_scrollbar)
+
+        # 行の色はタグとして一度だけ設定する
+        for tree in (self.task_tree, self.completed_tree, self.today_tree):
+            for color in (COLOR_INCOMPLETE, COLOR_OVERDUE, COLOR_COMPLETED):
+                tree.tag_configure(color, foreground=color)
 
         # --- 操作ボタンフレーム ---
         button_frame = ttk.Frame(self.root, padding=10)
         button_frame.grid(row=4, column=0, sticky="ew")
-        button_frame.columnconfigure([0, 1, 2, 3, 4], weight=1)
-        
-        ttk.Button(button_frame, text="完了 / 未着手", command=self.toggle_task_status).grid(row=0, column=0, padx=5, sticky="ew")
-        ttk.Button(button_frame, text="今日 / 今日以外", command=self.toggle_today_status).grid(row=0, column=1, padx=5, sticky="ew")
-        ttk.Button(button_frame, text="削除", command=self.delete_task).grid(row=0, column=2, padx=5, sticky="ew")
-        ttk.Button(button_frame, text="設定", command=self.show_settings).grid(row=0, column=3, padx=5, sticky="ew")
-        ttk.Button(button_frame, text="終了", command=self.root.quit).grid(row=0, column=4, padx=5, sticky="ew")
+        button_frame.columnconfigure([0, 1, 2, 3, 4, 5], weight=1)
+        
+        for column, (text, command) in enumerate([("完了 / 未着手", self.toggle_task_status),
+                                                  ("今日 / 今日以外", self.toggle_today_status),
+                                                  ("一括変更", self.bulk_edit),
+                                                  ("削除", self.delete_task),
+                                                  ("設定", self.show_settings)]):
+            button = ttk.Button(button_frame, text=text, command=command)
+            button.grid(row=0, column=column, padx=5, sticky="ew")
+            self._edit_buttons.append(button)
+        ttk.Button(button_frame, text="終了", command=self.root.quit).grid(row=0, column=5, padx=5, sticky="ew")
+
+        # --- 読み込み状況（バックグラウンド読み込み中だけ表示） ---
+        self.load_status_frame = ttk.Frame(self.root, padding=(10, 0, 10, 5))
+        self.load_status_frame.grid(row=5, column=0, sticky="ew")
+        self.load_status_frame.columnconfigure(1, weight=1)
+        self.load_status_label = ttk.Label(self.load_status_frame, text="", font=(FONT_FAMILY, FONT_SIZE_NORMAL))
+        self.load_status_label.grid(row=0, column=0, sticky="w", padx=(0, 10))
+        self.load_progress = ttk.Progressbar(self.load_status_frame, mode="indeterminate")
+        self.load_progress.grid(row=0, column=1, sticky="ew")
+        # 中止ボタンはファイルの取り込み中だけ表示する
+        self.import_cancel_button = ttk.Button(self.load_status_frame, text="中止", command=self.cancel_import)
+        self.import_cancel_button.grid(row=0, column=2, padx=(10, 0))
+        self.import_cancel_button.grid_remove()
+        self.load_status_frame.grid_remove()
+
+        # --- 処理時間のステータスバー（計測を有効にしたときだけ表示） ---
+        self.perf_status_label = ttk.Label(self.root, text="", anchor="w", padding=(10, 0, 10, 5),
+                                           font=(MONOSPACE_FONT, FONT_SIZE_NORMAL - 2))
+        self.perf_status_label.grid(row=6, column=0, sticky="ew")
+        self.perf_status_label.grid_remove()
+
+    def on_search_key(self, event=None):
+        """検索欄のキー入力を一定時間まとめてから絞り込む"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        if self.search_entry.get() != self._search_query:
+            # 検索語が変わったら実行中の古い絞り込みは打ち切る
+            self._search_generation += 1
+            self._search_query = None
+        self._search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        """待ち時間が過ぎた検索を実行する（検索語が変わっていなければ何もしない）"""
+        self._search_after_id = None
+        if self.search_entry.get() == self._search_query:
+            return
+        self.apply_filters_and_sort(refine=True)
 
-    def apply_filters_and_sort(self):
-        """フィルターとソートを適用してタスクを表示"""
+    def on_tab_changed(self, event=None):
+        """タブの切り替え時、そのタブに関わる変更がなければ何もしない"""
         current_tab = self.notebook.tab(self.notebook.select(), "text")
-        
-        # 現在のタブに応じてタスクをフィルター
-        if current_tab == "一覧":
-            filtered_tasks = [task for task in self.tasks if task['status'] != "完了" and task['today'] != TODAY_OPTIONS[0]]
-        elif current_tab == "今日":
-            filtered_tasks = [task for task in self.tasks if task['today'] == TODAY_OPTIONS[0] and task['status'] != "完了"]
-        elif current_tab == "完了":
-            filtered_tasks = [task for task in self.tasks if task['status'] == "完了"]
+        cached = self._tab_cache.get(current_tab)
+        if cached is not None and cached[0] == self._tab_cache_key(current_tab):
+            return
+        self.apply_filters_and_sort()
+
+    def _tab_cache_key(self, tab):
+        """タブの表示内容のキャッシュキー（検索語と、タブ名以外の _filter_conditions）"""
+        return (normalize_text(self._search_words()),) + self._filter_conditions(tab)[1:]
+
+    def _filter_conditions(self, tab):
+        """検索語以外の絞り込み条件（タブ・並び替え・データの変更番号・状態フィルター・検索欄の「キー:値」の条件）"""
+        filters, _ = split_search(self.search_entry.get())
+        return (tab, self.sort_var.get(), self._view_version(tab), self.status_filter_var.get(), filters)
+
+    def _search_words(self):
+        """検索欄の入力のうち「キー:値」の条件を除いた検索語"""
+        return split_search(self.search_entry.get())[1]
+
+    def _view_version(self, tab):
+        """タブの表示に関わるデータの変更番号（完了タブは表示しているアーカイブの変更も含む）"""
+        return (self.store.view_version(tab), self._archive_version if tab == "完了" else 0)
+
+    @timed("apply_filters_and_sort")
+    def apply_filters_and_sort(self, refine=False, tab=None):
+        """
+        フィルターとソートを適用してタスクを表示（tab を省略したときは選択中のタブ）
+
+        タブ・状態フィルター・検索欄の入力をクエリにし、プランナーが選んだ索引から一致するタスクだけを取り出す。
+        refine=True のときは、検索語以外の条件が同じで検索語が直前の検索語を含んでいれば直前の結果から絞り込む。
+        対象が多いときはアイドル処理で少しずつ絞り込み、より新しい絞り込みが始まったら打ち切る。
+        """
+        current_tab = tab or self.notebook.tab(self.notebook.select(), "text")
+        self._search_generation += 1
+        self._search_query = self.search_entry.get()
+        
+        if self.model.queries_storage and not self.writer.pending:
+            # 絞り込みと並び替えをデータベースで行い、表示対象のIDだけを受け取る
+            # （書き込み待ちの変更があるうちはデータベースが古いので、メモリ上で行う）
+            self._show_filtered_tasks(current_tab, self._query_storage(current_tab), self._tab_cache_key(current_tab))
+            return
+
+        conditions = self._filter_conditions(current_tab)
+        search_term = normalize_text(self._search_words())
+        cache = self._search_cache
+        if not (refine and cache is not None and cache[0] == conditions and cache[1] in search_term):
+            filtered_tasks = self._filter_and_sort_tasks(current_tab)
+            self._finish_filter(current_tab, conditions, search_term, filtered_tasks)
+            return
+
+        # 直前の結果は並び替え済みなので、絞り込むだけでよい
+        base_tasks = cache[2]
+        if len(base_tasks) <= SEARCH_CHUNK_SIZE:
+            filtered_tasks = self._search_tasks(base_tasks, search_term)
+            self._finish_filter(current_tab, conditions, search_term, filtered_tasks)
         else:
-            filtered_tasks = self.tasks.copy()
-        
-        # 検索フィルターを適用
-        search_term = self.search_entry.get().lower()
-        if search_term:
-            filtered_tasks = [task for task in filtered_tasks if search_term in task["name"].lower() or search_term in (task["tags"] or "").lower()]
-        
-        # ソートを適用
-        sort_option = self.sort_var.get()
-        if sort_option == "追加順":
-            # 追加順は変更なし（既存の順序を維持）
-            pass
-        elif sort_option == "期限順":
-            filtered_tasks.sort(key=lambda x: (x['due_date'] or '9999-12-31', x['priority']))
-        elif sort_option == "優先度順":
-            filtered_tasks.sort(key=lambda x: (x['priority'], x['due_date'] or '9999-12-31'))
-        elif sort_option == "タグ順":
-            filtered_tasks.sort(key=lambda x: (x['tags'] or '', x['due_date'] or '9999-12-31'))
-        
+            self._filter_in_chunks(self._search_generation, current_tab, conditions, search_term, base_tasks, 0, [])
+
+    def _filter_in_chunks(self, generation, current_tab, conditions, search_term, base_tasks, start, matched):
+        """直前の結果からの絞り込みを SEARCH_CHUNK_SIZE 件ずつアイドル処理で進める"""
+        if generation != self._search_generation:
+            # より新しい絞り込みが始まっている
+            return
+        end = start + SEARCH_CHUNK_SIZE
+        matched.extend(self._search_tasks(base_tasks[start:end], search_term))
+        if end < len(base_tasks):
+            self.root.after_idle(self._filter_in_chunks, generation, current_tab, conditions, search_term,
+                                 base_tasks, end, matched)
+        else:
+            self._finish_filter(current_tab, conditions, search_term, matched)
+
+    def _finish_filter(self, current_tab, conditions, search_term, filtered_tasks):
+        """並び替え済みの絞り込み結果を表示し、次の絞り込みのために覚えておく"""
+        self._search_cache = (conditions, search_term, filtered_tasks)
+        self._show_filtered_tasks(current_tab, filtered_tasks, (search_term,) + conditions[1:])
+
+    def _show_filtered_tasks(self, current_tab, filtered_tasks, cache_key):
+        """絞り込み結果をタブの表示リストに設定して再描画し、キャッシュに残す"""
+        self._tab_cache[current_tab] = (cache_key, filtered_tasks)
         # 現在のタブに応じて適切なリストに設定
         if current_tab == "一覧":
             self.view_tasks = filtered_tasks
         elif current_tab == "今日":
             self.view_today_tasks = filtered_tasks
         elif current_tab == "完了":
-            self.view_completed_tasks = filtered_tasks
-        
-        self._populate_listbox()
-
-    def _populate_listbox(self):
-        """Treeviewをview_tasks, view_completed_tasksの内容で埋める"""
-        self.task_tree.delete(*self.task_tree.get_children())
-        self.completed_tree.delete(*self.completed_tree.get_children())
-        self.today_tree.delete(*self.today_tree.get_children())
-        
-        today = datetime.now().date()
-        
-        # 未完了タスク
-        for i, task in enumerate(self.view_tasks):
-            # 完了ステータスを優先度の横に表示
-            status_text = "完了" if task["status"] == "完了" else "未着手"
-            prio = f"[{task.get('priority', '中')}]"
-            status = f"[{status_text}]"
-            due = f"{task.get('due_date', 'なし')}"
-            tags_disp = f"{task.get('tags', '')}" if task.get("tags") else ""
-            
-            # Treeviewにアイテムを追加（チェックボックスは初期状態で未チェック）
-            item_id = self.task_tree.insert("", "end", values=("□", prio, status, task['name'], due, tags_disp))
-            
-            # 色の設定
-            color = COLOR_INCOMPLETE
-            if task.get("due_date"):
-                try:
-                    due_date_obj = datetime.strptime(task["due_date"], "%Y-%m-%d").date()
-                    if due_date_obj < today:
-                        color = COLOR_OVERDUE
-                except ValueError:
-                    pass
-            
-            # 色をタグとして設定
-            self.task_tree.tag_configure(color, foreground=color)
-            self.task_tree.item(item_id, tags=(color,))
-        
-        # 完了タスク
-        for i, task in enumerate(self.view_completed_tasks):
-            # 完了ステータスを優先度の横に表示
-            status_text = "完了"
-            prio = f"[{task.get('priority', '中')}]"
-            status = f"[{status_text}]"
-            due = f"{task.get('due_date', 'なし')}"
-            tags_disp = f"{task.get('tags', '')}" if task.get("tags") else ""
-            
-            # Treeviewにアイテムを追加（チェックボックスは初期状態で未チェック）
-            item_id = self.completed_tree.insert("", "end", values=("□", prio, status, task['name'], due, tags_disp))
-            
-            # 色をタグとして設定
-            self.completed_tree.tag_configure(COLOR_COMPLETED, foreground=COLOR_COMPLETED)
-            self.completed_tree.item(item_id, tags=(COLOR_COMPLETED,))
-        
-        # 今日やるタスク
-        for i, task in enumerate(self.view_today_tasks):
-            # 完了ステータスを優先度の横に表示
-            status_text = "完了" if task["status"] == "完了" else "未着手"
-            prio = f"[{task.get('priority', '中')}]"
-            status = f"[{status_text}]"
-            due = f"{task.get('due_date', 'なし')}"
-            tags_disp = f"{task.get('tags', '')}" if task.get("tags") else ""
-            
-            # Treeviewにアイテムを追加（チェックボックスは初期状態で未チェック）
-            item_id = self.today_tree.insert("", "end", values=("□", prio, status, task['name'], due, tags_disp))
-            
-            # 色の設定
-            color = COLOR_COMPLETED if task["status"] == "完了" else COLOR_INCOMPLETE
-            if task.get("due_date"):
-                try:
-                    due_date_obj = datetime.strptime(task["due_date"], "%Y-%m-%d").date()
-                    if due_date_obj < today:
-                        color = COLOR_OVERDUE
-                except ValueError:
-                    pass
-            
-            # 色をタグとして設定
-            self.today_tree.tag_configure(color, foreground=color)
-            self.today_tree.item(item_id, tags=(color,))
-
-    def on_task_select(self, event=None):
-        """Treeviewでタスクが選択されたときの処理"""
-        selected_items = self.task_tree.selection()
-        if not selected_items:
-            return
-        
-        # 複数選択時は入力フォームを更新しない
-        if len(selected_items) > 1:
-            return
-        
-        selected_item = selected_items[0]
-        # Treeviewのアイテムから値を取得
-        values = self.task_tree.item(selected_item, 'values')
-        if not values:
-            return
-        
-        # タスク名からマスターリストのタスクを検索
-        task_name = values[3]  # タスク名は4番目の列
-        task = None
-        for t in self.view_tasks:
-            if t["name"] == task_name:
-                task = t
-                break
+            # アーカイブのタスク（検索中はアーカイブで一致したタスク）は完了した月の新しい順に末尾へ続ける
+            # （検索語以外の条件はここで確かめる）
+            archive_query = self.model.build_query(current_tab, self.search_entry.get(),
+                                                   self.status_filter_var.get()).without(TextMatches)
+            self.view_completed_tasks = filtered_tasks + archive_query.filter(self._archived_view_tasks())
         
-        if not task:
+        self._populate_listbox([current_tab])
+
+    def _query_storage(self, current_tab):
+        """ストレージのクエリ機能でタブの表示対象を取得する"""
+        try:
+            return self.model.query_storage(current_tab, self.search_entry.get(), self.sort_var.get(),
+                                            self.status_filter_var.get())
+        except sqlite3.Error as e:
+            messagebox.showerror("エラー", f"タスクの検索に失敗しました: {e}")
+            return self._filter_and_sort_tasks(current_tab)
+
+    def _filter_and_sort_tasks(self, current_tab):
+        """メモリ上のタスクにタブ・検索・状態フィルター・ソートを適用する"""
+        return self.model.filter_tasks(current_tab, self.search_entry.get(), self.sort_var.get(),
+                                       self.status_filter_var.get())
+
+    def _search_tasks(self, tasks, search_term):
+        """正規化済みの検索語のすべての語をタスク名・タグに含むタスクを返す"""
+        return self.model.search_tasks(tasks, search_term)
+
+    @timed("_populate_listbox")
+    def _populate_listbox(self, tabs=VIEW_TABS):
+        """仮想リストをview_tasks, view_completed_tasks, view_today_tasksの内容で更新する（差分のみ反映）"""
+        today = datetime.now().date().toordinal()
+        views = []
+        if "一覧" in tabs:
+            self.task_view.set_rows([self._task_row(task, today) for task in self.view_tasks])
+            views.append(self.task_view)
+        if "完了" in tabs:
+            self.completed_view.set_rows([self._task_row(task, today, completed=True) for task in self.view_completed_tasks])
+            views.append(self.completed_view)
+        if "今日" in tabs:
+            self.today_view.set_rows([self._task_row(task, today) for task in self.view_today_tasks])
+            views.append(self.today_view)
+        # 今回の更新で発行したTk呼び出し回数（差分更新の効果確認用）
+        self.last_refresh_tk_calls = sum(view.last_tk_calls for view in views)
+        self._schedule_overdue_check()
+
+    def _task_row(self, task, today, completed=False):
+        """タスクをTreeviewの行（タスクID・値・色タグ）に変換する（チェックボックスはチェック状態から作る）"""
+        # 完了ステータスを優先度の横に表示
+        status_text = "完了" if completed or task["status"] == "完了" else "未着手"
+        prio = f"[{task.get('priority', '中')}]"
+        status = f"[{status_text}]"
+        due = f"{task.get('due_date', 'なし')}"
+        tags_disp = f"{task.get('tags', '')}" if task.get("tags") else ""
+        values = (self.selection.glyph(task["id"]), prio, status, task['name'], due, tags_disp)
+        
+        # 色の設定
+        if completed:
+            return task["id"], values, (COLOR_COMPLETED,)
+        return task["id"], values, (self._task_color(task, today),)
+
+    def _task_color(self, task, today):
+        """タスクの文字色（today は今日の通し日付。期限日は読み込み時に変換したものを使う）"""
+        if task["status"] == "完了":
+            return COLOR_COMPLETED
+        if self.store.task_due_ordinal(task) < today:
+            return COLOR_OVERDUE
+        return COLOR_INCOMPLETE
+
+    def _schedule_overdue_check(self):
+        """次にタスクが期限切れになる時刻（期限日の翌日0時）に、色の更新を1回だけ予約する"""
+        if self._overdue_after_id is not None:
+            self.root.after_cancel(self._overdue_after_id)
+            self._overdue_after_id = None
+        next_due = self.store.next_due_ordinal()
+        if next_due is None:
             return
+        now = datetime.now()
+        delay = (datetime.fromordinal(next_due + 1) - now).total_seconds()
+        delay_ms = min(OVERDUE_CHECK_MAX_MS, max(0, int(delay * 1000) + 1))
+        self._overdue_after_id = self.root.after(delay_ms, self._check_overdue)
+
+    def _check_overdue(self):
+        """期限切れになったタスクの行だけ文字色を変え、次の確認を予約する"""
+        self._overdue_after_id = None
+        today = datetime.now().date().toordinal()
+        for task_id in self.store.pop_overdue(today):
+            for view in (self.task_view, self.today_view):
+                index = view.find(task_id)
+                if index is not None:
+                    view.set_row_tags(index, (COLOR_OVERDUE,))
+        self._schedule_overdue_check()
 
-        self.task_entry.delete(0, tk.END)
-        self.task_entry.insert(0, task.get("name", ""))
-        self.priority_var.set(task.get("priority", PRIORITY_LEVELS[1]))
-        
-        # 日付の設定
-        due_date = task.get("due_date", "")
-        if due_date:
-            try:
-                date_obj = datetime.strptime(due_date, "%Y-%m-%d").date()
-                self.due_date_entry.set_date(date_obj)
-            except ValueError:
-                self.due_date_entry.set_date(None)
-        else:
-            self.due_date_entry.set_date(None)
-            
-        self.tags_var.set(task.get("tags", ""))
-        self.today_var.set(task.get("today", TODAY_OPTIONS[1]))
+    def on_task_select(self, event=None):
+        """Treeviewでタスクが選択されたときの処理"""
+        self._fill_inputs_from_tree(self.task_tree)
         
     def on_today_task_select(self, event=None):
         """今日やるタスクTreeviewでタスクが選択されたときの処理"""
-        selected_items = self.today_tree.selection()
+        self._fill_inputs_from_tree(self.today_tree)
+
+    def _fill_inputs_from_tree(self, tree):
+        """選択中の行のタスクを入力フォームに表示する"""
+        selected_items = tree.selection()
         if not selected_items:
             return
         
@@ -511,20 +815,8 @@ class TaskApp:
         if len(selected_items) > 1:
             return
         
-        selected_item = selected_items[0]
-        # Treeviewのアイテムから値を取得
-        values = self.today_tree.item(selected_item, 'values')
-        if not values:
-            return
-        
-        # タスク名からマスターリストのタスクを検索
-        task_name = values[3]  # タスク名は4番目の列
-        task = None
-        for t in self.view_today_tasks:
-            if t["name"] == task_name:
-                task = t
-                break
-        
+        # Treeviewのiidはタスクのidなので、索引から直接取得する
+        task = self.store.get(selected_items[0])
         if not task:
             return
 
@@ -557,133 +849,444 @@ class TaskApp:
 
 
     # --- データ永続化 (CSV) ---
+    @property
+    def loading(self):
+        """バックグラウンドで読み込み中か"""
+        return self._loader is not None
+
+    @timed("load_tasks")
     def load_tasks(self):
-        """CSVファイルからタスクを読み込む"""
+        """
+        CSVファイルからタスクを読み込む
+
+        データが BACKGROUND_LOAD_THRESHOLD 以上のときはワーカースレッドで読み込み、
+        届いた分から表示する。読み込みが終わるまで編集操作は無効にする。
+        キャッシュから読めるときはCSVの解析より十分速いので、CACHED_BACKGROUND_LOAD_THRESHOLD まではその場で読む。
+        """
+        self.cancel_loading()
         self.tasks = []
+        self.selection.clear()
+        self._reset_archive_view()
         
         # データフォルダが存在しない場合は作成
         if not os.path.exists(self.data_folder):
             os.makedirs(self.data_folder)
-            
-        if not os.path.exists(self.data_file):
-            return
 
+        threshold = CACHED_BACKGROUND_LOAD_THRESHOLD if self.storage.is_cached() else BACKGROUND_LOAD_THRESHOLD
+        if self.storage.data_size() >= threshold:
+            self._start_background_load()
+            return
+            
         try:
-            with open(self.data_file, 'r', encoding='utf-8', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    task = {
-                        "id": row.get("id", str(uuid.uuid4())),
-                        "name": row.get("name", ""),
-                        "status": row.get("status", "未着手"),
-                        "priority": row.get("priority", "中"),
-                        "due_date": row.get("due_date", ""),
-                        "tags": row.get("tags", ""),
-                        "today": row.get("today", TODAY_OPTIONS[1])
-                    }
-                    self.tasks.append(task)
+            # スナップショットとジャーナルの再生はストレージ側で行う
+            self.model.load()
         except Exception as e:
             messagebox.showerror("エラー", f"ファイルの読み込みに失敗しました: {e}")
             self.tasks = []
-            
-        self.apply_filters_and_sort()
+        self._finish_loading()
+
+    def _start_background_load(self):
+        """ワーカースレッドでの読み込みを開始し、キューの確認を予約する"""
+        self._loader = BackgroundLoader(self.storage.iter_load)
+        self._loader.start()
+        self._load_started_at = time.perf_counter()
+        self._load_refreshed_at = 0.0
+        self._set_edit_enabled(False)
+        self.load_status_label.configure(text="読み込み中...")
+        self.load_status_frame.grid()
+        self.load_progress.start()
+        self.root.after(LOAD_POLL_MS, self._poll_background_load)
+
+    def _poll_background_load(self):
+        """届いたタスクをマスターリストに追加し、一定間隔で表示を更新する"""
+        loader = self._loader
+        if loader is None:
+            return
+        for batch in loader.poll(LOAD_MAX_BATCHES_PER_POLL):
+            self.store.extend(batch)
+        if loader.error is not None:
+            messagebox.showerror("エラー", f"ファイルの読み込みに失敗しました: {loader.error}")
+            self.tasks = []
+        elif loader.done:
+            # 読み込んだときのファイルの状態は、ワーカーではなくここでストレージに記録する
+            self.storage.finish_load(loader.result)
+        if loader.done:
+            self._end_loading()
+            self._finish_loading()
+            # 読み込みの開始から表示とタグリストを作り終えるまでの時間
+            self.perf.record("background_load", time.perf_counter() - self._load_started_at)
+            return
+        self.load_status_label.configure(text=f"読み込み中... {loader.loaded_count}件")
+        now = time.monotonic()
+        if self.tasks and now - self._load_refreshed_at >= LOAD_REFRESH_INTERVAL:
+            # 最初の画面分が届いたらすぐ表示し、その後は一定間隔でまとめて更新する
+            self._load_refreshed_at = now
+            self.apply_filters_and_sort()
+        self.root.after(LOAD_POLL_MS, self._poll_background_load)
+
+    def cancel_loading(self):
+        """バックグラウンド読み込みを中止する"""
+        if self._loader is not None:
+            self._loader.cancel()
+            self._end_loading()
+
+    def _end_loading(self):
+        """読み込み中の表示を片付けて編集を有効に戻す"""
+        self._loader = None
+        self.load_progress.stop()
+        self.load_status_frame.grid_remove()
+        self._set_edit_enabled(True)
+
+    def _set_edit_enabled(self, enabled):
+        """編集用のボタンを有効/無効にする"""
+        for button in self._edit_buttons:
+            button.state(["!disabled"] if enabled else ["disabled"])
+
+    # --- ファイルのドロップによる取り込み ---
+    def _register_drop_target(self, tree):
+        """Treeviewにファイルをドロップできるようにする（tkinterdnd2 のウィジェットのときだけ）"""
+        if hasattr(tree, "drop_target_register"):
+            from tkinterdnd2 import DND_FILES
+            tree.drop_target_register(DND_FILES)
+            tree.dnd_bind("<<Drop>>", self.on_drop_files)
+
+    def on_drop_files(self, event):
+        """ドロップされたファイルを取り込む"""
+        # 空白を含むパスは {} で囲まれて渡されるので、Tclのリストとして分ける
+        paths = [path for path in self.root.tk.splitlist(event.data) if os.path.isfile(path)]
+        if paths:
+            self.import_files(paths)
+        return event.action
+
+    @property
+    def importing(self):
+        """ファイルを取り込み中か"""
+        return self._import_loader is not None
+
+    def import_files(self, paths):
+        """
+        CSV・JSON Lines・テキストのファイルをワーカースレッドで読み、新しいタスクを取り込む
+
+        ファイルの読み込み・項目の確認・重複の判定はワーカースレッドで行い、
+        届いたバッチごとにまとめてマスターリストへ追加する（1件ずつの add_task は使わない）。
+        取り込み中は進捗と中止ボタンを表示し、編集操作は無効にする。
+        """
+        if self.loading or self.importing:
+            return False
+        # 重複の判定に使う既存のタスクは、開始時点のリストをワーカースレッドに渡す
+        self._importer = TaskImporter(paths, list(self.tasks))
+        self._import_loader = BackgroundLoader(self._importer.iter_tasks)
+        self._import_loader.start()
+        self._load_refreshed_at = time.monotonic()
+        self._set_edit_enabled(False)
+        self.load_status_label.configure(text="取り込み中...")
+        self.load_status_frame.grid()
+        self.import_cancel_button.grid()
+        self.load_progress.start()
+        self.root.after(LOAD_POLL_MS, self._poll_import)
+        return True
+
+    @timed("import_batch")
+    def _commit_import_batch(self, batch):
+        """届いたバッチをまとめてマスターリストに追加する"""
+        self.model.import_tasks(batch)
+
+    def _poll_import(self):
+        """届いたタスクを取り込み、進捗を表示し、一定間隔で表示を更新する"""
+        loader = self._import_loader
+        if loader is None:
+            return
+        # 1バッチの追加は並べ替えの索引の作り直しを含むので、時間の目安を超えたら次の確認に回す
+        deadline = time.perf_counter() + IMPORT_COMMIT_BUDGET
+        while time.perf_counter() < deadline:
+            batches = loader.poll(1)
+            if not batches:
+                break
+            self._commit_import_batch(batches[0])
+        importer = self._importer
+        if loader.done:
+            self._end_import()
+            if loader.error is not None:
+                messagebox.showerror("エラー", f"ファイルの取り込みに失敗しました: {loader.error}\n"
+                                             f"（それまでの {loader.loaded_count} 件は取り込み済みです）")
+            else:
+                message = f"ファイルを取り込みました。\n{importer.summary()}"
+                if importer.errors:
+                    message += "\n\n" + "\n".join(importer.errors)
+                messagebox.showinfo("取り込み", message)
+            return
+        self.load_status_label.configure(
+            text=f"取り込み中... {importer.read_count}行 / 追加 {loader.loaded_count}件")
+        now = time.monotonic()
+        if now - self._load_refreshed_at >= LOAD_REFRESH_INTERVAL:
+            self._load_refreshed_at = now
+            self.apply_filters_and_sort()
+        self.root.after(LOAD_POLL_MS, self._poll_import)
+
+    def cancel_import(self, notify=True):
+        """取り込みを中止する（それまでに取り込んだタスクは残す）"""
+        loader = self._import_loader
+        if loader is None:
+            return
+        loader.cancel()
+        self._end_import()
+        if notify:
+            messagebox.showinfo("取り込み", f"取り込みを中止しました。\n{loader.loaded_count} 件は取り込み済みです。")
+
+    def _end_import(self):
+        """取り込み中の表示を片付け、取り込んだタスクを表示とタグリストに反映する"""
+        self._import_loader = None
+        self._importer = None
+        self.load_progress.stop()
+        self.import_cancel_button.grid_remove()
+        self.load_status_frame.grid_remove()
+        self._set_edit_enabled(True)
+        for tab in VIEW_TABS:
+            self.apply_filters_and_sort(tab=tab)
+        self._sync_tags()
+
+    def _finish_loading(self):
+        """読み込んだタスクで表示とタグリストを作る"""
+        # 古い完了タスクは表示を作る前にアーカイブへ移す
+        self._archive_completed()
+        # すべてのタブの表示内容を作る（タブを切り替える必要はない）
+        for tab in VIEW_TABS:
+            self.apply_filters_and_sort(tab=tab)
         # 既存のタスクからタグを抽出
         self.extract_tags_from_tasks()
-        
-        # すべてのタブでフィルタリングを適用
-        for tab_index in range(3):  # 0: 一覧, 1: 今日, 2: 完了
-            self.notebook.select(tab_index)
-            self.apply_filters_and_sort()
-        
-        # 一覧タブに戻す
-        self.notebook.select(0)
+        # 使われていないタグは次の変更時に片付ける
+        self.model.reset_tag_changes()
 
+    # --- 完了タスクのアーカイブ ---
+    def _archive_completed(self):
+        """完了してから設定の日数がたったタスクをアーカイブへ移す"""
+        try:
+            self.model.archive_completed(archive_after_days(load_settings(self.data_folder)))
+        except (IOError, OSError) as e:
+            messagebox.showerror("エラー", f"完了タスクのアーカイブに失敗しました: {e}")
+
+    def _reset_archive_view(self):
+        """完了タブに読み込んだアーカイブのタスクを片付ける（データを読み直すとき）"""
+        if self._archive_search is not None and self._archive_search[1] is not None:
+            self._archive_search[1].cancel()
+        self._archive_search = None
+        self._archive_tasks = []
+        self._archive_months_loaded = 0
+        self._archive_version += 1
+
+    def _archived_view_tasks(self):
+        """完了タブの末尾に表示するアーカイブのタスク（検索語があればアーカイブの検索を始める）"""
+        terms = parse_query(self._search_words())
+        if not terms:
+            return self._archive_tasks
+        search = self._archive_search
+        if search is None or search[0] != terms:
+            self._start_archive_search(terms)
+            return []
+        return search[2]
+
+    def _start_archive_search(self, terms):
+        """アーカイブをワーカースレッドで1行ずつ検索する（すべてをメモリには読み込まない）"""
+        if self._archive_search is not None and self._archive_search[1] is not None:
+            self._archive_search[1].cancel()
+        archive = self.model.archive
+        if not archive.months():
+            self._archive_search = (terms, None, [])
+            return
+        loader = BackgroundLoader(lambda: archive.search(terms))
+        self._archive_search = (terms, loader, [])
+        loader.start()
+        self.root.after(LOAD_POLL_MS, self._poll_archive_search, loader)
+
+    def _poll_archive_search(self, loader):
+        """アーカイブの検索で一致したタスクを受け取り、終わったら完了タブに表示する"""
+        search = self._archive_search
+        if search is None or search[1] is not loader:
+            # より新しい検索が始まっている
+            return
+        terms, _, results = search
+        for batch in loader.poll():
+            # 読み込みの途中で終了して、マスターリストにも残っているタスクは除く
+            found = [(month, task) for month, task in batch if task["id"] not in self.store]
+            # 見つけたタスクの月はワーカーではなくここで覚える
+            self.model.archive.remember(found)
+            results.extend(task for _, task in found)
+        if not loader.done:
+            self.root.after(LOAD_POLL_MS, self._poll_archive_search, loader)
+            return
+        self._archive_search = (terms, None, results)
+        if loader.error is not None:
+            messagebox.showerror("エラー", f"アーカイブの検索に失敗しました: {loader.error}")
+        if results:
+            self._archive_version += 1
+            self.apply_filters_and_sort(tab="完了")
+
+    def _on_completed_scroll_end(self):
+        """完了タブを末尾までスクロールしたら、続きのアーカイブの読み込みを予約する（検索中は検索で探す）"""
+        if self._archive_after_id is not None or parse_query(self._search_words()):
+            return
+        if self.notebook.tab(self.notebook.select(), "text") != "完了":
+            return
+        self._archive_after_id = self.root.after_idle(self.load_next_archive_month)
+
+    def load_next_archive_month(self):
+        """まだ読み込んでいないアーカイブのうち最も新しい月を完了タブの末尾に表示する（読み込んだら True）"""
+        self._archive_after_id = None
+        months = self.model.archive.months()
+        if self._archive_months_loaded >= len(months):
+            return False
+        month = months[self._archive_months_loaded]
+        self._archive_months_loaded += 1
+        try:
+            self._archive_tasks.extend(self.model.archive.load_month(month, exclude=self.store.__contains__))
+        except (IOError, OSError) as e:
+            messagebox.showerror("エラー", f"アーカイブの読み込みに失敗しました: {e}")
+            return False
+        self._archive_version += 1
+        self.apply_filters_and_sort(tab="完了")
+        return True
+
+    def _archived_ids(self, task_ids):
+        """タスクIDのうち、完了タブに読み込んだアーカイブのタスクのIDの集合"""
+        archive = self.model.archive
+        return {task_id for task_id in task_ids if archive.month_of(task_id) is not None}
+
+    def _drop_archived_rows(self, task_ids):
+        """アーカイブから取り出したタスクを完了タブの表示から外す"""
+        task_ids = set(task_ids)
+        self._archive_tasks = [task for task in self._archive_tasks if task["id"] not in task_ids]
+        if self._archive_search is not None:
+            terms, loader, results = self._archive_search
+            self._archive_search = (terms, loader, [task for task in results if task["id"] not in task_ids])
+
+    def _split_archived(self, task_ids):
+        """
+        アーカイブのタスクを除いたIDのリストを返す
+
+        アーカイブのタスクは完了/未着手の切り替えで戻すまで変更できないので、含まれていれば件数を知らせる。
+        """
+        archived = self._archived_ids(task_ids)
+        if archived:
+            messagebox.showinfo("アーカイブのタスク",
+                                f"アーカイブのタスク{len(archived)}個は変更しません。"
+                                "変更するには完了/未着手の切り替えで先に戻してください。")
+        return [task_id for task_id in task_ids if task_id not in archived]
+        self._archive_version += 1
+
+    @timed("save_tasks")
     def save_tasks(self):
-        """現在のタスクリストをCSVファイルに保存する"""
-        # データフォルダが存在しない場合は作成
-        if not os.path.exists(self.data_folder):
-            os.makedirs(self.data_folder)
-            
+        """現在のタスクリスト全体をCSVファイルに保存する"""
+        if self.loading:
+            # 読み込み途中のタスクで上書きしない（読み込み中は編集できないので保存するものもない）
+            return
+        # 書き込み待ちの変更を先に書き込んでから全体を保存する
+        self.writer.flush()
+        self._report_write_errors()
         try:
-            with open(self.data_file, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                writer.writeheader()
-                writer.writerows(self.tasks)
-        except IOError as e:
+            self.model.save()
+            if not self.storage.merged_external:
+                # 他のインスタンスの変更を取り込んだときは、監視で気づいて読み直す
+                self.watcher.acknowledge()
+        except (IOError, OSError) as e:
             messagebox.showerror("エラー", f"ファイルへの保存に失敗しました: {e}")
 
+    def _check_external_changes(self):
+        """データフォルダのファイルが外部で変更されていれば読み直しを始める"""
+        # 読み込み中や書き込み待ちの変更があるうちは確認しない（自分の変更と区別できないため）
+        if self._reloader is None and not self.loading and not self.importing and not self.writer.pending:
+            if self.watcher.poll():
+                self._start_external_reload()
+        self.root.after(WATCH_INTERVAL_MS, self._check_external_changes)
+
+    def _start_external_reload(self):
+        """変更されたデータをワーカースレッドで読み直す"""
+        self._reload_version = self.store.version
+        self._reload_tasks = []
+        self._reloader = BackgroundLoader(self.storage.iter_load)
+        self._reloader.start()
+        self.root.after(LOAD_POLL_MS, self._poll_external_reload)
+
+    def _poll_external_reload(self):
+        """読み直しが終わったら、メモリ上のタスクとの差分だけを反映する"""
+        reloader = self._reloader
+        if reloader is None:
+            return
+        for batch in reloader.poll():
+            self._reload_tasks.extend(batch)
+        if not reloader.done:
+            self.root.after(LOAD_POLL_MS, self._poll_external_reload)
+            return
+        self._reloader = None
+        tasks, self._reload_tasks = self._reload_tasks, []
+        if reloader.error is not None:
+            messagebox.showerror("エラー", f"ファイルの読み込みに失敗しました: {reloader.error}")
+            return
+        if self.store.version != self._reload_version or self.writer.pending:
+            # 読み直している間に編集された場合は、その変更を書き込んでから読み直す
+            self.root.after(LOAD_POLL_MS, self._retry_external_reload)
+            return
+        self.storage.finish_load(reloader.result)
+        self.apply_external_tasks(tasks)
+
+    def _retry_external_reload(self):
+        """書き込み待ちの変更がなくなってから読み直す"""
+        if self.writer.pending or self.loading:
+            self.root.after(LOAD_POLL_MS, self._retry_external_reload)
+            return
+        self._start_external_reload()
+
+    def apply_external_tasks(self, tasks):
+        """外部で変更されたタスクの一覧とタグリストを、差分だけ反映する"""
+        added, updated, removed = self.store.apply_snapshot(tasks)
+        self.selection.discard(removed)
+        try:
+            tags = self.storage.load_tags()
+        except (IOError, OSError, sqlite3.Error):
+            tags = self.tags
+        if tags != self.tags:
+            self.tags = tags
+            self.extract_tags_from_tasks()
+            self.update_tags_list()
+        if added or updated or removed:
+            self.apply_filters_and_sort()
+            self._sync_tags()
+        return added, updated, removed
+
+    def record_changes(self, ops):
+        """変更操作 (op, task_id, data) のリストを書き込みキューに積む（ファイルへの書き込みは待たない）"""
+        self._report_write_errors()
+        self.writer.submit(self.tasks, ops)
+
+    def _report_write_errors(self):
+        """バックグラウンドの書き込みで起きたエラーを表示する"""
+        errors = self.writer.pop_errors()
+        if errors:
+            messagebox.showerror("エラー", f"ファイルへの保存に失敗しました: {errors[-1]}")
+
     # --- タスク操作 (CRUD) ---
     def add_task(self):
-        task_name = self.task_entry.get().strip()
-        if not task_name:
-            messagebox.showwarning("入力エラー", "タスク名を入力してください。")
+        try:
+            self.model.add_task(self.task_entry.get(), self.priority_var.get(),
+                                format_due_date(self.due_date_entry.get_date()),
+                                self.tags_var.get(), self.today_var.get())
+        except ValueError as e:
+            messagebox.showwarning("入力エラー", str(e))
             return
-        
-        due_date = self.due_date_entry.get_date()
-        if due_date:
-            due_date_str = due_date.strftime("%Y-%m-%d")
-        else:
-            due_date_str = ""
-
-        new_task = {
-            "id": str(uuid.uuid4()),
-            "name": task_name,
-            "status": "未着手",
-            "priority": self.priority_var.get(),
-            "due_date": due_date_str,
-            "tags": self.tags_var.get(),
-            "today": self.today_var.get()
-        }
-        self.tasks.append(new_task)
         # タスク名のみクリア、タグと期限日は保持
         self.task_entry.delete(0, tk.END)
         self.priority_var.set(PRIORITY_LEVELS[1])
         # タグと期限日はクリアしない
         self.apply_filters_and_sort()
-        # 新しいタグを保存
-        self.extract_tags_from_tasks()
-        # 未使用タグをクリーンアップ
-        self.cleanup_unused_tags()
-        # CSVに保存
-        self.save_tasks()
+        # 増減したタグだけをタグリストに反映
+        self._sync_tags()
 
     def get_selected_task_ids(self):
-        """チェックボックスで選択されたタスクのIDを取得"""
-        selected_ids = []
-        
-        # 一覧タブのチェックボックス
-        for item in self.task_tree.get_children():
-            values = self.task_tree.item(item, 'values')
-            if values and values[0] == "☑":
-                task_name = values[3]  # タスク名は4番目の列
-                for t in self.view_tasks:
-                    if t["name"] == task_name:
-                        selected_ids.append(t["id"])
-                        break
-        
-        # 今日タブのチェックボックス
-        for item in self.today_tree.get_children():
-            values = self.today_tree.item(item, 'values')
-            if values and values[0] == "☑":
-                task_name = values[3]  # タスク名は4番目の列
-                for t in self.view_today_tasks:
-                    if t["name"] == task_name:
-                        selected_ids.append(t["id"])
-                        break
-        
-        # 完了タブのチェックボックス
-        for item in self.completed_tree.get_children():
-            values = self.completed_tree.item(item, 'values')
-            if values and values[0] == "☑":
-                task_name = values[3]  # タスク名は4番目の列
-                for t in self.view_completed_tasks:
-                    if t["name"] == task_name:
-                        selected_ids.append(t["id"])
-                        break
-        
-        return selected_ids
+        """チェックボックスで選択されたタスクのIDを取得（チェックした順）"""
+        return self.selection.ids()
 
     def delete_task(self):
+        if self.loading:
+            return
         selected_task_ids = self.get_selected_task_ids()
         if not selected_task_ids:
             messagebox.showwarning("選択エラー", "削除するタスクを選択してください。")
@@ -692,15 +1295,22 @@ class TaskApp:
         if not messagebox.askyesno("確認", f"選択された{len(selected_task_ids)}個のタスクを削除しますか？"):
             return
 
-        # マスターリストからIDでタスクを検索して削除
-        self.tasks = [t for t in self.tasks if t["id"] not in selected_task_ids]
+        archived = self._archived_ids(selected_task_ids)
+        if archived:
+            # アーカイブのタスクは月のファイルから取り除く
+            try:
+                self.model.delete_archived(archived)
+            except (IOError, OSError) as e:
+                messagebox.showerror("エラー", f"アーカイブからの削除に失敗しました: {e}")
+            self._drop_archived_rows(archived)
+        # マスターリストからIDでタスクを削除
+        self.model.delete_tasks(selected_task_ids)
+        self.selection.discard(selected_task_ids)
         
         self._clear_inputs()
         self.apply_filters_and_sort()
-        # 未使用タグをクリーンアップ
-        self.cleanup_unused_tags()
-        # CSVに保存
-        self.save_tasks()
+        # 使われなくなったタグを片付ける
+        self._sync_tags()
 
     def update_task(self):
         new_name = self.task_entry.get().strip()
@@ -708,119 +1318,107 @@ class TaskApp:
             messagebox.showwarning("入力エラー", "タスク名を入力してください。")
             return
             
-        due_date = self.due_date_entry.get_date()
-        if due_date:
-            due_date_str = due_date.strftime("%Y-%m-%d")
-        else:
-            due_date_str = ""
-
         # どのタブでタスクが選択されているかチェック
-        selected_items = self.task_tree.selection()
-        if selected_items:
-            selected_item = selected_items[0]
-            values = self.task_tree.item(selected_item, 'values')
-            if values:
-                task_name = values[3]  # タスク名は4番目の列
-                selected_task_id = None
-                for t in self.view_tasks:
-                    if t["name"] == task_name:
-                        selected_task_id = t["id"]
-                        break
-        else:
-            selected_items = self.today_tree.selection()
-            if selected_items:
-                selected_item = selected_items[0]
-                values = self.today_tree.item(selected_item, 'values')
-                if values:
-                    task_name = values[3]  # タスク名は4番目の列
-                    selected_task_id = None
-                    for t in self.view_today_tasks:
-                        if t["name"] == task_name:
-                            selected_task_id = t["id"]
-                            break
-            else:
-                selected_items = self.completed_tree.selection()
-                if selected_items:
-                    selected_item = selected_items[0]
-                    values = self.completed_tree.item(selected_item, 'values')
-                    if values:
-                        task_name = values[3]  # タスク名は4番目の列
-                        selected_task_id = None
-                        for t in self.view_completed_tasks:
-                            if t["name"] == task_name:
-                                selected_task_id = t["id"]
-                                break
-                else:
-                    messagebox.showwarning("選択エラー", "更新するタスクを選択してください。")
-                    return
-        
+        selected_task_id = self._get_selected_tree_task_id()
         if not selected_task_id:
             messagebox.showwarning("選択エラー", "更新するタスクを選択してください。")
             return
         
         # マスターリストからIDでタスクを検索して更新
-        for task in self.tasks:
-            if task["id"] == selected_task_id:
-                task["name"] = new_name
-                task["priority"] = self.priority_var.get()
-                task["due_date"] = due_date_str
-                task["tags"] = self.tags_var.get()
-                task["today"] = self.today_var.get()
-                break
+        changes = {
+            "name": new_name,
+            "priority": self.priority_var.get(),
+            "due_date": format_due_date(self.due_date_entry.get_date()),
+            "tags": self.tags_var.get(),
+            "today": self.today_var.get()
+        }
+        self.model.update_task(selected_task_id, changes)
         
         self.apply_filters_and_sort()
-        # 新しいタグを保存
-        self.extract_tags_from_tasks()
-        # 未使用タグをクリーンアップ
-        self.cleanup_unused_tags()
-        # CSVに保存
-        self.save_tasks()
+        # 増減したタグだけをタグリストに反映
+        self._sync_tags()
 
     def toggle_task_status(self):
+        if self.loading:
+            return
         selected_task_ids = self.get_selected_task_ids()
         if not selected_task_ids:
             messagebox.showwarning("選択エラー", "状態を変更するタスクを選択してください。")
             return
 
-        # マスターリストからIDでタスクを検索して状態を切り替え
-        for task in self.tasks:
-            if task["id"] in selected_task_ids:
-                task["status"] = "完了" if task["status"] == "未着手" else "未着手"
+        archived = self._archived_ids(selected_task_ids)
+        if archived:
+            # アーカイブのタスクは未着手に戻してマスターリストへ戻す
+            try:
+                self.model.restore_archived(archived)
+            except (IOError, OSError) as e:
+                messagebox.showerror("エラー", f"アーカイブからの取り出しに失敗しました: {e}")
+            self._drop_archived_rows(archived)
+        # IDでタスクを取得して状態を切り替え
+        self.model.toggle_status([task_id for task_id in selected_task_ids if task_id not in archived])
         
         self.apply_filters_and_sort()
-        # CSVに保存
-        self.save_tasks()
+        if archived:
+            self._sync_tags()
 
     def toggle_today_status(self):
+        if self.loading:
+            return
         selected_task_ids = self.get_selected_task_ids()
         if not selected_task_ids:
             messagebox.showwarning("選択エラー", "タスクを選択してください。")
             return
 
-        # マスターリストからIDでタスクを検索して今日やる属性を切り替え
-        for task in self.tasks:
-            if task["id"] in selected_task_ids:
-                task["today"] = TODAY_OPTIONS[0] if task["today"] == TODAY_OPTIONS[1] else TODAY_OPTIONS[1]
+        selected_task_ids = self._split_archived(selected_task_ids)
+        if not selected_task_ids:
+            return
+
+        # IDでタスクを取得して今日やる属性を切り替え
+        self.model.toggle_today(selected_task_ids)
         
         self.apply_filters_and_sort()
-        # CSVに保存
-        self.save_tasks()
+
+    def bulk_edit(self):
+        """チェックしたタスクの状態・優先度・期限日・タグ・今日やるをまとめて変更する"""
+        if self.loading:
+            return
+        selected_task_ids = self.get_selected_task_ids()
+        if not selected_task_ids:
+            messagebox.showwarning("選択エラー", "変更するタスクを選択してください。")
+            return
+        selected_task_ids = self._split_archived(selected_task_ids)
+        if not selected_task_ids:
+            return
+        changes = BulkEditWindow(self.root, len(selected_task_ids)).show()
+        if changes:
+            self.apply_bulk_changes(selected_task_ids, changes)
+
+    def apply_bulk_changes(self, task_ids, changes):
+        """タスクに変更をまとめて適用し、表示の更新とタグの反映を1回ずつ行う（変更したIDを返す）"""
+        try:
+            changed = self.model.bulk_update(task_ids, changes)
+        except ValueError as e:
+            messagebox.showwarning("入力エラー", str(e))
+            return []
+        if changed:
+            self.apply_filters_and_sort()
+            # 増減したタグだけをタグリストに反映
+            self._sync_tags()
+        return changed
 
     def on_tags_input(self, event):
         """タグ入力時の処理"""
         # 入力されたテキストを取得
         input_text = self.tags_var.get().strip()
         if input_text:
-            # カンマで区切られたタグを分割
-            new_tags = [tag.strip() for tag in input_text.split(',') if tag.strip()]
-            # 新しいタグを既存のタグリストに追加
-            for tag in new_tags:
-                if tag not in self.tags:
-                    self.tags.append(tag)
+            # カンマで区切られたタグのうち新しいものを既存のタグリストに追加
+            # （タスクで使われなければ次の変更時に片付ける）
+            if not self.model.add_tags_from_text(input_text):
+                return
             # タグリストを更新
             self.update_tags_list()
             # タグを保存
-            self.save_tags()
+            self._queue_save_tags()
 
     def on_tags_selected(self, event):
         """タグ選択時の処理"""
@@ -828,77 +1426,73 @@ class TaskApp:
         selected_tag = self.tags_var.get()
         if selected_tag:
             # 選択されたタグが既存のタグリストにない場合は追加
-            if selected_tag not in self.tags:
-                self.tags.append(selected_tag)
+            if self.model.add_tags([selected_tag]):
                 self.update_tags_list()
-                self.save_tags()
+                self._queue_save_tags()
 
     def load_tags(self):
         """タグファイルからタグを読み込む"""
-        self.tags = []
-        
-        # データフォルダが存在しない場合は作成
-        if not os.path.exists(self.data_folder):
-            os.makedirs(self.data_folder)
-            
-        if not os.path.exists(self.tags_file):
-            return
-
         try:
-            with open(self.tags_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    tag = line.strip()
-                    if tag and tag not in self.tags:
-                        self.tags.append(tag)
+            self.model.load_tags()
         except Exception as e:
             messagebox.showerror("エラー", f"タグファイルの読み込みに失敗しました: {e}")
             self.tags = []
         
         self.update_tags_list()
 
+    @timed("save_tags")
     def save_tags(self):
         """現在のタグリストをファイルに保存する"""
-        # データフォルダが存在しない場合は作成
-        if not os.path.exists(self.data_folder):
-            os.makedirs(self.data_folder)
-            
         try:
-            with open(self.tags_file, 'w', encoding='utf-8') as f:
-                for tag in self.tags:
-                    f.write(f"{tag}\n")
-        except IOError as e:
+            self.model.save_tags()
+            self.watcher.acknowledge(self.storage.tags_paths())
+        except (IOError, OSError) as e:
             messagebox.showerror("エラー", f"タグファイルへの保存に失敗しました: {e}")
 
+    def _queue_save_tags(self):
+        """現在のタグリストの保存を書き込みキューに積む"""
+        self._report_write_errors()
+        self.writer.submit_tags(self.tags)
+
     def update_tags_list(self):
         """タグのコンボボックスリストを更新する"""
         self.tags_combo['values'] = self.tags
 
+    @timed("extract_tags_from_tasks")
     def extract_tags_from_tasks(self):
         """既存のタスクからタグを抽出してタグリストを更新する"""
-        for task in self.tasks:
-            if task.get("tags"):
-                tags = [tag.strip() for tag in task["tags"].split(',') if tag.strip()]
-                for tag in tags:
-                    if tag not in self.tags:
-                        self.tags.append(tag)
-        self.update_tags_list()
-        self.save_tags()
+        # タグの転置索引にあるタグのうち、タグリストにないものを追加
+        if self.model.extract_tags_from_tasks():
+            self.update_tags_list()
+            self._queue_save_tags()
 
+    @timed("cleanup_unused_tags")
     def cleanup_unused_tags(self):
         """利用されていないタグを削除する"""
-        # 現在使用されているタグを収集
-        used_tags = set()
-        for task in self.tasks:
-            if task.get("tags"):
-                tags = [tag.strip() for tag in task["tags"].split(',') if tag.strip()]
-                used_tags.update(tags)
-        
-        # 使用されていないタグを削除
-        self.tags = [tag for tag in self.tags if tag in used_tags]
-        self.update_tags_list()
-        self.save_tags()
+        # 参照数が0のタグを削除
+        if self.model.cleanup_unused_tags():
+            self.update_tags_list()
+            self._queue_save_tags()
+
+    @timed("sync_tags")
+    def _sync_tags(self):
+        """タスクの変更で増減したタグだけをタグリストに反映する（変化があったときだけ保存）"""
+        if self.model.sync_tags():
+            self.update_tags_list()
+            self._queue_save_tags()
+
+    def _get_selected_tree_task_id(self):
+        """一覧・今日・完了の順に、Treeviewで選択中の行のタスクIDを返す"""
+        for tree in (self.task_tree, self.today_tree, self.completed_tree):
+            selected_items = tree.selection()
+            if selected_items:
+                task = self.store.get(selected_items[0])
+                return task["id"] if task else None
+        return None
 
     def add_or_update_task(self):
+        if self.loading:
+            return
         # どのタブでもタスクが選択されているかチェック
         selected_items = self.task_tree.selection()
         if not selected_items:
@@ -918,17 +1512,65 @@ class TaskApp:
 
     def show_settings(self):
         """設定ウィンドウを表示する"""
-        settings_window = SettingsWindow(self.root, self.data_folder)
+        if self.loading:
+            return
+        settings = load_settings(self.data_folder)
+        settings_window = SettingsWindow(self.root, self.data_folder, self.storage.name, self.perf.enabled,
+                                         archive_after_days(settings))
         new_data_folder = settings_window.show()
+        new_backend = settings_window.result_storage_backend
         
-        if new_data_folder and new_data_folder != self.data_folder:
+        if settings_window.result_perf_monitor != self.perf.enabled:
+            try:
+                settings = load_settings(self.data_folder)
+                settings[PERF_SETTING] = settings_window.result_perf_monitor
+                save_settings(self.data_folder, settings)
+            except (IOError, OSError) as e:
+                messagebox.showerror("エラー", f"設定の保存に失敗しました: {e}")
+            self._configure_perf()
+        
+        if settings_window.result_archive_after_days != archive_after_days(settings):
+            try:
+                settings = load_settings(self.data_folder)
+                settings[ARCHIVE_SETTING] = settings_window.result_archive_after_days
+                save_settings(self.data_folder, settings)
+            except (IOError, OSError) as e:
+                messagebox.showerror("エラー", f"設定の保存に失敗しました: {e}")
+            # 短くした場合は、すでに日数がたった完了タスクをすぐにアーカイブへ移す
+            self._archive_completed()
+            self.apply_filters_and_sort(tab="完了")
+        
+        folder_changed = bool(new_data_folder) and new_data_folder != self.data_folder
+        backend_changed = new_backend != self.storage.name
+        if not folder_changed and not backend_changed:
+            return
+        
+        # 書き込み待ちの変更を今のストレージに書き込んでから切り替える
+        self.writer.close()
+        self._report_write_errors()
+        self.watcher.close()
+        self.storage.close()
+        if folder_changed:
             self.data_folder = new_data_folder
-            self.data_file = os.path.join(self.data_folder, "tasks.csv")
-            self.tags_file = os.path.join(self.data_folder, "tags.txt")
-            
-            # データを再読み込み
-            self.load_tags()
-            self.load_tasks()
+        self.storage = create_storage(new_backend, self.data_folder)
+        self._open_writer_and_watcher()
+        
+        try:
+            if not folder_changed:
+                # 同じフォルダで保存形式だけ変えた場合は、現在のデータを新しい形式で書き出す
+                self.model.save()
+                self.model.save_tags()
+                self.watcher.acknowledge()
+            settings = load_settings(self.data_folder)
+            settings["storage_backend"] = new_backend
+            save_settings(self.data_folder, settings)
+        except (IOError, OSError, sqlite3.Error) as e:
+            messagebox.showerror("エラー", f"設定の保存に失敗しました: {e}")
+        
+        # データを再読み込み（計測の設定は新しいデータフォルダのものを使う）
+        self._configure_perf()
+        self.load_tags()
+        self.load_tasks()
 
     def on_tree_click(self, event):
         """一覧タブのTreeviewクリック時の処理"""
@@ -938,7 +1580,7 @@ class TaskApp:
             if column == "#1":  # 選択列
                 item = self.task_tree.identify_row(event.y)
                 if item:
-                    self._toggle_checkbox(self.task_tree, item, self.view_tasks)
+                    self._toggle_checkbox(self.task_view, item)
     
     def on_completed_tree_click(self, event):
         """完了タブのTreeviewクリック時の処理"""
@@ -948,7 +1590,7 @@ class TaskApp:
             if column == "#1":  # 選択列
                 item = self.completed_tree.identify_row(event.y)
                 if item:
-                    self._toggle_checkbox(self.completed_tree, item, self.view_completed_tasks)
+                    self._toggle_checkbox(self.completed_view, item)
     
     def on_today_tree_click(self, event):
         """今日タブのTreeviewクリック時の処理"""
@@ -958,30 +1600,66 @@ class TaskApp:
             if column == "#1":  # 選択列
                 item = self.today_tree.identify_row(event.y)
                 if item:
-                    self._toggle_checkbox(self.today_tree, item, self.view_today_tasks)
+                    self._toggle_checkbox(self.today_view, item)
     
-    def _toggle_checkbox(self, tree, item, task_list):
+    def _toggle_checkbox(self, view, item):
         """チェックボックスの状態を切り替える（CSVには保存しない）"""
-        values = list(tree.item(item, 'values'))
-        
-        # チェックボックスの状態を切り替え
-        if values[0] == "□":
-            values[0] = "☑"
-        else:
-            values[0] = "□"
-        
-        tree.item(item, values=values)
+        # 行のキーがタスクのidなので、チェック状態の集合をそのまま切り替える
+        self.selection.toggle(item)
+        self._refresh_checkbox(item)
+
+    def _refresh_checkbox(self, task_id):
+        """タスクを表示している行のチェックボックスをチェック状態に合わせる"""
+        glyph = self.selection.glyph(task_id)
+        for view in (self.task_view, self.completed_view, self.today_view):
+            index = view.find(task_id)
+            if index is not None:
+                values = view.row_values(index)
+                if values[0] != glyph:
+                    # 仮想リストの論理行に保持し、スクロールで再描画されても消えないようにする
+                    view.set_row_values(index, (glyph,) + tuple(values[1:]))
+
+    def toggle_check_all(self, tab):
+        """タブに表示しているタスクをすべてチェックする（すべてチェック済みならすべて外す）"""
+        tasks = {"一覧": self.view_tasks, "完了": self.view_completed_tasks, "今日": self.view_today_tasks}[tab]
+        self.selection.toggle_all(task["id"] for task in tasks)
+        # チェックボックスの列だけが変わるので、差分の描画で変わった行だけが更新される
+        self._populate_listbox([tab])
 
 def on_closing(app):
     """アプリケーション終了時の処理"""
-    app.save_tasks()
+    # 書き込み待ちの変更をすべて書き込むまで待つ
+    if app.importing:
+        app.cancel_import(notify=False)  # 取り込み途中なら中止し、取り込み済みの分だけ書き込む
+    app.writer.close()
+    if app.loading:
+        app.cancel_loading()  # 読み込み途中なら中止し、ファイルは読み込み前のまま残す
+    else:
+        app.save_tasks()  # 他のインスタンスの変更とマージしてスナップショットに保存
     app.save_tags()  # タグも保存
+    app.watcher.close()
+    app.storage.close()
+    app.perf.close()
     app.root.destroy()
 
+def create_root():
+    """
+    メインウィンドウを作る
+
+    tkinterdnd2 はここで初めて読み込み、読み込めなければドロップでの取り込みなしの通常のウィンドウにする。
+    """
+    try:
+        from tkinterdnd2 import TkinterDnD
+    except ImportError:
+        return tk.Tk()
+    return TkinterDnD.Tk()
+
 # --- アプリケーションの実行 ---
 if __name__ == "__main__":
-    root = TkinterDnD.Tk()
+    root = create_root()
     app = TaskApp(root)
     root.protocol("WM_DELETE_WINDOW", lambda: on_closing(app))
     root.mainloop()
+    # 「終了」ボタンで抜けた場合も書き込み待ちの変更を失わないようにする
+    app.writer.close()
 
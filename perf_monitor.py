@@ -0,0 +1,163 @@
+"""
+taskcon 処理時間の計測
+
+読み込み・絞り込み・描画・保存・タグの整理などの段階ごとに処理時間を測り、
+直近 PERF_WINDOW 回の中央値（p50）・95パーセンタイル（p95）・最大値を保持する。
+計測した1回ごとの結果は JSON Lines のログにも書き出せる（あとで集計するため）。
+計測は設定（settings.json の perf_monitor）か環境変数 TASKCON_PERF で有効にする。
+"""
+
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+PERF_ENV = "TASKCON_PERF"  # 1 で計測を有効、0 で無効にする環境変数（設定より優先）
+PERF_LOG_ENV = "TASKCON_PERF_LOG"  # 計測ログの書き出し先を指定する環境変数
+PERF_LOG_FILE_NAME = "perf.jsonl"  # 計測ログのファイル名（データフォルダに作る）
+PERF_SETTING = "perf_monitor"  # 計測の有効/無効を保存する設定のキー
+PERF_WINDOW = 200  # 統計に使う直近の計測回数
+
+
+def perf_enabled(settings, environ=os.environ):
+    """環境変数と設定から計測を有効にするかを決める（環境変数が優先）"""
+    value = environ.get(PERF_ENV, "").strip().lower()
+    if value in ("1", "true", "on", "yes"):
+        return True
+    if value in ("0", "false", "off", "no"):
+        return False
+    return bool(settings.get(PERF_SETTING, False))
+
+
+def percentile(sorted_values, fraction):
+    """並べた値の fraction（0〜1）の位置の値（最も近い順位の方式）"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class PerfMonitor:
+    """
+    段階ごとの処理時間を集める計測器
+
+    enabled が偽のあいだは measure / timed は何もしない（時刻も取らない）。
+    log_path を渡すと、計測するたびに {"time", "stage", "ms", ...context()} を1行ずつ追記する。
+    on_record を渡すと、計測するたびに段階名と統計を渡して呼ぶ（ステータスバーの更新用）。
+    """
+
+    def __init__(self, enabled=False, log_path=None, window=PERF_WINDOW, context=None, on_record=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.window = window
+        self.context = context  # ログに加える情報（タスク数など）を返す関数
+        self.on_record = on_record
+        self._samples = {}  # 段階名 -> 直近の処理時間（ミリ秒）
+        self._log = None
+
+    def measure(self, stage):
+        """with 文で囲んだ処理の時間を stage として計測する"""
+        return _Measurement(self, stage)
+
+    def record(self, stage, seconds):
+        """計測した処理時間（秒）を記録する"""
+        if not self.enabled:
+            return
+        ms = seconds * 1000
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+        samples.append(ms)
+        if self.log_path:
+            self._write_log(stage, ms)
+        if self.on_record is not None:
+            self.on_record(stage, self.stats(stage))
+
+    def _write_log(self, stage, ms):
+        entry = {"time": datetime.now().isoformat(timespec="milliseconds"), "stage": stage, "ms": round(ms, 3)}
+        if self.context is not None:
+            entry.update(self.context())
+        try:
+            if self._log is None:
+                folder = os.path.dirname(self.log_path)
+                if folder and not os.path.exists(folder):
+                    os.makedirs(folder)
+                self._log = open(self.log_path, "a", encoding="utf-8", buffering=1)
+            self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError:
+            # 計測ログが書けなくてもアプリの動作は止めない
+            self.log_path = None
+
+    def stats(self, stage):
+        """段階の統計 {"count", "last", "p50", "p95", "max"}（ミリ秒。計測がなければNone）"""
+        samples = self._samples.get(stage)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            "count": len(samples),
+            "last": samples[-1],
+            "p50": percentile(ordered, 0.5),
+            "p95": percentile(ordered, 0.95),
+            "max": ordered[-1],
+        }
+
+    def summary(self):
+        """計測したすべての段階の統計（段階名 -> 統計）"""
+        return {stage: self.stats(stage) for stage in self._samples}
+
+    def set_enabled(self, enabled, log_path=None):
+        """計測の有効/無効を切り替える（無効にすると統計を消してログを閉じる）"""
+        if not enabled or log_path != self.log_path:
+            self.close()
+        self.enabled = enabled
+        self.log_path = log_path if enabled else None
+        if not enabled:
+            self._samples.clear()
+
+    def close(self):
+        """計測ログを閉じる"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+class _Measurement:
+    """PerfMonitor.measure が返す with 文用のオブジェクト"""
+
+    __slots__ = ("monitor", "stage", "start")
+
+    def __init__(self, monitor, stage):
+        self.monitor = monitor
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        if self.monitor.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start is not None:
+            self.monitor.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def timed(stage):
+    """メソッドの処理時間を self.perf（PerfMonitor）で stage として計測するデコレーター"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            monitor = getattr(self, "perf", None)
+            if monitor is None or not monitor.enabled:
+                return func(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                monitor.record(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+"""
+taskcon 全文検索インデックス
+
+タスク名とタグを正規化（NFKC・小文字化・カタカナをひらがなに統一）した文字列から
+文字1-gram・2-gramの転置索引を作り、検索語を含むタスクを索引の候補から探す。
+"""
+
+import unicodedata
+
+NGRAM_SIZE = 2  # 索引に登録する最長の文字n-gram
+_KATAKANA_START = ord("ァ")
+_KATAKANA_END = ord("ヶ")
+_KANA_OFFSET = ord("ァ") - ord("ぁ")
+# カタカナ -> ひらがな の変換表（str.translate で一度に置き換える）
+_KATAKANA_TO_HIRAGANA = {code: code - _KANA_OFFSET for code in range(_KATAKANA_START, _KATAKANA_END + 1)}
+
+
+def normalize_text(text):
+    """全角/半角・大文字/小文字・ひらがな/カタカナの違いをなくした文字列を返す"""
+    return unicodedata.normalize("NFKC", text or "").casefold().translate(_KATAKANA_TO_HIRAGANA)
+
+
+def parse_query(query):
+    """検索語を正規化し、空白で区切った語のリストにする（すべての語を含むタスクが一致）"""
+    return normalize_text(query).split()
+
+
+def relevance(name, terms):
+    """
+    関連度の並び替えキー（小さいほど関連が高い。name は正規化済みのタスク名）
+
+    名前で一致した語が多いほど、名前の先頭に近い位置で一致するほど、名前が短いほど上位にする。
+    """
+    name_hits = 0
+    first_position = len(name)
+    for term in terms:
+        position = name.find(term)
+        if position >= 0:
+            name_hits += 1
+            first_position = min(first_position, position)
+    return (-name_hits, first_position, len(name))
+
+
+def scan(tasks, terms, ranked=False):
+    """
+    索引を作らずに、すべての語を名前かタグに含むタスクを1回の走査で探す
+
+    1回だけ検索するときは索引を作るより速い。ranked=True のときは関連度の高い順（同じなら元の順）。
+    """
+    matched = []
+    for task in tasks:
+        name, tags = normalize_text(task.get("name")), normalize_text(task.get("tags"))
+        if all(term in name or term in tags for term in terms):
+            matched.append((relevance(name, terms) if ranked else None, task))
+    if ranked:
+        matched.sort(key=lambda item: item[0])
+    return [task for _, task in matched]
+
+
+def _ngrams(text):
+    """文字列に含まれる1-gramから NGRAM_SIZE-gram までの集合"""
+    grams = set(text)
+    for size in range(2, NGRAM_SIZE + 1):
+        grams.update(text[i:i + size] for i in range(len(text) - size + 1))
+    return grams
+
+
+class SearchIndex:
+    """
+    タスクIDを引く文字n-gramの転置索引
+
+    _texts にはタスクごとの正規化済みの名前とタグ、_postings には n-gram -> タスクIDの集合 を持つ。
+    検索では語のn-gramのうち最も一致の少ないものから候補を絞り、候補だけを文字列で確かめるので、
+    全タスク数ではなく一致件数に比例した時間で済む。
+    """
+
+    def __init__(self):
+        self._texts = {}  # タスクID -> (正規化済みの名前, 正規化済みのタグ)
+        self._postings = {}  # n-gram -> タスクIDの集合
+
+    def __len__(self):
+        return len(self._texts)
+
+    def rebuild(self, tasks):
+        """すべてのタスクから索引を作り直す"""
+        self._texts = {}
+        self._postings = {}
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        """タスクを索引に登録する"""
+        task_id = task["id"]
+        if task_id in self._texts:
+            self.remove(task_id)
+        name, tags = normalize_text(task.get("name")), normalize_text(task.get("tags"))
+        self._texts[task_id] = (name, tags)
+        for gram in _ngrams(name) | _ngrams(tags):
+            self._postings.setdefault(gram, set()).add(task_id)
+
+    def remove(self, task_id):
+        """タスクを索引から外す"""
+        texts = self._texts.pop(task_id, None)
+        if texts is None:
+            return
+        for gram in _ngrams(texts[0]) | _ngrams(texts[1]):
+            task_ids = self._postings.get(gram)
+            if task_ids is not None:
+                task_ids.discard(task_id)
+                if not task_ids:
+                    del self._postings[gram]
+
+    def _candidates(self, term):
+        """語を含む可能性のあるタスクIDの集合（n-gramの一致件数が最も少ないもの）"""
+        if len(term) <= NGRAM_SIZE:
+            return self._postings.get(term, set())
+        grams = [term[i:i + NGRAM_SIZE] for i in range(len(term) - NGRAM_SIZE + 1)]
+        return min((self._postings.get(gram, set()) for gram in grams), key=len)
+
+    def search(self, terms):
+        """すべての語を含むタスクIDの集合を返す（terms は parse_query の結果）"""
+        if not terms:
+            return set(self._texts)
+        terms = sorted(set(terms), key=lambda term: len(self._candidates(term)))
+        matched = set(self._candidates(terms[0]))
+        for term in terms:
+            matched = {task_id for task_id in matched if self._contains(task_id, term)}
+            if not matched:
+                break
+        return matched
+
+    def estimate(self, terms):
+        """すべての語を含むタスクの数の見積もり（最も候補の少ない語の候補の数。実際の件数以上）"""
+        if not terms:
+            return len(self._texts)
+        return min(len(self._candidates(term)) for term in terms)
+
+    def matches(self, task_id, terms):
+        """タスクがすべての語を含むか"""
+        return task_id in self._texts and all(self._contains(task_id, term) for term in terms)
+
+    def _contains(self, task_id, term):
+        name, tags = self._texts[task_id]
+        return term in name or term in tags
+
+    def score(self, task_id, terms):
+        """関連度の並び替えキー（小さいほど関連が高い。relevance を参照）"""
+        return relevance(self._texts.get(task_id, ("", ""))[0], terms)
@@ -0,0 +1,78 @@
+"""
+taskcon チェック状態の管理
+
+一覧・今日・完了タブのチェックボックスでチェックされたタスクIDを集合で持つ。
+チェックボックスの表示（□/☑）はこの集合から作るので、表示を作り直してもチェックは消えない。
+まとめて操作する対象のIDは、タスク全体ではなくチェックした件数分の手間で取り出せる。
+"""
+
+CHECKED = "☑"
+UNCHECKED = "□"
+
+
+class SelectionModel:
+    """
+    チェックされたタスクIDの集合
+
+    _ids は タスクID -> None の辞書で、チェックした順を保つ（まとめて操作するときの順になる）。
+    """
+
+    def __init__(self):
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, task_id):
+        return task_id in self._ids
+
+    def ids(self):
+        """チェックされたタスクIDのリスト（チェックした順）"""
+        return list(self._ids)
+
+    def glyph(self, task_id):
+        """チェックボックスの表示文字"""
+        return CHECKED if task_id in self._ids else UNCHECKED
+
+    def toggle(self, task_id):
+        """チェックを切り替え、切り替えた後にチェックされていれば True を返す"""
+        if task_id in self._ids:
+            del self._ids[task_id]
+            return False
+        self._ids[task_id] = None
+        return True
+
+    def set_checked(self, task_ids, checked=True):
+        """タスクIDをまとめてチェックする（checked=False ならチェックを外す）"""
+        if checked:
+            self._ids.update(dict.fromkeys(task_ids))
+        else:
+            self.discard(task_ids)
+
+    def all_checked(self, task_ids):
+        """タスクIDがすべてチェックされているか（空なら False）"""
+        task_ids = list(task_ids)
+        return bool(task_ids) and all(task_id in self._ids for task_id in task_ids)
+
+    def toggle_all(self, task_ids):
+        """タスクIDがすべてチェックされていれば外し、そうでなければすべてチェックする"""
+        task_ids = list(task_ids)
+        checked = not self.all_checked(task_ids)
+        self.set_checked(task_ids, checked)
+        return checked
+
+    def discard(self, task_ids):
+        """タスクIDのチェックを外す（削除されたタスクなど）"""
+        for task_id in task_ids:
+            self._ids.pop(task_id, None)
+
+    def retain(self, exists):
+        """exists(タスクID) が偽になったタスクのチェックを外す（チェックした件数分だけ調べる）"""
+        self.discard([task_id for task_id in self._ids if not exists(task_id)])
+
+    def clear(self):
+        """すべてのチェックを外す"""
+        self._ids.clear()
@@ -0,0 +1,113 @@
+"""
+taskcon タスクのスナップショットのキャッシュ
+
+tasks.csv を読み込んだ結果（タスクの項目ごとの列と版、タグ -> タスクIDの索引）を
+データフォルダの tasks.snapshot に marshal のバイナリで保存しておき、次の起動ではCSVを解析せずに読み込む。
+キャッシュには元の tasks.csv のサイズ・更新時刻・内容のハッシュ（BLAKE2b）を記録し、
+すべてが一致するときだけメモリマップして読み込む。一致しない・形式の版が違う・壊れているときは
+使わない（呼び出し側がCSVを読み、読んだ結果でキャッシュを作り直す）。
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+from operator import attrgetter, itemgetter
+
+from file_watcher import file_signature
+from task_record import TASK_FIELDS, TaskRecord, tag_tuple, task_values, task_version
+
+SNAPSHOT_FILE_NAME = "tasks.snapshot"
+SNAPSHOT_MAGIC = b"TCSNAP\0\0"
+SNAPSHOT_FORMAT_VERSION = 1  # 中身の形を変えたら上げる（古い形式のキャッシュは使わない）
+MARSHAL_VERSION = 4
+HASH_CHUNK_SIZE = 1024 * 1024
+# 先頭の見出し: 識別子, 形式の版, 元のファイルのサイズ, 更新時刻(ns), 本体のバイト数, 元のファイルのハッシュ
+_HEADER = struct.Struct("<8sIQqQ32s")
+
+
+def source_key(path):
+    """ファイルの (サイズ, 更新時刻(ns), 内容のハッシュ)（なければNone）"""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        # 開いたファイルの情報を使うので、読んでいる間に置き換えられても内容と食い違わない
+        stat = os.fstat(f.fileno())
+        digest = hashlib.blake2b(digest_size=32)
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return (stat.st_size, stat.st_mtime_ns, digest.digest())
+
+
+def _tag_ids(columns):
+    """項目ごとの列から タグ -> タスクIDのタプル を作る（タグは最初に使われた順）"""
+    ids_by_tags = {}
+    for task_id, tags in zip(columns[TASK_FIELDS.index("id")], columns[TASK_FIELDS.index("tags")]):
+        ids_by_tags.setdefault(tags, []).append(task_id)
+    # 同じタグ文字列のタスクはまとめて登録する（最初に現れた順なので、タグの順も1件ずつ登録したときと同じ）
+    tag_ids = {}
+    for tags, task_ids in ids_by_tags.items():
+        for tag in tag_tuple(tags):
+            tag_ids.setdefault(tag, []).extend(task_ids)
+    return {tag: tuple(task_ids) for tag, task_ids in tag_ids.items()}
+
+
+class SnapshotCache:
+    """元のCSVファイルと対になるスナップショットのキャッシュファイル"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def is_fresh(self, source_path):
+        """キャッシュの見出しが source_path のサイズと更新時刻に一致するか（ハッシュは load() で確かめる）"""
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, size, mtime_ns, _, _ = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return (magic == SNAPSHOT_MAGIC and version == SNAPSHOT_FORMAT_VERSION
+                and file_signature(source_path) == (mtime_ns, size))
+
+    def load(self, source_path):
+        """
+        キャッシュが source_path と一致すれば (タスクのリスト, タグ -> タスクIDのタプル) を返す
+
+        一致しないか読めなければNone。サイズと更新時刻が違えばハッシュは計算しない。
+        """
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, size, mtime_ns, length, digest = _HEADER.unpack_from(mm)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+                    return None
+                if file_signature(source_path) != (mtime_ns, size):
+                    return None
+                if source_key(source_path) != (size, mtime_ns, digest):
+                    return None
+                with memoryview(mm)[_HEADER.size:_HEADER.size + length] as payload:
+                    columns, tag_ids = marshal.loads(payload)
+            return TaskRecord.from_columns(columns), tag_ids
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            return None
+
+    def save(self, tasks, key, versions=None):
+        """
+        source_key() で得た元のファイルの key に対応するキャッシュとして tasks を書き出す
+
+        versions（tasks と同じ順の版）を省くと、タスクのレコードが持つ版を使う。
+        """
+        size, mtime_ns, digest = key
+        if all(type(task) is TaskRecord for task in tasks):
+            columns = tuple(tuple(map(attrgetter(field), tasks)) for field in TASK_FIELDS)
+        else:
+            rows = list(map(task_values, tasks))
+            columns = tuple(tuple(map(itemgetter(index), rows)) for index in range(len(TASK_FIELDS)))
+        versions = tuple(versions if versions is not None else map(task_version, tasks))
+        payload = marshal.dumps((columns + (versions,), _tag_ids(columns)), MARSHAL_VERSION)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, size, mtime_ns, len(payload), digest))
+            f.write(payload)
+        os.replace(temp_path, self.path)
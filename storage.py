@@ -0,0 +1,850 @@
+"""
+taskcon ストレージバックエンド
+
+タスクの永続化方式を差し替え可能にするためのモジュール。
+- CsvStorage: 変更のたびに tasks.csv 全体を書き直す従来方式
+- JournalStorage: 変更ごとに操作レコードをジャーナルへ追記し、
+  一定サイズを超えたらバックグラウンドで tasks.csv（スナップショット）へ圧縮する方式
+- SqliteStorage: tasks.db に保存し、タブ別の絞り込みと並び替えをSQLで行う方式
+
+複数のインスタンスが同じデータフォルダを使えるよう、タスクファイルへの書き込みは
+ロックファイル（file_lock）で1つずつに限り、ファイル全体を書き直すときはタスクの版を使って
+他のインスタンスの変更とタスクIDごとにマージする（task_merge）。
+tasks.csv を読み込んだ結果はバイナリのキャッシュ（snapshot_cache）に保存し、次からはCSVを解析せずに読み込む。
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import Counter
+
+from file_lock import LOCK_FILE_NAME, FileLock
+from file_watcher import file_signature
+from search_index import normalize_text
+from snapshot_cache import SNAPSHOT_FILE_NAME, SnapshotCache, source_key
+from task_merge import DELETED, merge_tasks
+from task_record import TASK_FIELDS, TaskRecord, task_values, task_version
+
+# --- 定数定義 ---
+CSV_HEADERS = list(TASK_FIELDS)
+VERSION_FIELD = "version"  # tasks.csv（スナップショット）にだけ書くタスクの版の列
+SNAPSHOT_HEADERS = CSV_HEADERS + [VERSION_FIELD]
+TASKS_FILE_NAME = "tasks.csv"
+TAGS_FILE_NAME = "tags.txt"
+SQLITE_FILE_NAME = "tasks.db"
+SETTINGS_FILE_NAME = "settings.json"
+JOURNAL_FILE_NAME = "tasks.journal"
+JOURNAL_COMPACTING_SUFFIX = ".compacting"
+JOURNAL_COMPACT_THRESHOLD = 1024 * 1024  # ジャーナルがこのバイト数を超えたら圧縮する
+DEFAULT_STORAGE_BACKEND = "journal"
+DUE_KEY_SQL = "CASE WHEN due_date = '' THEN '9999-12-31' ELSE due_date END"
+# 優先度を 高<中<低 の順位にする式（知らない値は最後）
+PRIORITY_RANK_SQL = "CASE priority WHEN '高' THEN 0 WHEN '中' THEN 1 WHEN '低' THEN 2 ELSE 3 END"
+
+# ジャーナルに記録する操作の種類
+OP_ADD = "add"
+OP_UPDATE = "update"
+OP_STATUS = "status"
+OP_TODAY = "today"
+OP_DELETE = "delete"
+
+
+def task_from_row(row):
+    """CSVの1行（辞書）からタスクのレコードを作成する"""
+    return TaskRecord(
+        row.get("id") or str(uuid.uuid4()),
+        row.get("name") or "",
+        row.get("status") or "未着手",
+        row.get("priority") or "中",
+        row.get("due_date") or "",
+        row.get("tags") or "",
+        row.get("today") or "",
+        _row_version(row),
+    )
+
+
+def _row_version(row):
+    """行のタスクの版（版の列がない・不正なら0）"""
+    try:
+        return int(row.get(VERSION_FIELD) or 0)
+    except ValueError:
+        return 0
+
+
+def read_tasks_csv(path):
+    """CSVファイルからタスクを読み込む（ファイルがなければ空リスト）"""
+    return list(iter_tasks_csv(path))
+
+
+def iter_tasks_csv(path):
+    """CSVファイルからタスクを1件ずつ読み込む（ファイルがなければ何も返さない）"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            yield task_from_row(row)
+
+
+def read_tags_file(path):
+    """タグファイルから重複なしでタグを読み込む（ファイルがなければ空リスト）"""
+    tags = []
+    if not os.path.exists(path):
+        return tags
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            tag = line.strip()
+            if tag and tag not in tags:
+                tags.append(tag)
+    return tags
+
+
+def write_tags_file(path, tags):
+    """タグを1行1件で書き出す（一時ファイルに書いてから置き換える）"""
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for tag in tags:
+            f.write(f"{tag}\n")
+        sync_file(f)
+    os.replace(temp_path, path)
+
+
+def write_tasks_csv(path, tasks, versions=None):
+    """
+    タスクをCSV_HEADERS形式で書き出す（一時ファイルに書いてから置き換える）
+
+    versions（tasks と同じ順の版）を渡すと、末尾に版の列を加えた SNAPSHOT_HEADERS 形式で書く。
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+        if versions is None:
+            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(tasks)
+        else:
+            writer = csv.writer(f)
+            writer.writerow(SNAPSHOT_HEADERS)
+            writer.writerows((*task_values(task), version) for task, version in zip(tasks, versions))
+        sync_file(f)
+    # 書き込み途中で落ちても元のファイルは壊れない
+    os.replace(temp_path, path)
+
+
+def sync_file(f):
+    """ファイルの内容をディスクまで書き出す"""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def changed_fields(ops):
+    """変更操作から タスクID -> 変えた項目名の集合（削除したタスクは DELETED）を作る"""
+    changes = {}
+    for op, task_id, data in ops:
+        if op == OP_DELETE:
+            changes[task_id] = DELETED
+            continue
+        fields = changes.get(task_id)
+        if fields is None:
+            fields = changes[task_id] = set()
+        if op == OP_ADD:
+            fields.update(CSV_HEADERS)
+        elif op == OP_UPDATE:
+            fields.update(key for key in (data or {}) if key in CSV_HEADERS and key != "id")
+        elif op in (OP_STATUS, OP_TODAY):
+            fields.add(op)
+    return changes
+
+
+def _set_versions(tasks, versions):
+    """
+    書き込んだ版をタスクのレコードに記録する（次に書き込むときの共通の祖先になる）
+
+    tasks はマージの結果なので、自分の内容のまま書いたタスクはメモリ上のレコードそのものに版が入る。
+    相手の内容を書いたタスクはファイルから読んだレコードに入り、メモリ上のタスクは読み直すまで古い版のまま残す
+    （古い内容に新しい版を付けると、次の書き込みで相手の変更を消してしまうため）。
+    """
+    for task, version in zip(tasks, versions):
+        if isinstance(task, TaskRecord):
+            task.version = version
+
+
+def _advance_versions(tasks, ops):
+    """
+    記録した変更操作の数だけメモリ上のタスクの版を進める
+
+    ジャーナルの再生やSQLiteの更新ではファイル側の版が操作ごとに1つ進むので、
+    メモリ上の版も揃えておかないと、次の全体の書き直しで自分の変更を相手の変更と見なしてしまう。
+    """
+    counts = Counter(task_id for op, task_id, _ in ops if op != OP_DELETE)
+    if not counts:
+        return
+    for task in tasks:
+        count = counts.get(task["id"])
+        if count and isinstance(task, TaskRecord):
+            task.version += count
+
+
+class CsvStorage:
+    """
+    変更のたびにCSV全体を書き直すバックエンド
+
+    書き直す前にロックを取り、前回書き込んでから他のインスタンスが tasks.csv を書き換えていれば
+    読み直してマージする。merged_external は直前の書き込みで他のインスタンスの変更を
+    取り込んだか（取り込んだらメモリ上のタスクが古いので、監視に知らせて読み直させる）。
+    """
+
+    name = "csv"
+
+    def __init__(self, data_folder):
+        self.data_folder = data_folder
+        self.data_file = os.path.join(data_folder, TASKS_FILE_NAME)
+        self.tags_file = os.path.join(data_folder, TAGS_FILE_NAME)
+        self.lock = FileLock(os.path.join(data_folder, LOCK_FILE_NAME))
+        self.merged_external = False
+        self._written_signature = None  # 最後に書き込んだ tasks.csv の (更新時刻, サイズ)
+        self.snapshot_cache = SnapshotCache(os.path.join(data_folder, SNAPSHOT_FILE_NAME))
+        self.loaded_tag_ids = None  # load() でキャッシュから読んだ タグ -> タスクIDのタプル（なければNone）
+        # 前回読み込んだか書き込んだときのファイルにあったタスクID（マージの共通の祖先。ないタスクは自分が追加したもの）
+        self._base_ids = set()
+
+    def load(self):
+        """すべてのタスクを読み込む"""
+        tasks, self.loaded_tag_ids = self._read_snapshot()
+        self._base_ids = {task["id"] for task in tasks}
+        return tasks
+
+    def _read_snapshot(self):
+        """
+        tasks.csv のタスクを読み込み、(タスクのリスト, タグの索引) を返す
+
+        キャッシュが新しければキャッシュから読み、古ければCSVを解析してキャッシュを作り直す
+        （タグの索引はキャッシュから読んだときだけ返し、CSVを解析したときはNone）。
+        """
+        cached = self.snapshot_cache.load(self.data_file)
+        if cached is not None:
+            return cached
+        key = source_key(self.data_file)
+        tasks = read_tasks_csv(self.data_file)
+        self._save_snapshot_cache(tasks, key)
+        return tasks, None
+
+    def _iter_snapshot(self):
+        """tasks.csv のタスクを1件ずつ読み込む（キャッシュの使い方は _read_snapshot と同じ）"""
+        cached = self.snapshot_cache.load(self.data_file)
+        if cached is not None:
+            yield from cached[0]
+            return
+        key = source_key(self.data_file)
+        tasks = []
+        for task in iter_tasks_csv(self.data_file):
+            tasks.append(task)
+            yield task
+        self._save_snapshot_cache(tasks, key)
+
+    def _save_snapshot_cache(self, tasks, key, versions=None):
+        """key（source_key の結果）の tasks.csv のキャッシュを作る（その後に書き換えられていれば作らない）"""
+        if key is None or file_signature(self.data_file) != (key[1], key[0]):
+            return
+        try:
+            self.snapshot_cache.save(tasks, key, versions)
+        except OSError:
+            pass  # キャッシュが書けなくても、次の起動でCSVを解析するだけ
+
+    def data_size(self):
+        """読み込むデータのバイト数（バックグラウンドで読み込むかの判断に使う）"""
+        return _file_size(self.data_file)
+
+    def is_cached(self):
+        """load() がCSVを解析せずにキャッシュから読み込めそうか"""
+        return self.snapshot_cache.is_fresh(self.data_file)
+
+    def iter_load(self):
+        """
+        タスクを1件ずつ読み込む（順に並べると load() の結果と同じ）
+
+        ワーカースレッドから呼ばれるので、GUIスレッドと共有する状態は変更しない。
+        読み込みで覚えておく状態はジェネレーターの戻り値にし、読み込み終わったらGUIスレッドで finish_load に渡す。
+        """
+        return (yield from _iter_collecting_ids(self._iter_snapshot()))
+
+    def finish_load(self, state):
+        """iter_load の戻り値の状態を記録する（GUIスレッドで、読み込んだタスクを反映するときに呼ぶ）"""
+        self._base_ids = state
+
+    def load_tags(self):
+        """タグリストを読み込む"""
+        return read_tags_file(self.tags_file)
+
+    def watch_paths(self):
+        """外部からの変更を監視するファイル"""
+        return [self.data_file, self.tags_file]
+
+    def record_paths(self):
+        """record で書き換わる監視対象のファイル（他のインスタンスの変更を取り込んだら知らせるため空）"""
+        return [] if self.merged_external else [self.data_file]
+
+    def tags_paths(self):
+        """save_tags で書き換わる監視対象のファイル"""
+        return [self.tags_file]
+
+    def save_tags(self, tags):
+        """タグリストを書き出す"""
+        with self.lock:
+            write_tags_file(self.tags_file, tags)
+
+    def save(self, tasks):
+        """すべてのタスクを書き出す（次の起動用にキャッシュも作る）"""
+        with self.lock:
+            merged, versions = self._write_merged(tasks, {})
+            self._save_snapshot_cache(merged, source_key(self.data_file), versions)
+
+    def record(self, tasks, ops):
+        """変更操作を記録する（CSVでは全体を書き直す）"""
+        with self.lock:
+            self._write_merged(tasks, changed_fields(ops))
+
+    def _write_merged(self, tasks, changes):
+        """ファイルのタスクとマージして tasks.csv を書き直す（ロックを取って呼ぶ）"""
+        if self._written_signature is not None and file_signature(self.data_file) == self._written_signature:
+            # 前回書き込んでから誰も書き換えていなければ、ファイルは自分のタスクと同じ版なので読み直さない
+            merged, external = tasks, False
+            versions = [task_version(task) + 1 if task["id"] in changes or not task_version(task)
+                        else task_version(task) for task in tasks]
+        else:
+            merged, versions, external = merge_tasks(tasks, read_tasks_csv(self.data_file), changes, self._base_ids)
+        write_tasks_csv(self.data_file, merged, versions)
+        _set_versions(merged, versions)
+        self._base_ids = {task["id"] for task in merged}
+        self.merged_external = external
+        self._written_signature = None if external else file_signature(self.data_file)
+        return merged, versions
+
+    def _track_recorded(self, tasks, ops):
+        """ファイルに反映した変更操作を、メモリ上のタスクの版とマージの共通の祖先のタスクIDに反映する"""
+        _advance_versions(tasks, ops)
+        for op, task_id, _ in ops:
+            if op == OP_ADD:
+                self._base_ids.add(task_id)
+            elif op == OP_DELETE:
+                self._base_ids.discard(task_id)
+
+    def export_csv(self, tasks, path):
+        """CSV_HEADERS形式（版の列なし）で path へエクスポートする"""
+        write_tasks_csv(path, tasks)
+
+    def close(self):
+        """後処理（CSVでは何もしない）"""
+
+
+class JournalStorage(CsvStorage):
+    """
+    追記型ジャーナルのバックエンド
+
+    tasks.csv をスナップショットとして扱い、以降の変更は tasks.journal に
+    1操作1行のJSONで追記する。読み込み時はスナップショットにジャーナルを再生する。
+    ジャーナルの各操作は値を上書きする形式なので、同じ操作を二度再生しても結果は変わらない。
+    他のインスタンスも同じジャーナルに追記するので、変更した項目だけが行単位で重なる。
+    タスクの版は再生した操作の数だけ増える（どのインスタンスで再生しても同じ版になる）。
+    追記したときはメモリ上のタスクの版も同じだけ進め、ファイルを再生した版と揃える。
+    圧縮はメモリ上のタスクではなく、ロックを取ってファイルを再生した結果を書き出す。
+    """
+
+    name = "journal"
+
+    def __init__(self, data_folder, compact_threshold=JOURNAL_COMPACT_THRESHOLD):
+        super().__init__(data_folder)
+        self.journal_file = os.path.join(data_folder, JOURNAL_FILE_NAME)
+        self.compacting_file = self.journal_file + JOURNAL_COMPACTING_SUFFIX
+        self.compact_threshold = compact_threshold
+        self._compact_thread = None
+        self._compact_error = None
+        self._seen_signatures = None  # 最後に読み込んだか追記したときのファイルの (更新時刻, サイズ)
+
+    def load(self):
+        """スナップショットを読み込み、ジャーナルを再生する"""
+        self.wait_for_compaction()
+        with self.lock:
+            self._seen_signatures = self._signatures()
+            tasks, self.loaded_tag_ids = self._read_all()
+            self._base_ids = {task["id"] for task in tasks}
+            return tasks
+
+    def _read_all(self):
+        """
+        スナップショットにジャーナルを再生した (タスクのリスト, タグの索引) を返す（ロックを取って呼ぶ）
+
+        ジャーナルを再生したときは、キャッシュのタグの索引はタスクと合わないのでNone。
+        """
+        tasks, tag_ids = self._read_snapshot()
+        journals = [path for path in (self.compacting_file, self.journal_file) if os.path.exists(path)]
+        if not journals:
+            return tasks, tag_ids
+        tasks_by_id = {task["id"]: task for task in tasks}
+        # 圧縮途中で終了していた場合は、退避済みのジャーナルから先に再生する
+        for path in journals:
+            self._replay(path, tasks_by_id)
+        return list(tasks_by_id.values()), None
+
+    def _signatures(self):
+        """スナップショットとジャーナルの (更新時刻, サイズ)"""
+        return tuple(file_signature(path) for path in (self.data_file, self.compacting_file, self.journal_file))
+
+    def watch_paths(self):
+        """他のインスタンスの追記もわかるよう、ジャーナルも監視する"""
+        return [self.data_file, self.tags_file, self.journal_file]
+
+    def record_paths(self):
+        """record で書き換わる監視対象のファイル（他のインスタンスの変更があれば知らせるため空）"""
+        return [] if self.merged_external else [self.journal_file]
+
+    def data_size(self):
+        """スナップショットとジャーナルの合計バイト数"""
+        return sum(_file_size(path) for path in (self.data_file, self.compacting_file, self.journal_file))
+
+    def is_cached(self):
+        """ジャーナルがなく、スナップショットをキャッシュから読み込めそうか"""
+        if any(os.path.exists(path) for path in (self.compacting_file, self.journal_file)):
+            return False
+        return super().is_cached()
+
+    def iter_load(self):
+        """
+        ジャーナルがなければスナップショットを1件ずつ読み込み、あれば再生した結果を返す
+
+        戻り値は (読み込んだときのファイルの (更新時刻, サイズ), 読み込んだタスクIDの集合)。
+        圧縮中でもロックを取って読むので圧縮は待たない。
+        """
+        with self.lock:
+            signatures = self._signatures()
+            replayed = None
+            if any(os.path.exists(path) for path in (self.compacting_file, self.journal_file)):
+                # 再生は前の行を書き換えるため、スナップショット全体を読んでから返す
+                replayed = self._read_all()[0]
+        # スナップショットは置き換えで更新されるので、開いたファイルはロックしなくても途中で変わらない
+        tasks = replayed if replayed is not None else self._iter_snapshot()
+        task_ids = yield from _iter_collecting_ids(tasks)
+        return signatures, task_ids
+
+    def finish_load(self, state):
+        """読み込んだときのファイルの状態を、他のインスタンスの書き込みを見分ける基準にする"""
+        self._seen_signatures, task_ids = state
+        super().finish_load(task_ids)
+
+    def _replay(self, path, tasks_by_id):
+        """ジャーナルファイルの操作をタスク辞書に適用する"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 書き込み途中で中断された行は無視する
+                    continue
+                apply_journal_entry(tasks_by_id, entry)
+
+    def save(self, tasks):
+        """ファイルのタスクとマージしたスナップショットを書き出し、ジャーナルを空にする"""
+        self.wait_for_compaction()
+        with self.lock:
+            merged, versions, external = merge_tasks(tasks, self._read_all()[0], {}, self._base_ids)
+            self._write_snapshot(merged, versions)
+            _set_versions(merged, versions)
+            self._base_ids = {task["id"] for task in merged}
+            self.merged_external = external
+            self._seen_signatures = None if external else self._signatures()
+
+    def _write_snapshot(self, tasks, versions):
+        """スナップショットとそのキャッシュを書き出してジャーナルを削除する（ロックを取って呼ぶ）"""
+        write_tasks_csv(self.data_file, tasks, versions)
+        for path in (self.compacting_file, self.journal_file):
+            if os.path.exists(path):
+                os.remove(path)
+        self._save_snapshot_cache(tasks, source_key(self.data_file), versions)
+
+    def record(self, tasks, ops):
+        """変更操作をジャーナルに追記する"""
+        if not ops:
+            return
+        if not os.path.exists(self.data_folder):
+            os.makedirs(self.data_folder)
+        lines = [
+            json.dumps({"op": op, "id": task_id, "data": data}, ensure_ascii=False) + "\n"
+            for op, task_id, data in ops
+        ]
+        with self.lock:
+            # 前回読み込んでから他のインスタンスが書き込んでいれば、読み直すまで監視に知らせ続ける
+            self.merged_external = self._signatures() != self._seen_signatures
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+                sync_file(f)
+                size = f.tell()
+            if not self.merged_external:
+                self._seen_signatures = self._signatures()
+        self._track_recorded(tasks, ops)
+        if size > self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """ジャーナルをスナップショットへ圧縮する（バックグラウンド）"""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        if not os.path.exists(self.journal_file) and not os.path.exists(self.compacting_file):
+            return
+        self._compact_thread = threading.Thread(target=self._compact_worker, daemon=True)
+        self._compact_thread.start()
+
+    def _compact_worker(self):
+        """
+        ファイルを再生した結果をスナップショットに書き出してジャーナルを削除する
+
+        メモリ上のタスクには他のインスタンスの変更がまだ入っていないことがあるので使わない。
+        圧縮中の追記はロックで待たせる（ジャーナルが残っていれば次回の読み込み時に再生される）。
+        """
+        try:
+            with self.lock:
+                unseen = self._signatures() != self._seen_signatures
+                tasks = self._read_all()[0]
+                self._write_snapshot(tasks, [task_version(task) for task in tasks])
+                self._seen_signatures = None if unseen else self._signatures()
+        except OSError as e:
+            self._compact_error = e
+
+    def wait_for_compaction(self):
+        """実行中の圧縮が終わるまで待つ"""
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+            self._compact_thread = None
+        error, self._compact_error = self._compact_error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """実行中の圧縮を待つ"""
+        self.wait_for_compaction()
+
+
+def _iter_collecting_ids(tasks):
+    """タスクを1件ずつ返し、終わったらタスクIDの集合を返す（ジェネレーターの戻り値）"""
+    task_ids = set()
+    add = task_ids.add
+    for task in tasks:
+        add(task["id"])
+        yield task
+    return task_ids
+
+
+def _file_size(path):
+    """ファイルのバイト数（なければ0）"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def apply_journal_entry(tasks_by_id, entry):
+    """ジャーナルの1操作をタスク辞書（id -> タスク）に適用する（適用したタスクの版を1つ進める）"""
+    op = entry.get("op")
+    task_id = entry.get("id")
+    data = entry.get("data")
+    if op == OP_ADD:
+        task = task_from_row(data or {})
+        task["id"] = task_id
+        if task_id in tasks_by_id:
+            tasks_by_id[task_id].update(task)
+        else:
+            tasks_by_id[task_id] = task
+    elif op == OP_DELETE:
+        tasks_by_id.pop(task_id, None)
+        return
+    elif task_id in tasks_by_id:
+        if op == OP_UPDATE:
+            tasks_by_id[task_id].update({k: v for k, v in (data or {}).items() if k in CSV_HEADERS and k != "id"})
+        elif op == OP_STATUS:
+            tasks_by_id[task_id]["status"] = data
+        elif op == OP_TODAY:
+            tasks_by_id[task_id]["today"] = data
+    else:
+        return
+    task = tasks_by_id[task_id]
+    if isinstance(task, TaskRecord):
+        task.version += 1
+
+
+class SqliteStorage(CsvStorage):
+    """
+    SQLiteのバックエンド
+
+    タスクとタグを tasks.db に保存する。絞り込み・並び替えに使う列には
+    インデックスを張り、select_ids でクエリ（task_query）のSQLで表せる条件の表示対象を取得できる。
+    データベースがまだなければ、最初の読み込み時に tasks.csv / tags.txt から取り込む。
+    変更操作は行単位で反映して版を進め、全体を書き直すときは書き込みのトランザクションの中で
+    テーブルのタスクとマージする（ロックはSQLite自身のものを使う）。
+    """
+
+    name = "sqlite"
+
+    # 並び替えごとのORDER BY句（追加順は挿入順、期限なしは最後）
+    SORT_CLAUSES = {
+        "追加順": "seq",
+        "期限順": f"{DUE_KEY_SQL}, {PRIORITY_RANK_SQL}, seq",
+        "優先度順": f"{PRIORITY_RANK_SQL}, {DUE_KEY_SQL}, seq",
+        "タグ順": f"tag_key(tags), {DUE_KEY_SQL}, seq",
+    }
+
+    def __init__(self, data_folder):
+        super().__init__(data_folder)
+        self.db_file = os.path.join(data_folder, SQLITE_FILE_NAME)
+        # sqlite3の接続は作成したスレッドでしか使えないため、スレッドごとに接続を持つ
+        self._local = threading.local()
+        self._connections = []
+        self._connect_lock = threading.Lock()
+        self._external_pending = False  # 他の接続のコミットを見つけてからまだ読み直していないか
+
+    def _connect(self):
+        """このスレッド用の接続を返す（初回は接続し、必要ならスキーマを作成する）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        with self._connect_lock:
+            return self._open_connection()
+
+    def _open_connection(self):
+        """データベースに接続し、必要ならスキーマの作成と取り込みを行う"""
+        if not os.path.exists(self.data_folder):
+            os.makedirs(self.data_folder)
+        is_new = not os.path.exists(self.db_file)
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        # タグ順はメモリ上の並び替えと同じく正規化したタグで並べる
+        conn.create_function("tag_key", 1, normalize_text, deterministic=True)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT '未着手',
+                priority TEXT NOT NULL DEFAULT '中',
+                due_date TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '',
+                today TEXT NOT NULL DEFAULT '',
+                version INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+            CREATE INDEX IF NOT EXISTS idx_tasks_today ON tasks(today);
+            CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(""" + DUE_KEY_SQL + """);
+            CREATE INDEX IF NOT EXISTS idx_tasks_priority_rank ON tasks(""" + PRIORITY_RANK_SQL + """);
+            CREATE INDEX IF NOT EXISTS idx_tasks_tags ON tasks(tags);
+            CREATE TABLE IF NOT EXISTS tags (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE
+            );
+        """)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(tasks)")]
+        if VERSION_FIELD not in columns:
+            # 版の列がない古いデータベースに列を加える
+            with conn:
+                conn.execute(f"ALTER TABLE tasks ADD COLUMN {VERSION_FIELD} INTEGER NOT NULL DEFAULT 0")
+        self._local.conn = conn
+        self._connections.append(conn)
+        if is_new:
+            self.import_csv(self.data_file, self.tags_file)
+        return conn
+
+    def import_csv(self, csv_path, tags_path=None):
+        """既存の tasks.csv / tags.txt をデータベースへ取り込む"""
+        tasks = read_tasks_csv(csv_path)
+        with self._connect() as conn:
+            self._write_all(conn, tasks, [task_version(task) for task in tasks])
+        if tags_path:
+            self.save_tags(read_tags_file(tags_path))
+
+    def load(self):
+        """すべてのタスクを追加順に読み込む"""
+        conn = self._connect()
+        self._local.data_version = _data_version(conn)
+        self._external_pending = False
+        rows = conn.execute(f"SELECT {', '.join(SNAPSHOT_HEADERS)} FROM tasks ORDER BY seq")
+        tasks = [TaskRecord(*row) for row in rows]
+        self._base_ids = {task["id"] for task in tasks}
+        return tasks
+
+    def watch_paths(self):
+        """タスクもタグもデータベースに入っている"""
+        return [self.db_file]
+
+    def record_paths(self):
+        return [] if self.merged_external else [self.db_file]
+
+    def tags_paths(self):
+        return [self.db_file]
+
+    def data_size(self):
+        """データベースのバイト数（まだなければ取り込みが必要なので0）"""
+        return _file_size(self.db_file)
+
+    def is_cached(self):
+        """データベースはキャッシュを使わない"""
+        return False
+
+    def iter_load(self):
+        """
+        タスクを追加順に1件ずつ読み込む
+
+        ワーカースレッドから呼ばれるので、GUIスレッドの接続とは別に読み込み用の接続を開く。
+        データベースがまだなければ、取り込み元の tasks.csv を読む（取り込みは次の接続時に行われる）。
+        戻り値は読み込んだタスクIDの集合。
+        """
+        if not os.path.exists(self.db_file):
+            return (yield from _iter_collecting_ids(iter_tasks_csv(self.data_file)))
+        return (yield from _iter_collecting_ids(self._iter_rows()))
+
+    def _iter_rows(self):
+        """読み込み用の別接続でテーブルのタスクを追加順に1件ずつ読み込む"""
+        conn = sqlite3.connect(self.db_file)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(SNAPSHOT_HEADERS)} FROM tasks ORDER BY seq")
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                for row in rows:
+                    yield TaskRecord(*row)
+        finally:
+            conn.close()
+
+    def finish_load(self, state):
+        """読み直したので、他の接続のコミットはもう反映済み"""
+        self._external_pending = False
+        super().finish_load(state)
+
+    def save(self, tasks):
+        """テーブルのタスクとマージしてすべてのタスクを書き直す"""
+        conn = self._connect()
+        with conn:
+            # 読んでから書き直すまでに他のインスタンスが書き込まないよう、先に書き込みのロックを取る
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(f"SELECT {', '.join(SNAPSHOT_HEADERS)} FROM tasks ORDER BY seq")
+            theirs = [TaskRecord(*row) for row in rows]
+            merged, versions, external = merge_tasks(tasks, theirs, {}, self._base_ids)
+            self._write_all(conn, merged, versions)
+        _set_versions(merged, versions)
+        self._base_ids = {task["id"] for task in merged}
+        self._external_pending = external
+        self.merged_external = external
+        self._local.data_version = _data_version(conn)
+
+    def _write_all(self, conn, tasks, versions):
+        """テーブルの内容をタスクリストで置き換える（トランザクションの中で呼ぶ）"""
+        placeholders = ", ".join("?" for _ in SNAPSHOT_HEADERS)
+        conn.execute("DELETE FROM tasks")
+        conn.executemany(
+            f"INSERT INTO tasks ({', '.join(SNAPSHOT_HEADERS)}) VALUES ({placeholders})",
+            ((*task_values(task), version) for task, version in zip(tasks, versions))
+        )
+
+    def record(self, tasks, ops):
+        """変更操作を1トランザクションで反映する（変更した項目だけを書き、版を進める）"""
+        conn = self._connect()
+        # 前回読み書きしてから他の接続がコミットしていれば、読み直すまで監視に知らせ続ける
+        current = _data_version(conn)
+        if current != getattr(self._local, "data_version", current):
+            self._external_pending = True
+        self._local.data_version = current
+        self.merged_external = self._external_pending
+        with conn:
+            for op, task_id, data in ops:
+                if op == OP_ADD:
+                    task = task_from_row(data or {})
+                    task["id"] = task_id
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO tasks ({', '.join(SNAPSHOT_HEADERS)}) "
+                        f"VALUES ({', '.join('?' for _ in CSV_HEADERS)}, "
+                        f"COALESCE((SELECT {VERSION_FIELD} FROM tasks WHERE id = ?), 0) + 1)",
+                        [*(task[key] for key in CSV_HEADERS), task_id]
+                    )
+                elif op == OP_DELETE:
+                    conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                elif op == OP_UPDATE:
+                    fields = {k: v for k, v in (data or {}).items() if k in CSV_HEADERS and k != "id"}
+                    if fields:
+                        assignments = ", ".join(f"{key} = ?" for key in fields)
+                        conn.execute(f"UPDATE tasks SET {assignments}, {VERSION_FIELD} = {VERSION_FIELD} + 1 "
+                                     "WHERE id = ?", [*fields.values(), task_id])
+                elif op in (OP_STATUS, OP_TODAY):
+                    conn.execute(f"UPDATE tasks SET {op} = ?, {VERSION_FIELD} = {VERSION_FIELD} + 1 WHERE id = ?",
+                                 (data, task_id))
+        self._track_recorded(tasks, ops)
+
+    def select_ids(self, conditions, params=(), sort_option="追加順"):
+        """WHERE句の条件（AND で結ぶ）に一致するタスクIDを並び替えの順に返す"""
+        conn = self._connect()
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = self.SORT_CLAUSES.get(sort_option, "seq")
+        return [row[0] for row in conn.execute(f"SELECT id FROM tasks {where} ORDER BY {order}", list(params))]
+
+    def load_tags(self):
+        """タグリストを登録順に読み込む"""
+        conn = self._connect()
+        return [row[0] for row in conn.execute("SELECT name FROM tags ORDER BY seq")]
+
+    def save_tags(self, tags):
+        """タグリストを書き直す"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM tags")
+            conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", ((tag,) for tag in tags))
+
+    def close(self):
+        """すべてのスレッドのデータベース接続を閉じる"""
+        with self._connect_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._local = threading.local()
+
+
+def _data_version(conn):
+    """接続から見たデータベースの変更回数（他の接続がコミットすると変わる）"""
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+STORAGE_BACKENDS = {
+    CsvStorage.name: CsvStorage,
+    JournalStorage.name: JournalStorage,
+    SqliteStorage.name: SqliteStorage,
+}
+
+
+def create_storage(backend, data_folder):
+    """バックエンド名からストレージを作成する"""
+    storage_class = STORAGE_BACKENDS.get(backend, STORAGE_BACKENDS[DEFAULT_STORAGE_BACKEND])
+    return storage_class(data_folder)
+
+
+def load_settings(data_folder):
+    """データフォルダの設定ファイルを読み込む（なければ空の辞書）"""
+    path = os.path.join(data_folder, SETTINGS_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return settings if isinstance(settings, dict) else {}
+
+
+def save_settings(data_folder, settings):
+    """データフォルダの設定ファイルを書き出す"""
+    if not os.path.exists(data_folder):
+        os.makedirs(data_folder)
+    with open(os.path.join(data_folder, SETTINGS_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,197 @@
+"""
+taskcon 完了タスクのアーカイブ
+
+完了してから一定の日数がたったタスクを、データフォルダの archive/ に
+完了した月ごとのCSV（tasks-YYYY-MM.csv、CSV_HEADERS形式）として移す。
+アーカイブしたタスクは tasks.csv の読み込み・保存・絞り込み・タグの集計の対象から外れ、
+完了タブで末尾までスクロールしたときに新しい月から1か月分ずつ読み込む。
+検索はアーカイブを1行ずつ読んで一致した行だけを返すので、すべてをメモリに載せずに済む。
+
+タスクには完了した日の項目がないため、完了したタスクを最初に見つけた日を
+archive/completed.json（タスクID -> 日付）に記録し、その日から数える。
+アーカイブは設定で日数を決めたときだけ行う（既定ではタスクを tasks.csv から移さない）。
+"""
+
+import csv
+import json
+import os
+from datetime import date, timedelta
+
+from search_index import normalize_text
+from storage import CSV_HEADERS, iter_tasks_csv, sync_file, write_tasks_csv
+
+ARCHIVE_FOLDER_NAME = "archive"
+ARCHIVE_LEDGER_FILE_NAME = "completed.json"  # 完了したタスクを最初に見つけた日の記録
+ARCHIVE_FILE_PREFIX = "tasks-"
+ARCHIVE_FILE_SUFFIX = ".csv"
+ARCHIVE_SETTING = "archive_after_days"  # 完了から何日後にアーカイブするかを保存する設定のキー
+DEFAULT_ARCHIVE_AFTER_DAYS = 0  # 0 ならアーカイブしない
+
+
+def archive_after_days(settings):
+    """設定からアーカイブするまでの日数を返す（不正な値なら既定値）"""
+    try:
+        return max(0, int(settings.get(ARCHIVE_SETTING, DEFAULT_ARCHIVE_AFTER_DAYS)))
+    except (TypeError, ValueError):
+        return DEFAULT_ARCHIVE_AFTER_DAYS
+
+
+class TaskArchive:
+    """
+    月ごとのアーカイブ（データフォルダの archive/）
+
+    months() は新しい月から順のアーカイブの月（"YYYY-MM"）のリスト。
+    iter_month で読み込んだタスクと remember で渡したタスクの月は覚えておき、remove で元に戻したり削除したりできる。
+    覚えた月はGUIスレッドだけで読み書きする（ワーカースレッドから呼ぶ search は覚えない）。
+    """
+
+    def __init__(self, data_folder):
+        self.data_folder = data_folder
+        self.folder = os.path.join(data_folder, ARCHIVE_FOLDER_NAME)
+        self.ledger_file = os.path.join(self.folder, ARCHIVE_LEDGER_FILE_NAME)
+        self._month_of = {}  # 読み込んだタスクID -> 月
+
+    def month_file(self, month):
+        return os.path.join(self.folder, f"{ARCHIVE_FILE_PREFIX}{month}{ARCHIVE_FILE_SUFFIX}")
+
+    def months(self):
+        """アーカイブの月のリスト（新しい順）"""
+        if not os.path.isdir(self.folder):
+            return []
+        months = [name[len(ARCHIVE_FILE_PREFIX):-len(ARCHIVE_FILE_SUFFIX)] for name in os.listdir(self.folder)
+                  if name.startswith(ARCHIVE_FILE_PREFIX) and name.endswith(ARCHIVE_FILE_SUFFIX)]
+        return sorted(months, reverse=True)
+
+    def month_of(self, task_id):
+        """読み込んだアーカイブのタスクの月（読み込んでいなければNone）"""
+        return self._month_of.get(task_id)
+
+    # --- 完了した日の記録 ---
+    def _load_ledger(self):
+        try:
+            with open(self.ledger_file, "r", encoding="utf-8") as f:
+                ledger = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return ledger if isinstance(ledger, dict) else {}
+
+    def _save_ledger(self, ledger):
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = f"{self.ledger_file}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(ledger, f, ensure_ascii=False)
+            sync_file(f)
+        os.replace(temp_path, self.ledger_file)
+
+    # --- アーカイブへの移動 ---
+    def archive(self, tasks, after_days, today=None):
+        """
+        完了してから after_days 日以上たったタスクを月ごとのファイルに追記し、追記したタスクを返す
+
+        呼び出し側は返したタスクをマスターリストから削除する。削除が保存される前に終了して
+        同じタスクがアーカイブにもう一度追記されても、読み込むときに重複は除かれる。
+        """
+        today = today or date.today()
+        first_seen = today.isoformat()  # 期限日とは関係なく、完了を初めて見つけた日から数える
+        ledger = self._load_ledger()
+        completed = {}
+        for task in tasks:
+            if task["status"] == "完了":
+                completed[task["id"]] = ledger.get(task["id"]) or first_seen
+        # 未着手に戻したタスクや削除したタスクの記録は消す（また完了したらその日から数え直す）
+        ledger = completed
+        limit = (today - timedelta(days=after_days)).isoformat()
+        by_month = {}
+        for task in tasks:
+            completed_on = ledger.get(task["id"])
+            if completed_on is not None and completed_on <= limit:
+                by_month.setdefault(completed_on[:7], []).append(task)
+                del ledger[task["id"]]
+        for month, month_tasks in by_month.items():
+            self._append(month, month_tasks)
+        self._save_ledger(ledger)
+        return [task for month_tasks in by_month.values() for task in month_tasks]
+
+    def _append(self, month, tasks):
+        """月のファイルにタスクを追記する（ファイルがなければ見出しから書く）"""
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.month_file(month)
+        is_new = not os.path.exists(path)
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS, extrasaction='ignore')
+            if is_new:
+                writer.writeheader()
+            writer.writerows(tasks)
+            sync_file(f)
+
+    # --- 読み込みと検索 ---
+    def iter_month(self, month, exclude=None):
+        """
+        月のアーカイブのタスクを1件ずつ読み込む
+
+        同じIDは最初の1件だけを返し、exclude(タスクID) が真のタスク（マスターリストにあるものなど）は飛ばす。
+        """
+        for task in self._read_month(month, exclude):
+            self._month_of[task["id"]] = month
+            yield task
+
+    def _read_month(self, month, exclude=None):
+        """月のアーカイブのタスクを1件ずつ読み込む（iter_month と同じだが、月を覚えない）"""
+        seen = set()
+        for task in iter_tasks_csv(self.month_file(month)):
+            task_id = task["id"]
+            if task_id in seen or (exclude is not None and exclude(task_id)):
+                continue
+            seen.add(task_id)
+            yield task
+
+    def load_month(self, month, exclude=None):
+        """月のアーカイブのタスクをリストで返す"""
+        return list(self.iter_month(month, exclude))
+
+    def search(self, terms, exclude=None):
+        """
+        すべての語（parse_query の結果）を名前かタグに含むアーカイブのタスクを新しい月から (月, タスク) で1件ずつ返す
+
+        1行ずつ読んで確かめるので、メモリに残るのは一致したタスクだけ。ワーカースレッドから呼んでよい
+        （月は覚えないので、表示するタスクはGUIスレッドで remember に渡す）。
+        """
+        for month in self.months():
+            for task in self._read_month(month, exclude):
+                name, tags = normalize_text(task["name"]), normalize_text(task["tags"])
+                if all(term in name or term in tags for term in terms):
+                    yield month, task
+
+    def remember(self, found):
+        """search で見つけた (月, タスク) の月を覚え、remove で取り出せるようにする"""
+        for month, task in found:
+            self._month_of[task["id"]] = month
+
+    # --- 取り出し ---
+    def remove(self, task_ids):
+        """
+        読み込んだアーカイブのタスクを月のファイルから取り除き、取り除いたタスクのリストを返す
+
+        取り除くタスクがある月のファイルだけを書き直す。
+        """
+        by_month = {}
+        for task_id in task_ids:
+            month = self._month_of.get(task_id)
+            if month is not None:
+                by_month.setdefault(month, set()).add(task_id)
+        removed = {}
+        for month, month_ids in by_month.items():
+            path = self.month_file(month)
+            kept = []
+            for task in iter_tasks_csv(path):
+                if task["id"] not in month_ids:
+                    kept.append(task)
+                else:
+                    removed.setdefault(task["id"], task)
+            if kept:
+                write_tasks_csv(path, kept)
+            elif os.path.exists(path):
+                os.remove(path)
+            for task_id in month_ids:
+                self._month_of.pop(task_id, None)
+        return list(removed.values())
@@ -0,0 +1,123 @@
+"""
+taskcon ファイルからのタスクの取り込み
+
+CSV（CSV_HEADERS形式）・JSON Lines（1行1タスク）・テキスト（1行1タスク名）のファイルを
+1行ずつ読み、項目を確かめて、既存のタスクと重複しない新しいタスクだけを1件ずつ返す。
+重複はタスクIDと「タスク名+期限日」で判定する。画面に依存しないので、
+ワーカースレッド（BackgroundLoader）で動かしてGUIを止めずに大きなファイルを取り込める。
+"""
+
+import csv
+import json
+import os
+
+from storage import task_from_row
+from task_model import validate_bulk_changes
+
+IMPORT_FORMATS = ["csv", "jsonl", "txt"]
+IMPORT_ENCODING = "utf-8-sig"  # 表計算ソフトが付けるBOMを読み飛ばす
+MAX_REPORTED_ERRORS = 5  # 取り込み結果に残す不正な行のメッセージの数
+
+
+def guess_format(path, default="csv"):
+    """ファイルの拡張子から形式を決める（わからなければ default）"""
+    ext = os.path.splitext(path or "")[1].lower()
+    if ext in (".jsonl", ".json"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    if ext == ".txt":
+        return "txt"
+    return default
+
+
+def read_rows(stream, fmt):
+    """ストリームから1行ずつ読み、(行番号, 項目の辞書) を返す（JSONとして読めない行は ValueError）"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        if fmt == "txt":
+            yield line_number, {"name": line.strip()}
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{line_number}行目を読み込めません: {e}") from e
+        if not isinstance(row, dict):
+            raise ValueError(f"{line_number}行目がJSONのオブジェクトではありません")
+        yield line_number, {key: str(value) for key, value in row.items() if value is not None}
+
+
+def validate_row(row):
+    """読み込んだ行を確かめてタスクにする（不正なら ValueError）"""
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("タスク名がありません")
+    changes = {field: row[field].strip() for field in ("status", "priority", "due_date", "tags", "today")
+               if row.get(field) is not None and row[field].strip()}
+    changes = validate_bulk_changes(changes)
+    return task_from_row(dict(changes, id=(row.get("id") or "").strip(), name=name))
+
+
+def duplicate_key(task):
+    """名前と期限日による重複判定のキー"""
+    return (task["name"].strip(), task["due_date"])
+
+
+class TaskImporter:
+    """
+    ファイルから新しいタスクだけを取り出すイテレータ
+
+    existing_tasks は取り込み開始時点のタスクのリスト（ワーカースレッドで重複判定の集合を作る）。
+    iter_tasks() は有効で重複しないタスクを1件ずつ返し、読んだ行数や飛ばした件数を数える。
+    件数はワーカースレッドが書き、GUIスレッドは進捗の表示に読むだけ。
+    """
+
+    def __init__(self, paths, existing_tasks=()):
+        self.paths = list(paths)
+        self.existing_tasks = existing_tasks
+        self.read_count = 0  # 読んだ行数
+        self.added_count = 0  # 返したタスク数
+        self.invalid_count = 0  # 不正で飛ばした行数
+        self.duplicate_count = 0  # 重複で飛ばした行数
+        self.errors = []  # 不正な行のメッセージ（先頭 MAX_REPORTED_ERRORS 件）
+
+    def iter_tasks(self):
+        """すべてのファイルの新しいタスクを1件ずつ返す"""
+        seen_ids = set()
+        seen_keys = set()
+        for task in self.existing_tasks:
+            seen_ids.add(task["id"])
+            seen_keys.add(duplicate_key(task))
+        for path in self.paths:
+            fmt = guess_format(path, default="txt")
+            with open(path, "r", encoding=IMPORT_ENCODING, newline="") as stream:
+                for line_number, row in read_rows(stream, fmt):
+                    self.read_count += 1
+                    try:
+                        task = validate_row(row)
+                    except ValueError as e:
+                        self._skip_invalid(path, line_number, e)
+                        continue
+                    key = duplicate_key(task)
+                    if task["id"] in seen_ids or key in seen_keys:
+                        self.duplicate_count += 1
+                        continue
+                    seen_ids.add(task["id"])
+                    seen_keys.add(key)
+                    self.added_count += 1
+                    yield task
+
+    def _skip_invalid(self, path, line_number, error):
+        self.invalid_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{os.path.basename(path)} {line_number}行目: {error}")
+
+    def summary(self):
+        """取り込み結果の説明"""
+        return f"追加 {self.added_count} 件、重複 {self.duplicate_count} 件、不正 {self.invalid_count} 件"
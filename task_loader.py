@@ -0,0 +1,92 @@
+"""
+taskcon バックグラウンド読み込み
+
+ワーカースレッドでタスクを読み込み、一定件数ごとのまとまり（バッチ）にして
+スレッドセーフなキューへ流す。GUIスレッドは poll でキューを取り出して表示に反映する。
+読み込みに伴う状態（読み込んだときのファイルの状態など）は、ジェネレーターの戻り値として
+GUIスレッドへ渡し（result）、ワーカースレッドからは共有の状態を変えない。
+"""
+
+import queue
+import threading
+
+LOAD_BATCH_SIZE = 500  # 1バッチにまとめるタスク数
+
+
+class BackgroundLoader:
+    """
+    イテレータからタスクを読み込むワーカースレッド
+
+    load_iter はワーカースレッドで呼ばれ、タスクを1件ずつ返すイテレータを返す関数。
+    GUIスレッドからは poll() で届いたバッチを取り出し、done になるまで繰り返す。
+    読み込み中の例外は error に入る。cancel() でワーカーを途中で止められる。
+    result は最後まで読み込んだときの、load_iter が返したジェネレーターの戻り値（なければNone）。
+    """
+
+    def __init__(self, load_iter, batch_size=LOAD_BATCH_SIZE):
+        self.load_iter = load_iter
+        self.batch_size = batch_size
+        self.loaded_count = 0  # poll で取り出したタスク数
+        self.done = False
+        self.error = None
+        self.result = None
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """ワーカースレッドを開始する"""
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        """タスクを読み込み、バッチごとにキューへ送る"""
+        try:
+            batch = []
+            result = []
+            for task in _iter_with_result(self.load_iter, result):
+                if self._cancelled.is_set():
+                    return
+                batch.append(task)
+                if len(batch) >= self.batch_size:
+                    self._queue.put(("batch", batch))
+                    batch = []
+            if batch:
+                self._queue.put(("batch", batch))
+            self._queue.put(("done", result[0] if result else None))
+        except Exception as e:
+            self._queue.put(("error", e))
+
+    def poll(self, max_batches=None):
+        """届いているバッチを取り出して、タスクのリストのリストで返す（待たない）"""
+        batches = []
+        while not self.done and (max_batches is None or len(batches) < max_batches):
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "batch":
+                batches.append(payload)
+                self.loaded_count += len(payload)
+            else:
+                self.done = True
+                if kind == "error":
+                    self.error = payload
+                else:
+                    self.result = payload
+        return batches
+
+    def cancel(self):
+        """読み込みを中止する"""
+        self._cancelled.set()
+        self.done = True
+
+    def join(self, timeout=None):
+        """ワーカースレッドの終了を待つ"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def _iter_with_result(load_iter, result):
+    """load_iter() の要素を返し、終わったら戻り値を result に加える"""
+    result.append((yield from load_iter()))
@@ -0,0 +1,78 @@
+"""
+taskcon タスクの三方向マージ
+
+複数のインスタンスが同じデータフォルダを使うとき、書き込む直前にファイルのタスク（相手）と
+メモリ上のタスク（自分）をタスクIDで突き合わせ、相手の変更を消さずに書き込む。
+タスクの版（TaskRecord.version）は書き込むたびに増えるので、自分が読み込んだときの版と
+ファイルの版が同じなら、相手はそのタスクを変えていない（共通の祖先のまま）とわかる。
+共通の祖先にあったタスクIDは別に受け取り、ファイルにないタスクが相手に削除されたのか、
+自分が追加したのかを見分ける（版を持たない古いファイルから読んだタスクも版0なので、版では見分けられない）。
+
+- 相手が変えていなければ自分の内容（自分が変えていれば版を1つ進める）
+- 相手だけが変えていれば相手の内容
+- 両方が変えていれば相手の内容に自分が変えた項目だけを重ねる（同じ項目は自分が優先）
+- 相手が削除したタスクは、自分が変えていなければ削除し、変えていれば残す
+- 自分が削除したタスクは削除する
+- 相手が追加したタスクは末尾に加える
+"""
+
+from task_record import TASK_FIELDS, task_version
+
+DELETED = None  # changes で削除したタスクを表す値
+
+
+def merge_tasks(ours, theirs, changes, base_ids):
+    """
+    自分のタスクと相手のタスクをマージする
+
+    changes は前回書き込んでから自分が変えた タスクID -> 項目名の集合（削除したタスクは DELETED）。
+    base_ids は共通の祖先（前回読み込んだか書き込んだときのファイル）にあったタスクIDの集合。
+    戻り値は (書き込むタスクのリスト, 同じ順の版のリスト, 相手の変更を取り込んだか)。
+    書き込むタスクは自分の順に並べ、相手だけにあるタスクは相手の順で末尾に加える。
+    """
+    theirs_by_id = {task["id"]: task for task in theirs}
+    merged = []
+    versions = []
+    external = False
+    for task in ours:
+        task_id = task["id"]
+        fields = changes.get(task_id, ())
+        base = task_version(task)
+        other = theirs_by_id.pop(task_id, None)
+        if other is None:
+            if task_id in base_ids and not fields:
+                # 読み込んだ後に相手が削除した
+                external = True
+                continue
+            merged.append(task)
+            versions.append(base + 1 if fields or not base else base)
+            continue
+        other_version = task_version(other)
+        if other_version == base:
+            merged.append(task)
+            versions.append(base + 1 if fields or task != other or not base else base)
+        elif not fields:
+            external = True
+            merged.append(other)
+            versions.append(other_version)
+        else:
+            external = True
+            if fields != set(TASK_FIELDS):
+                task = _overlay(other, task, fields)
+            merged.append(task)
+            versions.append(other_version + 1)
+    for task_id, other in theirs_by_id.items():
+        if task_id in changes and changes[task_id] is DELETED:
+            continue
+        external = True
+        merged.append(other)
+        versions.append(task_version(other))
+    return merged, versions, external
+
+
+def _overlay(other, task, fields):
+    """相手のタスクに自分が変えた項目だけを重ねたタスク"""
+    merged = other.copy()
+    for field in fields:
+        merged[field] = task[field]
+    return merged
@@ -0,0 +1,417 @@
+"""
+taskcon タスクモデル
+
+画面（tkinter）に依存しないタスク管理の中核。
+タスクとタグの読み込み・保存、タブ・状態・検索（task_query のクエリ）と並び替えによる絞り込み、
+タスクの追加・更新・削除・状態の変更と、タグリストの整理を行う。
+GUI（main.py）とコマンドライン（taskcon_cli.py）の両方から使う。
+"""
+
+import os
+import uuid
+from datetime import date
+
+from search_index import parse_query, scan
+from storage import (DEFAULT_STORAGE_BACKEND, OP_ADD, OP_DELETE, OP_STATUS, OP_TODAY, OP_UPDATE,
+                     TAGS_FILE_NAME, TASKS_FILE_NAME, create_storage, load_settings)
+from task_archive import TaskArchive
+from task_record import TaskRecord
+from task_query import parse_search, status_query, tab_query
+from task_store import TaskStore, split_tags
+
+# --- 定数定義 ---
+DEFAULT_DATA_FOLDER = "taskcon_data"
+PRIORITY_LEVELS = ["高", "中", "低"]
+STATUS_OPTIONS = ["すべて", "未着手", "完了"]
+SORT_OPTIONS = ["追加順", "期限順", "優先度順", "タグ順"]
+TODAY_OPTIONS = ["〇", ""]
+VIEW_TABS = ["一覧", "今日", "完了"]  # タスクを表示するタブ
+BULK_FIELDS = ["status", "priority", "due_date", "tags", "today"]  # まとめて変更できる項目
+
+
+def task_tab(task):
+    """タスクが表示されるタブ名を返す"""
+    if task["status"] == "完了":
+        return "完了"
+    if task["today"] == TODAY_OPTIONS[0]:
+        return "今日"
+    return "一覧"
+
+
+def tab_tasks(tasks, tab):
+    """タブに表示する対象のタスクを返す（タブ名が VIEW_TABS 以外ならすべて）"""
+    return tab_query(tab).filter(tasks)
+
+
+def validate_bulk_changes(changes):
+    """まとめて変更する内容を確かめ、タグの前後の空白を除いて返す（不正なら ValueError）"""
+    changes = dict(changes)
+    for field, value in changes.items():
+        if field not in BULK_FIELDS:
+            raise ValueError(f"まとめて変更できない項目です: {field}")
+    if "status" in changes and changes["status"] not in STATUS_OPTIONS[1:]:
+        raise ValueError(f"状態は {'/'.join(STATUS_OPTIONS[1:])} のいずれかです: {changes['status']}")
+    if "priority" in changes and changes["priority"] not in PRIORITY_LEVELS:
+        raise ValueError(f"優先度は {'/'.join(PRIORITY_LEVELS)} のいずれかです: {changes['priority']}")
+    if "today" in changes and changes["today"] not in TODAY_OPTIONS:
+        raise ValueError(f"今日やるは {TODAY_OPTIONS[0]} か空です: {changes['today']}")
+    if changes.get("due_date"):
+        try:
+            date.fromisoformat(changes["due_date"])
+        except ValueError:
+            raise ValueError(f"期限日は YYYY-MM-DD で指定してください: {changes['due_date']}") from None
+    if "tags" in changes:
+        changes["tags"] = ",".join(split_tags(changes["tags"]))
+    return changes
+
+
+def format_due_date(due_date):
+    """期限日（dateまたはNone）を保存用の文字列にする"""
+    return due_date.strftime("%Y-%m-%d") if due_date else ""
+
+
+def open_storage(data_folder):
+    """データフォルダの設定に従ってストレージを作る"""
+    settings = load_settings(data_folder)
+    return create_storage(settings.get("storage_backend", DEFAULT_STORAGE_BACKEND), data_folder)
+
+
+class TaskModel:
+    """
+    タスクとタグを管理するクラス（画面に依存しない）
+
+    store はタスクのマスターリストと索引、tags はタグリスト。
+    タスクを変更するメソッドは、変更操作 (op, task_id, data) のリストを record_changes に渡す。
+    既定ではその場でストレージに書き込む（GUIは書き込みキューに積む関数を渡す）。
+    入力の誤りは ValueError で知らせる。
+    use_search_index=False のときは全文検索インデックスを作らず、検索のたびに全タスクを走査する
+    （1回だけ検索するコマンドラインでは索引を作るより速い）。
+    """
+
+    def __init__(self, data_folder=DEFAULT_DATA_FOLDER, storage=None, record_changes=None, use_search_index=True):
+        self.data_folder = data_folder
+        self.storage = storage if storage is not None else open_storage(data_folder)
+        self.store = TaskStore(view_of=task_tab)  # すべてのタスクのマスターリストとID索引
+        self.tags = []  # 既存のタグリスト
+        self.unused_tags = set()  # タグリストにあるがどのタスクにも使われていないタグ
+        self.record_changes = record_changes or self._record_now
+        self.use_search_index = use_search_index
+        self._archive = None
+
+    @property
+    def tasks(self):
+        """すべてのタスクのマスターリスト（読み取り専用）"""
+        return self.store.tasks
+
+    @tasks.setter
+    def tasks(self, tasks):
+        self.store.reset(tasks)
+
+    @property
+    def data_file(self):
+        return os.path.join(self.data_folder, TASKS_FILE_NAME)
+
+    @property
+    def tags_file(self):
+        return os.path.join(self.data_folder, TAGS_FILE_NAME)
+
+    @property
+    def archive(self):
+        """データフォルダの完了タスクのアーカイブ（データフォルダを変えたら作り直す）"""
+        if self._archive is None or self._archive.data_folder != self.data_folder:
+            self._archive = TaskArchive(self.data_folder)
+        return self._archive
+
+    def _ensure_data_folder(self):
+        """データフォルダが存在しない場合は作成する"""
+        if not os.path.exists(self.data_folder):
+            os.makedirs(self.data_folder)
+
+    def _record_now(self, ops):
+        """変更操作をその場でストレージに書き込む"""
+        if ops:
+            self.storage.record(self.tasks, ops)
+
+    # --- 読み込み・保存 ---
+    def load(self):
+        """ストレージからすべてのタスクを読み込む"""
+        self._ensure_data_folder()
+        tasks = self.storage.load()
+        # スナップショットのキャッシュから読んだときは、タグ索引も作り済みのものを使う
+        self.store.reset(tasks, self.storage.loaded_tag_ids)
+        return self.tasks
+
+    def load_tags(self):
+        """ストレージからタグリストを読み込む"""
+        self._ensure_data_folder()
+        self.tags = self.storage.load_tags()
+        return self.tags
+
+    def save(self):
+        """すべてのタスクを保存する"""
+        self._ensure_data_folder()
+        self.storage.save(self.tasks)
+
+    def save_tags(self):
+        """タグリストを保存する"""
+        self._ensure_data_folder()
+        self.storage.save_tags(self.tags)
+
+    # --- 絞り込みと並び替え ---
+    def search_tasks(self, tasks, search_term):
+        """正規化済みの検索語のすべての語をタスク名・タグに含むタスクを返す"""
+        terms = search_term.split()
+        if not terms:
+            return list(tasks)
+        return [task for task in tasks if self.store.matches(task["id"], terms)]
+
+    def search(self, query, ranked=False):
+        """検索語（空白区切りでAND）に一致するタスクを追加順（ranked なら関連度順）で返す"""
+        if self.use_search_index:
+            return self.store.search(query, ranked)
+        return scan(self.tasks, parse_query(query), ranked)
+
+    def sort_tasks(self, tasks, sort_option):
+        """
+        表示順の設定に従ってタスクのリストをその場で並び替えて返す
+
+        期限順・優先度順・タグ順はタスクごとにキャッシュした数値のキー（優先度は 高<中<低 の順位、
+        期限日は通し日付で期限なしは最後、タグは正規化した文字列）で並べ、同じキーなら追加順。
+        """
+        return self.store.sort(tasks, sort_option)
+
+    def build_query(self, tab=None, query="", status=STATUS_OPTIONS[0]):
+        """タブ・検索欄の入力（「キー:値」の条件を含む）・状態フィルターのクエリ（tab が None ならすべてのタブ）"""
+        return tab_query(tab) & status_query(status) & parse_search(query, self.use_search_index)
+
+    def filter_tasks(self, tab=None, query="", sort_option=SORT_OPTIONS[0], status=STATUS_OPTIONS[0]):
+        """
+        メモリ上のタスクにタブ・検索・状態・並び替えを適用する（tab が None ならすべてのタブ）
+
+        クエリのプランナーが最も絞り込める索引から候補を取り、並び替えはストアが保持している
+        整列済みの列をたどるだけで、リスト全体を並び替え直さない。
+        """
+        return self.build_query(tab, query, status).run(self.store, sort_option)
+
+    @property
+    def queries_storage(self):
+        """ストレージが絞り込みと並び替えをできるか（SQLiteのバックエンドの select_ids）"""
+        return hasattr(self.storage, "select_ids")
+
+    def query_storage(self, tab, query="", sort_option=SORT_OPTIONS[0], status=STATUS_OPTIONS[0]):
+        """
+        ストレージのクエリ機能でタブの表示対象を取得する
+
+        SQLで表せる条件（タブ・状態・優先度など）の絞り込みと並び替えはストレージ、
+        残りの条件（検索語・タグ・期限日）はメモリ上の索引で確かめる。
+        ストレージにクエリ機能がなければメモリ上で行う。
+        """
+        if not self.queries_storage:
+            return self.filter_tasks(tab, query, sort_option, status)
+        conditions, params, rest = self.build_query(tab, query, status).sql()
+        task_ids = self.storage.select_ids(conditions, params, sort_option)
+        if rest:
+            # 検索はデータベースのLIKEではなく全文検索インデックスで行う（全角/半角・かなの違いを無視）
+            matched_ids = {task["id"] for task in rest.run(self.store)}
+            task_ids = [task_id for task_id in task_ids if task_id in matched_ids]
+        tasks = (self.store.get(task_id) for task_id in task_ids)
+        return [task for task in tasks if task is not None]
+
+    # --- タスク操作 (CRUD) ---
+    def add_task(self, name, priority=PRIORITY_LEVELS[1], due_date="", tags="", today=TODAY_OPTIONS[1]):
+        """タスクを追加して返す"""
+        name = name.strip()
+        if not name:
+            raise ValueError("タスク名を入力してください。")
+        new_task = TaskRecord(
+            id=str(uuid.uuid4()),
+            name=name,
+            status="未着手",
+            priority=priority,
+            due_date=due_date,
+            tags=tags,
+            today=today,
+        )
+        self.store.add(new_task)
+        # 追加操作を記録
+        self.record_changes([(OP_ADD, new_task["id"], dict(new_task))])
+        return new_task
+
+    def update_task(self, task_id, changes):
+        """タスクの項目を更新して返す（なければNone）"""
+        if "name" in changes:
+            changes = dict(changes, name=changes["name"].strip())
+            if not changes["name"]:
+                raise ValueError("タスク名を入力してください。")
+        task = self.store.update(task_id, changes)
+        if task is not None:
+            # 更新操作を記録
+            self.record_changes([(OP_UPDATE, task_id, changes)])
+        return task
+
+    def delete_tasks(self, task_ids):
+        """タスクを削除し、削除したタスクのリストを返す"""
+        removed = self.store.delete(task_ids)
+        # 削除操作を記録
+        self.record_changes([(OP_DELETE, task["id"], None) for task in removed])
+        return removed
+
+    def set_status(self, task_ids, status):
+        """タスクの状態を status にし、変更したタスクIDのリストを返す"""
+        if status not in STATUS_OPTIONS[1:]:
+            raise ValueError(f"状態は {'/'.join(STATUS_OPTIONS[1:])} のいずれかです: {status}")
+        return self._change_field(task_ids, "status", OP_STATUS, lambda task: status)
+
+    def toggle_status(self, task_ids):
+        """タスクの状態（未着手/完了）を切り替え、変更したタスクIDのリストを返す"""
+        return self._change_field(task_ids, "status", OP_STATUS,
+                                  lambda task: "完了" if task["status"] == "未着手" else "未着手")
+
+    def toggle_today(self, task_ids):
+        """タスクの今日やる属性を切り替え、変更したタスクIDのリストを返す"""
+        return self._change_field(task_ids, "today", OP_TODAY,
+                                  lambda task: TODAY_OPTIONS[0] if task["today"] == TODAY_OPTIONS[1] else TODAY_OPTIONS[1])
+
+    def _change_field(self, task_ids, field, op, new_value):
+        """IDでタスクを取得して項目を new_value(task) に変え、まとめて1回記録する"""
+        changes_by_id = {}
+        for task_id in task_ids:
+            task = self.store.get(task_id)
+            if task is None:
+                continue
+            value = new_value(task)
+            if task[field] != value:
+                changes_by_id[task_id] = {field: value}
+        self.store.update_many(changes_by_id)
+        self.record_changes([(op, task_id, changes[field]) for task_id, changes in changes_by_id.items()])
+        return list(changes_by_id)
+
+    def bulk_update(self, task_ids, changes):
+        """
+        タスクIDのタスクに同じ変更（BULK_FIELDS の項目 -> 値）をまとめて適用する
+
+        値が変わるタスクだけを1回の走査で更新し、変更操作は1回にまとめて記録する。
+        変更したタスクIDのリストを返す。
+        """
+        changes = validate_bulk_changes(changes)
+        changes_by_id = {}
+        for task_id in dict.fromkeys(task_ids):
+            task = self.store.get(task_id)
+            if task is None:
+                continue
+            diff = {field: value for field, value in changes.items() if task[field] != value}
+            if diff:
+                changes_by_id[task_id] = diff
+        self.store.update_many(changes_by_id)
+        self.record_changes([(OP_UPDATE, task_id, diff) for task_id, diff in changes_by_id.items()])
+        return list(changes_by_id)
+
+    def import_tasks(self, tasks):
+        """
+        確かめて重複を除いた新しいタスクをまとめて末尾に追加し、追加した件数を返す
+
+        1件ずつの add_task とちがい、並べ替えの索引はまとめて作り直し、追加操作は1回にまとめて記録する。
+        """
+        tasks = list(tasks)
+        self.store.extend(tasks)
+        self.record_changes([(OP_ADD, task["id"], dict(task)) for task in tasks])
+        return len(tasks)
+
+    def upsert_tasks(self, tasks):
+        """
+        タスクをIDで突き合わせて取り込み、(追加した件数, 更新した件数) を返す
+
+        変更操作は記録しないので、取り込みが終わったら save() で全体を保存する。
+        """
+        added = updated = 0
+        for task in tasks:
+            if self.store.get(task["id"]) is None:
+                self.store.add(task)
+                added += 1
+            else:
+                self.store.update(task["id"], task)
+                updated += 1
+        return added, updated
+
+    # --- 完了タスクのアーカイブ ---
+    def archive_completed(self, after_days, today=None):
+        """
+        完了してから after_days 日以上たったタスクを月ごとのアーカイブへ移し、移したタスクのリストを返す
+
+        アーカイブへ書き込んでからマスターリストから削除し、削除操作をまとめて記録する。
+        after_days が0ならアーカイブしない。
+        """
+        if after_days <= 0:
+            return []
+        archived = self.archive.archive(self.tasks, after_days, today)
+        removed = self.store.delete({task["id"] for task in archived})
+        self.record_changes([(OP_DELETE, task["id"], None) for task in removed])
+        return removed
+
+    def restore_archived(self, task_ids):
+        """読み込んだアーカイブのタスクを未着手に戻してマスターリストの末尾へ戻し、戻したタスクのリストを返す"""
+        restored = [task for task in self.archive.remove(task_ids) if self.store.get(task["id"]) is None]
+        for task in restored:
+            task["status"] = STATUS_OPTIONS[1]
+        self.import_tasks(restored)
+        return restored
+
+    def delete_archived(self, task_ids):
+        """読み込んだアーカイブのタスクを削除し、削除したタスクのリストを返す"""
+        return self.archive.remove(task_ids)
+
+    # --- タグ ---
+    def add_tags(self, tags):
+        """タグリストにないタグを追加し、追加したタグのリストを返す"""
+        new_tags = []
+        for tag in tags:
+            if tag not in self.tags and tag not in new_tags:
+                new_tags.append(tag)
+        self.tags.extend(new_tags)
+        # タスクで使われなければ次の変更時に片付ける
+        self.unused_tags.update(tag for tag in new_tags if not self.store.tag_count(tag))
+        return new_tags
+
+    def add_tags_from_text(self, text):
+        """カンマ区切りの入力からタグリストにないタグを追加し、追加したタグのリストを返す"""
+        return self.add_tags(split_tags(text))
+
+    def extract_tags_from_tasks(self):
+        """タスクで使われていてタグリストにないタグを追加し、追加したタグのリストを返す"""
+        known_tags = set(self.tags)
+        new_tags = [tag for tag in self.store.used_tags() if tag not in known_tags]
+        self.tags.extend(new_tags)
+        return new_tags
+
+    def reset_tag_changes(self):
+        """読み込み直後の状態を基準に、タグの増減と使われていないタグの記録をやり直す"""
+        self.store.pop_tag_changes()
+        self.unused_tags = {tag for tag in self.tags if not self.store.tag_count(tag)}
+
+    def cleanup_unused_tags(self):
+        """どのタスクにも使われていないタグを削除する（変化があれば True）"""
+        used_tags = [tag for tag in self.tags if self.store.tag_count(tag)]
+        self.unused_tags.clear()
+        if len(used_tags) == len(self.tags):
+            return False
+        self.tags = used_tags
+        return True
+
+    def sync_tags(self):
+        """タスクの変更で増減したタグだけをタグリストに反映する（変化があれば True）"""
+        added, removed = self.store.pop_tag_changes()
+        removed = removed | self.unused_tags
+        self.unused_tags = set()
+        changed = False
+        if removed:
+            kept_tags = [tag for tag in self.tags if tag not in removed or self.store.tag_count(tag)]
+            if len(kept_tags) != len(self.tags):
+                self.tags = kept_tags
+                changed = True
+        if added:
+            known_tags = set(self.tags)
+            new_tags = [tag for tag in added if tag not in known_tags]
+            if new_tags:
+                self.tags.extend(new_tags)
+                changed = True
+        return changed
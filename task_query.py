@@ -0,0 +1,349 @@
+"""
+taskcon タスクの絞り込みクエリ
+
+状態・優先度・今日やる・期限日の範囲・タグ・検索語の条件（Predicate）を組み合わせたクエリを、
+タスクストアの索引を使って評価する。プランナーは条件ごとに使える索引（状態などの値ごとのID集合、
+期限順の整列済みの列、タグの転置索引、全文検索インデックス）の候補件数を見積もり、
+最も候補の少ない索引から始めて残りの条件を1件ずつ確かめる。候補が全体の多くを占めるときや
+使える索引がないときは、並び替えの順に全体を1回だけ走査する。
+タブ（一覧/今日/完了）・状態フィルター・検索欄の入力も、すべてこのクエリで表す。
+
+検索欄では空白で区切った語のうち「キー:値」の形の語を条件として読む（それ以外の語は検索語）。
+- タグ:A,B（tag:）      タグ A と B をどちらも持つ
+- 状態:完了（status:）   状態（未着手は完了以外）
+- 優先度:高,中（priority:） 優先度のいずれか
+- 今日:〇（today:）      今日やるタスク（今日:× で今日やらないタスク）
+- 期限:2024-06-01..2024-06-30（due:） 期限日の範囲（片側は省略可、日付1つならその日）
+"""
+
+import unicodedata
+from datetime import date
+from operator import itemgetter
+
+from search_index import normalize_text, parse_query
+from task_record import tag_tuple
+from task_store import NO_DUE_ORDINAL, due_ordinal
+
+DONE_STATUS = "完了"
+TODAY_MARK = "〇"
+NOT_TODAY_MARK = "×"
+INDEX_SELECTIVITY = 4  # 索引の候補がタスク数のこの割合（1/4）未満のときだけ索引から始める
+DUE_RANGE_SEPARATOR = ".."
+# 検索欄の「キー:値」のキー -> 条件の種類
+QUERY_KEYS = {
+    "tag": "tags", "タグ": "tags",
+    "status": "status", "状態": "status",
+    "priority": "priority", "優先度": "priority",
+    "today": "today", "今日": "today",
+    "due": "due_date", "期限": "due_date",
+}
+
+
+class Predicate:
+    """
+    クエリの条件の基底クラス
+
+    estimate は索引から見積もった候補の件数（索引を使えなければNone）、candidates はその候補のタスクIDの集合、
+    matcher はタスク1件を確かめる関数を返す（store がNoneなら索引を使わずにタスクの値だけで確かめる）。
+    sql はデータベースで絞り込むときの (WHERE句の条件, 引数)（SQLで表せなければNone）。
+    """
+
+    def estimate(self, store):
+        return None
+
+    def candidates(self, store):
+        raise NotImplementedError
+
+    def matcher(self, store=None):
+        raise NotImplementedError
+
+    def sql(self):
+        return None
+
+    def describe(self):
+        """条件の説明（プランの表示用）"""
+        raise NotImplementedError
+
+
+class FieldIs(Predicate):
+    """項目の値が values のいずれかである（exclude なら、いずれでもない）"""
+
+    def __init__(self, field, values, exclude=False):
+        self.field = field
+        self.values = frozenset(values)
+        self.exclude = exclude
+
+    def _value_ids(self, store):
+        """条件に合う値 -> タスクIDの集合"""
+        value_ids = store.value_ids(self.field)
+        return [ids for value, ids in value_ids.items() if (value in self.values) is not self.exclude]
+
+    def estimate(self, store):
+        return sum(map(len, self._value_ids(store)))
+
+    def candidates(self, store):
+        return set().union(*self._value_ids(store))
+
+    def matcher(self, store=None):
+        get, values = itemgetter(self.field), self.values
+        # 全件を走査するときに1件ごとに呼ばれるので、値が1つのときは比較だけにする
+        if len(values) == 1:
+            (value,) = values
+            return (lambda task: get(task) != value) if self.exclude else (lambda task: get(task) == value)
+        return (lambda task: get(task) not in values) if self.exclude else (lambda task: get(task) in values)
+
+    def sql(self):
+        placeholders = ", ".join("?" * len(self.values))
+        return f"{self.field} {'NOT IN' if self.exclude else 'IN'} ({placeholders})", sorted(self.values)
+
+    def describe(self):
+        return f"{self.field} {'not in' if self.exclude else 'in'} {{{', '.join(sorted(self.values))}}}"
+
+
+class DueBetween(Predicate):
+    """期限日が start から end まで（両端を含む。None なら片側を限らない。期限日のないタスクは含まない）"""
+
+    def __init__(self, start=None, end=None):
+        self.start = _ordinal(start) if start is not None else 1
+        self.end = _ordinal(end) if end is not None else NO_DUE_ORDINAL - 1
+
+    def estimate(self, store):
+        return store.count_due_between(self.start, self.end)
+
+    def candidates(self, store):
+        return set(store.ids_due_between(self.start, self.end))
+
+    def matcher(self, store=None):
+        start, end = self.start, self.end
+        if store is None:
+            return lambda task: start <= due_ordinal(task.get("due_date")) <= end
+        task_due_ordinal = store.task_due_ordinal
+        return lambda task: start <= task_due_ordinal(task) <= end
+
+    def describe(self):
+        return f"due_date {date.fromordinal(self.start)}..{date.fromordinal(self.end)}"
+
+
+class HasTags(Predicate):
+    """タグをすべて持つ（match_any なら、いずれかを持つ）"""
+
+    def __init__(self, tags, match_any=False):
+        self.tags = tag_tuple(tags) if isinstance(tags, str) else tuple(tags)
+        self.match_any = match_any
+
+    def estimate(self, store):
+        counts = [store.tag_count(tag) for tag in self.tags]
+        if not counts:
+            return None
+        return sum(counts) if self.match_any else min(counts)
+
+    def candidates(self, store):
+        tag_ids = sorted((store.ids_with_tag(tag) for tag in self.tags), key=len)
+        if self.match_any:
+            return set().union(*tag_ids)
+        matched = set(tag_ids[0])
+        for task_ids in tag_ids[1:]:
+            matched.intersection_update(task_ids)
+        return matched
+
+    def matcher(self, store=None):
+        tags, check = frozenset(self.tags), (any if self.match_any else all)
+        if not tags:
+            return lambda task: True
+        return lambda task: check(tag in tag_tuple(task.get("tags")) for tag in tags)
+
+    def describe(self):
+        return f"tags {'any' if self.match_any else 'all'} {{{', '.join(self.tags)}}}"
+
+
+class TextMatches(Predicate):
+    """検索語（空白区切り）のすべての語をタスク名かタグに含む（全角/半角・かなの違いは無視）"""
+
+    def __init__(self, text, use_index=True):
+        self.terms = parse_query(text)
+        self.use_index = use_index
+
+    def estimate(self, store):
+        return store.search_estimate(self.terms) if self.use_index else None
+
+    def candidates(self, store):
+        return store.search_ids(self.terms)
+
+    def matcher(self, store=None):
+        terms = self.terms
+        if store is not None and self.use_index:
+            return lambda task: store.matches(task["id"], terms)
+
+        def matches(task):
+            name, tags = normalize_text(task.get("name")), normalize_text(task.get("tags"))
+            return all(term in name or term in tags for term in terms)
+        return matches
+
+    def describe(self):
+        return f"text {' '.join(self.terms)}"
+
+
+class TaskQuery:
+    """
+    条件をすべて満たすタスクを探すクエリ
+
+    query & other で両方の条件を満たすクエリを作る。run はストアの索引を使って評価し、
+    filter は索引を使わずにタスクのリストを1件ずつ確かめる（アーカイブのタスクなど）。
+    """
+
+    def __init__(self, *predicates):
+        self.predicates = tuple(predicates)
+
+    def __and__(self, other):
+        return TaskQuery(*self.predicates, *other.predicates)
+
+    def __bool__(self):
+        return bool(self.predicates)
+
+    def without(self, predicate_type):
+        """predicate_type の条件を除いたクエリ"""
+        return TaskQuery(*(p for p in self.predicates if not isinstance(p, predicate_type)))
+
+    def plan(self, store):
+        """
+        (最初に使う条件, 残りの条件のタプル) を返す
+
+        最初に使う条件は候補の見積もりが最も少ない索引の条件で、候補がタスク数の 1/INDEX_SELECTIVITY 以上なら
+        None（全体を走査する）。
+        """
+        best, best_estimate = None, len(store) / INDEX_SELECTIVITY
+        for predicate in self.predicates:
+            estimate = predicate.estimate(store)
+            if estimate is not None and estimate < best_estimate:
+                best, best_estimate = predicate, estimate
+        return best, tuple(p for p in self.predicates if p is not best)
+
+    def explain(self, store):
+        """プランの説明"""
+        first, rest = self.plan(store)
+        lines = [f"index: {first.describe()} (~{first.estimate(store)}件)" if first is not None
+                 else f"scan: {len(store)}件"]
+        lines.extend(f"filter: {predicate.describe()}" for predicate in rest)
+        return "\n".join(lines)
+
+    def run(self, store, sort_option="追加順"):
+        """ストアのタスクのうち条件を満たすものを並び替えの順で返す"""
+        first, rest = self.plan(store)
+        match = _all_of([predicate.matcher(store) for predicate in rest])
+        if first is None:
+            tasks = store.ordered(sort_option)
+            return tasks if match is None else [task for task in tasks if match(task)]
+        task_ids = first.candidates(store)
+        if match is not None:
+            get = store.get
+            task_ids = {task_id for task_id in task_ids if match(get(task_id))}
+        return store.ordered(sort_option, task_ids)
+
+    def filter(self, tasks):
+        """タスクのリストのうち条件を満たすものを元の順で返す（索引を使わない）"""
+        match = _all_of([predicate.matcher() for predicate in self.predicates])
+        return list(tasks) if match is None else [task for task in tasks if match(task)]
+
+    def sql(self):
+        """(SQLで表せる条件のリスト, 引数のリスト, SQLで表せない残りのクエリ)"""
+        conditions, params, rest = [], [], []
+        for predicate in self.predicates:
+            clause = predicate.sql()
+            if clause is None:
+                rest.append(predicate)
+                continue
+            conditions.append(clause[0])
+            params.extend(clause[1])
+        return conditions, params, TaskQuery(*rest)
+
+
+def _all_of(matchers):
+    """すべての関数が真になるかを確かめる関数（条件がなければNone）"""
+    if not matchers:
+        return None
+    if len(matchers) == 1:
+        return matchers[0]
+    if len(matchers) == 2:
+        first, second = matchers
+        return lambda task: first(task) and second(task)
+    return lambda task: all(match(task) for match in matchers)
+
+
+def _ordinal(value):
+    """日付（date か YYYY-MM-DD）の通し日付（読めなければ ValueError）"""
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(value).toordinal()
+
+
+def tab_query(tab):
+    """タブに表示するタスクのクエリ（タブ名が一覧/今日/完了以外ならすべて）"""
+    if tab == "一覧":
+        return TaskQuery(FieldIs("status", [DONE_STATUS], exclude=True), FieldIs("today", [TODAY_MARK], exclude=True))
+    if tab == "今日":
+        return TaskQuery(FieldIs("today", [TODAY_MARK]), FieldIs("status", [DONE_STATUS], exclude=True))
+    if tab == "完了":
+        return TaskQuery(FieldIs("status", [DONE_STATUS]))
+    return TaskQuery()
+
+
+def status_query(status):
+    """状態フィルターのクエリ（未着手は完了以外、すべて なら条件なし）"""
+    if status == DONE_STATUS:
+        return TaskQuery(FieldIs("status", [DONE_STATUS]))
+    if status == "未着手":
+        return TaskQuery(FieldIs("status", [DONE_STATUS], exclude=True))
+    return TaskQuery()
+
+
+def split_search(text):
+    """
+    検索欄の入力を (「キー:値」の語の (条件の種類, 値, 元の語) のタプル, 残りの検索語) に分ける
+
+    キーの全角/半角・大文字/小文字は区別しない。知らないキーの語は検索語のまま残す。
+    """
+    filters, words = [], []
+    for word in (text or "").split():
+        key, separator, value = word.partition(":") if ":" in word else word.partition("：")
+        field = QUERY_KEYS.get(unicodedata.normalize("NFKC", key).casefold())
+        if separator and value and field is not None:
+            filters.append((field, value, word))
+        else:
+            words.append(word)
+    return tuple(filters), " ".join(words)
+
+
+def _filter_predicate(field, value):
+    """検索欄の「キー:値」の条件（値が読めなければ ValueError）"""
+    if field == "tags":
+        return HasTags(value)
+    if field == "status":
+        # 未着手は完了以外（タブと同じ見方）
+        return FieldIs(field, [DONE_STATUS], exclude=value != DONE_STATUS)
+    if field == "priority":
+        return FieldIs(field, [v for v in value.split(",") if v])
+    if field == "today":
+        return FieldIs(field, [TODAY_MARK], exclude=value == NOT_TODAY_MARK)
+    start, separator, end = value.partition(DUE_RANGE_SEPARATOR)
+    if not separator:
+        end = start
+    return DueBetween(start or None, end or None)
+
+
+def parse_search(text, use_index=True):
+    """
+    検索欄の入力をクエリにする
+
+    期限日が読めない「期限:」の語は、ほかの知らない語と同じく検索語として扱う。
+    use_index=False なら検索語は全文検索インデックスを使わずに確かめる。
+    """
+    filters, words = split_search(text)
+    predicates = []
+    for field, value, word in filters:
+        try:
+            predicates.append(_filter_predicate(field, value))
+        except ValueError:
+            words = f"{words} {word}".strip()
+    if parse_query(words):
+        predicates.append(TextMatches(words, use_index))
+    return TaskQuery(*predicates)
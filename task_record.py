@@ -0,0 +1,160 @@
+"""
+taskcon タスクレコード
+
+タスク1件を __slots__ のクラスで持ち、辞書より少ないメモリで数十万件を保持する。
+状態・優先度・今日やるは決まった値だけなので sys.intern で文字列を共有し、
+値の種類に限りのない期限日・タグは件数に上限のあるキャッシュ（shared_text）の範囲で共有する。
+タグの文字列を分けたタプルも同じタグの組み合わせどうしで共有する。
+task["name"]・task.get()・task.update() など辞書と同じ操作ができるので、
+CSV_HEADERS 形式の読み書きや既存の処理はそのまま使える。
+version はファイルから読んだときのタスクの版で、7項目には含まれない（比較や辞書への変換の対象外）。
+"""
+
+import sys
+from collections.abc import Mapping, MutableMapping
+from functools import lru_cache
+from operator import attrgetter
+
+TASK_FIELDS = ("id", "name", "status", "priority", "due_date", "tags", "today")
+INTERNED_FIELDS = frozenset({"status", "priority", "today"})  # 値が決まっていて sys.intern で共有する項目
+CACHED_FIELDS = frozenset({"due_date", "tags"})  # shared_text のキャッシュで共有する項目
+SHARED_TEXT_CACHE_SIZE = 65536  # 期限日・タグの文字列を共有する値の数
+TAG_TUPLE_CACHE_SIZE = 65536  # タグのタプルを共有するタグの組み合わせの数
+
+_FIELD_SET = frozenset(TASK_FIELDS)
+_intern = sys.intern
+
+
+@lru_cache(maxsize=SHARED_TEXT_CACHE_SIZE)
+def shared_text(value):
+    """同じ値の文字列を1つのオブジェクトにまとめて返す（キャッシュにある間だけ共有する）"""
+    return value
+
+
+def _shared(key, value):
+    """項目の値を共有する文字列にする"""
+    if key in INTERNED_FIELDS:
+        return _intern(value)
+    if key in CACHED_FIELDS:
+        return shared_text(value)
+    return value
+
+
+@lru_cache(maxsize=TAG_TUPLE_CACHE_SIZE)
+def tag_tuple(tags):
+    """カンマ区切りのタグ文字列をタグのタプルにする（同じ文字列なら同じタプルを返す）"""
+    return tuple(tag.strip() for tag in (tags or "").split(',') if tag.strip())
+
+
+class TaskRecord(MutableMapping):
+    """
+    タスク1件（CSV_HEADERS の7項目）を持つレコード
+
+    項目は属性（task.name）としても、辞書のキー（task["name"]）としても読み書きできる。
+    7項目以外のキーは持てない（KeyError）。
+    version は書き込むたびに増える版の番号（まだ版のあるファイルに書いていなければ0）。
+    """
+
+    __slots__ = TASK_FIELDS + ("version",)
+
+    def __init__(self, id="", name="", status="未着手", priority="中", due_date="", tags="", today="", version=0):
+        # 読み込みで何十万回も呼ばれるので _shared() を経由しない
+        self.id = id
+        self.name = name
+        self.status = _intern(status)
+        self.priority = _intern(priority)
+        self.due_date = shared_text(due_date)
+        self.tags = shared_text(tags)
+        self.today = _intern(today)
+        self.version = version
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        項目ごとの列（TASK_FIELDS の順の7列と版の列）からレコードのリストを作る
+
+        スナップショットのキャッシュから数十万件を作るので、__init__ を呼ばずに値を入れる。
+        """
+        ids, names, statuses, priorities, due_dates, tags, todays, versions = columns
+        statuses, priorities, todays = ([_intern(value) for value in column]
+                                        for column in (statuses, priorities, todays))
+        due_dates, tags = ([shared_text(value) for value in column] for column in (due_dates, tags))
+        new = object.__new__
+        records = []
+        append = records.append
+        for values in zip(ids, names, statuses, priorities, due_dates, tags, todays, versions):
+            record = new(cls)
+            (record.id, record.name, record.status, record.priority, record.due_date, record.tags, record.today,
+             record.version) = values
+            append(record)
+        return records
+
+    @property
+    def tag_list(self):
+        """タグのタプル（同じタグの組み合わせのタスクどうしで共有）"""
+        return tag_tuple(self.tags)
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, _shared(key, value))
+
+    def __delitem__(self, key):
+        raise TypeError("タスクの項目は削除できません")
+
+    def __iter__(self):
+        return iter(TASK_FIELDS)
+
+    def __len__(self):
+        return len(TASK_FIELDS)
+
+    def __contains__(self, key):
+        return key in _FIELD_SET
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if isinstance(other, Mapping) else other
+        for key, value in items:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def copy(self):
+        return TaskRecord(*(getattr(self, field) for field in TASK_FIELDS), self.version)
+
+    def __eq__(self, other):
+        if isinstance(other, TaskRecord):
+            return _record_values(self) == _record_values(other)
+        if isinstance(other, Mapping):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (TaskRecord, (*(getattr(self, field) for field in TASK_FIELDS), self.version))
+
+    def __repr__(self):
+        return f"TaskRecord({dict(self)!r})"
+
+
+_record_values = attrgetter(*TASK_FIELDS)
+
+
+def task_values(task):
+    """タスクの7項目の値のタプル（TASK_FIELDS の順。辞書のタスクにない項目は空文字）"""
+    if type(task) is TaskRecord:
+        return _record_values(task)
+    return tuple(task.get(field, "") for field in TASK_FIELDS)
+
+
+def task_version(task):
+    """タスクの版（版を持たない辞書のタスクは0）"""
+    return getattr(task, "version", 0)
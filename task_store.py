@@ -0,0 +1,602 @@
+"""
+taskcon タスクストア
+
+タスクのマスターリストと、タスクIDからタスクを引く索引、
+タグからタスクIDを引く転置索引、全文検索インデックス、並び替えごとの整列済みの列、
+期限日の近い順のヒープ、状態などの値ごとのタスクIDの集合を管理する。
+"""
+
+import heapq
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import date
+
+from search_index import SearchIndex, normalize_text, parse_query
+from task_record import TaskRecord, tag_tuple, task_version
+
+PRIORITY_RANKS = {"高": 0, "中": 1, "低": 2}  # 優先度 -> 並び替えの順位（知らない値は最後）
+NO_DUE_ORDINAL = date.max.toordinal() + 1  # 期限日のないタスクを期限順で最後にするための値
+# 並び替え -> タスクの並び替えキー (優先度の順位, 期限日の通し日付, 正規化したタグ) から作るキー
+# （追加順はマスターリストの並びそのもの）
+SORT_ORDERS = {
+    "期限順": lambda keys: (keys[1], keys[0]),
+    "優先度順": lambda keys: (keys[0], keys[1]),
+    "タグ順": lambda keys: (keys[2], keys[1]),
+}
+VALUE_INDEX_FIELDS = ("status", "priority", "today")  # 値ごとのタスクIDの集合を持つ項目
+BULK_CHANGE_THRESHOLD = 64  # これより多く追加・削除・更新するときは整列済みの列を1回の走査で作り直す
+
+
+def split_tags(tags):
+    """カンマ区切りのタグ文字列をタグのタプルにする（同じ文字列なら共有したタプル）"""
+    return tag_tuple(tags)
+
+
+def due_ordinal(due_date):
+    """期限日（YYYY-MM-DD）の通し日付（期限日がないか読めなければ NO_DUE_ORDINAL）"""
+    try:
+        return date.fromisoformat(due_date).toordinal()
+    except (TypeError, ValueError):
+        return NO_DUE_ORDINAL
+
+
+def task_sort_keys(task):
+    """タスクの並び替えキー (優先度の順位, 期限日の通し日付, 正規化したタグ)"""
+    return (PRIORITY_RANKS.get(task.get("priority"), len(PRIORITY_RANKS)),
+            due_ordinal(task.get("due_date")),
+            normalize_text(task.get("tags")))
+
+
+def _indexed_values(task):
+    """タスクの VALUE_INDEX_FIELDS の値のタプル"""
+    return tuple(task.get(field, "") for field in VALUE_INDEX_FIELDS)
+
+
+class TagIndex:
+    """
+    タグ -> タスクIDの集合 の転置索引
+
+    タグごとの参照数（タスク数）を保持し、タスクのタグが変わったときに
+    変わったタグだけを更新する。参照数が0になったタグは索引から消える。
+    """
+
+    def __init__(self):
+        self._task_ids = {}  # タグ -> タスクIDの集合（最初に使われた順）
+
+    def __contains__(self, tag):
+        return tag in self._task_ids
+
+    def __iter__(self):
+        return iter(self._task_ids)
+
+    def count(self, tag):
+        """タグを使っているタスクの数"""
+        return len(self._task_ids.get(tag, ()))
+
+    def task_ids(self, tag):
+        """タグを使っているタスクIDの集合"""
+        return self._task_ids.get(tag, frozenset())
+
+    def rebuild(self, tasks):
+        """すべてのタスクから索引を作り直す"""
+        self._task_ids = {}
+        for task in tasks:
+            self.add(task["id"], task.get("tags"))
+
+    def load(self, tag_ids):
+        """タグ -> タスクIDの並び から索引を作り直す（rebuild と同じ結果になるもの）"""
+        self._task_ids = {tag: set(task_ids) for tag, task_ids in tag_ids.items()}
+
+    def add(self, task_id, tags):
+        """タスクのタグを登録し、新たに使われ始めたタグを出現順に返す"""
+        added = []
+        for tag in split_tags(tags):
+            task_ids = self._task_ids.get(tag)
+            if task_ids is None:
+                task_ids = self._task_ids[tag] = set()
+                added.append(tag)
+            task_ids.add(task_id)
+        return added
+
+    def remove(self, task_id, tags):
+        """タスクのタグを外し、使われなくなったタグを返す"""
+        removed = []
+        for tag in split_tags(tags):
+            task_ids = self._task_ids.get(tag)
+            if task_ids is None:
+                continue
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self._task_ids[tag]
+                removed.append(tag)
+        return removed
+
+
+class TaskStore:
+    """
+    タスクのマスターリストとID索引を持つクラス
+
+    tasks は追加順のリスト、_by_id は id -> タスク の辞書、tag_index はタグの転置索引、
+    search_index はタスク名・タグの全文検索インデックス（最初の検索のときに作る）、
+    _seq は id -> 追加順の通し番号。
+    _sort_keys は id -> task_sort_keys の結果、_sorted は 並び替え -> (キー..., 通し番号, タスク) の整列済みリストで、
+    どちらも最初に並び替えたときに作り、以後はタスクの変更に合わせて二分探索で挿入・削除する。
+    _due_heap は (期限日の通し日付, 通し番号, タスクID) のヒープで、期限切れになったタスクを
+    日付が変わったときに取り出すのに使う（期限日や状態が変わった古い要素は取り出すときに捨てる）。
+    _value_ids は 項目 -> 値 -> タスクIDの集合（VALUE_INDEX_FIELDS の項目。最初に使うときに作る）。
+    取得・更新はIDでO(1)、削除はまとめて1回の走査で行う。
+    マスターリストは tasks で読み取り専用のタプルとして返し、変更はすべて add・update・delete などを通す。
+    タグの増減は pop_tag_changes で取り出せる。
+    version は内容が変わるたびに増える番号で、検索結果などのキャッシュの検証に使う。
+    view_of を渡すと、タスクが表示されるビュー名（タブなど）ごとの変更番号も管理する。
+    """
+
+    def __init__(self, tasks=None, view_of=None):
+        self._tasks = []  # マスターリスト（add・update・delete などでだけ変更する）
+        self._tasks_view = None  # tasks で返す読み取り専用のタプル（追加・削除までキャッシュする）
+        self._by_id = {}
+        self._version = 0
+        self._generation = 0  # マスターリストを丸ごと作り直した回数
+        self.view_of = view_of  # タスク -> 表示されるビュー名（なければNone）
+        self._view_versions = {}  # ビュー名 -> そのビューに関わる変更の回数
+        self.tag_index = TagIndex()
+        self.search_index = SearchIndex()
+        self._search_index_ready = False
+        self._seq = {}  # タスクID -> 追加順の通し番号
+        self._next_seq = 0
+        self._sort_keys = None  # タスクID -> 並び替えキー（最初に並び替えるまでNone）
+        self._sorted = {}  # 並び替え -> 整列済みの (キー..., 通し番号, タスク) のリスト
+        self._due_heap = None  # (期限日の通し日付, 通し番号, タスクID) のヒープ（最初に使うまでNone）
+        self._value_ids = None  # 項目 -> 値 -> タスクIDの集合（最初に使うまでNone）
+        self._deferred_resort = None  # まとめて更新している間、並び替え直しを後回しにするタスクIDの集合
+        self._added_tags = {}  # 前回の pop_tag_changes 以降に使われ始めたタグ（出現順）
+        self._removed_tags = set()  # 前回の pop_tag_changes 以降に使われなくなったタグ
+        self.reset(tasks or [])
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks)
+
+    def __contains__(self, task_id):
+        return task_id in self._by_id
+
+    @property
+    def tasks(self):
+        """マスターリスト（読み取り専用のタプル。変更は add・update・delete などで行う）"""
+        if self._tasks_view is None:
+            self._tasks_view = tuple(self._tasks)
+        return self._tasks_view
+
+    @property
+    def version(self):
+        """内容の変更番号"""
+        return self._version
+
+    def view_version(self, view):
+        """ビューの内容に関わる変更番号（ビューのキャッシュの検証に使う）"""
+        return (self._generation, self._view_versions.get(view, 0))
+
+    def _touch_view(self, task):
+        """タスクが表示されるビューの変更番号を進める"""
+        if self.view_of is not None:
+            view = self.view_of(task)
+            self._view_versions[view] = self._view_versions.get(view, 0) + 1
+
+    def reset(self, tasks, tag_ids=None):
+        """
+        マスターリストを置き換えて索引を作り直す
+
+        tag_ids（タグ -> タスクIDのタプル。スナップショットのキャッシュから読んだもの）を渡すと、
+        タグ索引はタスクのタグを分けずにそこから作る。
+        """
+        self._tasks = list(tasks)
+        self._rebuild_index(tag_ids)
+
+    def _rebuild_index(self, tag_ids=None):
+        """マスターリストからID索引とタグ索引を作り直す"""
+        self._by_id = {task["id"]: task for task in self._tasks}
+        self._tasks_view = None
+        self._version += 1
+        self._generation += 1
+        self._seq = {task["id"]: seq for seq, task in enumerate(self._tasks)}
+        self._next_seq = len(self._tasks)
+        # 全文検索インデックスと並び替えキーは読み込みを遅くしないよう、使われるまで作らない
+        self._search_index_ready = False
+        self._sort_keys = None
+        self._sorted = {}
+        self._due_heap = None
+        self._value_ids = None
+        old_tags = set(self.tag_index)
+        if tag_ids is None:
+            self.tag_index.rebuild(self._tasks)
+        else:
+            self.tag_index.load(tag_ids)
+        self._note_tag_changes([tag for tag in self.tag_index if tag not in old_tags],
+                               old_tags.difference(self.tag_index))
+
+    def _note_tag_changes(self, added, removed):
+        """タグの増減を記録する（同じタグの増減は打ち消し合う）"""
+        for tag in removed:
+            if tag in self._added_tags:
+                del self._added_tags[tag]
+            else:
+                self._removed_tags.add(tag)
+        for tag in added:
+            if tag in self._removed_tags:
+                self._removed_tags.discard(tag)
+            else:
+                self._added_tags[tag] = None
+
+    def pop_tag_changes(self):
+        """前回の呼び出し以降に使われ始めたタグ（出現順）と使われなくなったタグを返す"""
+        changes = (list(self._added_tags), self._removed_tags)
+        self._added_tags, self._removed_tags = {}, set()
+        return changes
+
+    def used_tags(self):
+        """いずれかのタスクで使われているタグ（最初に使われた順）"""
+        return list(self.tag_index)
+
+    def tag_count(self, tag):
+        """タグを使っているタスクの数"""
+        return self.tag_index.count(tag)
+
+    def search(self, query, ranked=False):
+        """
+        検索語（空白区切りでAND）に一致するタスクを返す
+
+        既定では追加順、ranked=True のときは関連度の高い順（同じ関連度なら追加順）。
+        """
+        self._ensure_search_index()
+        terms = parse_query(query)
+        task_ids = self.search_index.search(terms)
+        if ranked:
+            key = lambda task_id: (self.search_index.score(task_id, terms), self._seq[task_id])
+        else:
+            key = self._seq.__getitem__
+        return [self._by_id[task_id] for task_id in sorted(task_ids, key=key)]
+
+    def _ensure_search_index(self):
+        """全文検索インデックスを使える状態にする"""
+        if not self._search_index_ready:
+            self.search_index.rebuild(self._tasks)
+            self._search_index_ready = True
+
+    def _ensure_sort_keys(self):
+        """並び替えキーを使える状態にする"""
+        if self._sort_keys is None:
+            self._sort_keys = {task["id"]: task_sort_keys(task) for task in self._tasks}
+
+    def _sort_entry(self, sort_option, task_id):
+        """整列済みの列に入れる (キー..., 通し番号, タスク)（通し番号は重複しないのでタスクどうしは比べない）"""
+        return SORT_ORDERS[sort_option](self._sort_keys[task_id]) + (self._seq[task_id], self._by_id[task_id])
+
+    def _sorted_entries(self, sort_option):
+        """並び替えの整列済みの列（なければ作る）"""
+        self._ensure_sort_keys()
+        entries = self._sorted.get(sort_option)
+        if entries is None:
+            entries = self._sorted[sort_option] = sorted(
+                self._sort_entry(sort_option, task["id"]) for task in self._tasks)
+        return entries
+
+    def sort_key(self, task_id, sort_option):
+        """タスクの並び替えキー（追加順なら通し番号）"""
+        self._ensure_sort_keys()
+        if sort_option not in SORT_ORDERS:
+            return (self._seq[task_id],)
+        return self._sort_entry(sort_option, task_id)[:-1]
+
+    def sort(self, tasks, sort_option):
+        """タスクのリストをキャッシュした並び替えキーでその場で並び替えて返す"""
+        tasks.sort(key=lambda task: self.sort_key(task["id"], sort_option))
+        return tasks
+
+    def ordered(self, sort_option, task_ids=None):
+        """
+        タスクを並び替えの順で返す（task_ids を渡すとそのIDのタスクだけ）
+
+        全体や多くのタスクは整列済みの列をたどるだけで並び替えない。
+        少ないタスクはキャッシュした並び替えキーで並び替える。
+        """
+        if sort_option not in SORT_ORDERS:
+            if task_ids is None:
+                return list(self._tasks)
+            if len(task_ids) * 8 < len(self._tasks):
+                return sorted((self._by_id[task_id] for task_id in task_ids), key=lambda task: self._seq[task["id"]])
+            return [task for task in self._tasks if task["id"] in task_ids]
+        entries = self._sorted_entries(sort_option)
+        if task_ids is None:
+            return [entry[-1] for entry in entries]
+        if len(task_ids) * 8 < len(entries):
+            return self.sort([self._by_id[task_id] for task_id in task_ids], sort_option)
+        return [entry[-1] for entry in entries if entry[-1]["id"] in task_ids]
+
+    def count_due_between(self, start, end):
+        """期限日の通し日付が start から end までのタスクの数（期限順の列の二分探索で数える）"""
+        entries = self._sorted_entries("期限順")
+        return bisect_left(entries, (end + 1,)) - bisect_left(entries, (start,))
+
+    def ids_due_between(self, start, end):
+        """期限日の通し日付が start から end までのタスクIDを期限順で返す"""
+        entries = self._sorted_entries("期限順")
+        return [entry[-1]["id"] for entry in entries[bisect_left(entries, (start,)):bisect_left(entries, (end + 1,))]]
+
+    def value_ids(self, field):
+        """項目（VALUE_INDEX_FIELDS）の 値 -> その値のタスクIDの集合"""
+        if self._value_ids is None:
+            self._value_ids = {field: {} for field in VALUE_INDEX_FIELDS}
+            for task in self._tasks:
+                self._index_values(task["id"], _indexed_values(task))
+        return self._value_ids[field]
+
+    def _index_values(self, task_id, values):
+        """タスクの値（_indexed_values の結果）を値ごとの集合に登録する（作っていなければ何もしない）"""
+        if self._value_ids is None:
+            return
+        for field, value in zip(VALUE_INDEX_FIELDS, values):
+            self._value_ids[field].setdefault(value, set()).add(task_id)
+
+    def _unindex_values(self, task_id, values):
+        """タスクの値を値ごとの集合から外す（空になった値は消す）"""
+        if self._value_ids is None:
+            return
+        for field, value in zip(VALUE_INDEX_FIELDS, values):
+            task_ids = self._value_ids[field].get(value)
+            if task_ids is not None:
+                task_ids.discard(task_id)
+                if not task_ids:
+                    del self._value_ids[field][value]
+
+    def task_due_ordinal(self, task):
+        """タスクの期限日の通し日付（キャッシュした並び替えキーから。期限日がなければ NO_DUE_ORDINAL）"""
+        self._ensure_sort_keys()
+        keys = self._sort_keys.get(task["id"])
+        return keys[1] if keys is not None else due_ordinal(task.get("due_date"))
+
+    def _ensure_due_heap(self):
+        """期限日のヒープを使える状態にする"""
+        self._ensure_sort_keys()
+        if self._due_heap is None:
+            self._due_heap = [(keys[1], self._seq[task_id], task_id)
+                              for task_id, keys in self._sort_keys.items() if keys[1] != NO_DUE_ORDINAL]
+            heapq.heapify(self._due_heap)
+
+    def _push_due(self, task_id):
+        """タスクを期限日のヒープに積む（ヒープを作っていないか期限日がなければ何もしない）"""
+        if self._due_heap is None:
+            return
+        due = self._sort_keys[task_id][1]
+        if due != NO_DUE_ORDINAL:
+            heapq.heappush(self._due_heap, (due, self._seq[task_id], task_id))
+
+    def _live_due_entry(self, entry):
+        """ヒープの要素がまだ有効か（タスクが残っていて期限日が同じで、完了していない）"""
+        due, seq, task_id = entry
+        task = self._by_id.get(task_id)
+        return (task is not None and task.get("status") != "完了"
+                and self._seq.get(task_id) == seq and self._sort_keys[task_id][1] == due)
+
+    def next_due_ordinal(self):
+        """完了していないタスクのうち最も早い期限日の通し日付（なければNone）"""
+        self._ensure_due_heap()
+        heap = self._due_heap
+        while heap and not self._live_due_entry(heap[0]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_overdue(self, today_ordinal):
+        """期限日が today_ordinal より前の完了していないタスクのIDをヒープから取り出して返す"""
+        self._ensure_due_heap()
+        heap = self._due_heap
+        overdue = {}
+        while heap and heap[0][0] < today_ordinal:
+            entry = heapq.heappop(heap)
+            if self._live_due_entry(entry):
+                overdue[entry[2]] = None  # 同じタスクが何度も積まれていても1回だけ返す
+        return list(overdue)
+
+    def _insert_sorted(self, task_id):
+        """タスクを整列済みの列と期限日のヒープに挿入する（並び替えキーを作っていなければ何もしない）"""
+        if self._sort_keys is None:
+            return
+        self._sort_keys[task_id] = task_sort_keys(self._by_id[task_id])
+        for sort_option, entries in self._sorted.items():
+            insort(entries, self._sort_entry(sort_option, task_id))
+        self._push_due(task_id)
+
+    def _remove_sorted(self, task_id):
+        """タスクを整列済みの列から外す"""
+        if self._sort_keys is None or task_id not in self._sort_keys:
+            return
+        for sort_option, entries in self._sorted.items():
+            entry = self._sort_entry(sort_option, task_id)
+            index = bisect_left(entries, entry)
+            if index < len(entries) and entries[index] == entry:
+                del entries[index]
+        del self._sort_keys[task_id]
+
+    def matches(self, task_id, terms):
+        """タスクが正規化済みの語をすべて含むか"""
+        self._ensure_search_index()
+        return self.search_index.matches(task_id, terms)
+
+    def search_ids(self, terms):
+        """正規化済みの語をすべて含むタスクIDの集合"""
+        self._ensure_search_index()
+        return self.search_index.search(terms)
+
+    def search_estimate(self, terms):
+        """正規化済みの語をすべて含むタスクの数の見積もり（索引の候補の数）"""
+        self._ensure_search_index()
+        return self.search_index.estimate(terms)
+
+    def ids_with_tag(self, tag):
+        """タグを持つタスクIDの集合を返す"""
+        return self.tag_index.task_ids(tag)
+
+    def get(self, task_id):
+        """IDでタスクを取得する（なければNone）"""
+        return self._by_id.get(task_id)
+
+    def add(self, task):
+        """タスクを末尾に追加する"""
+        self._tasks.append(task)
+        self._tasks_view = None
+        self._by_id[task["id"]] = task
+        self._version += 1
+        self._touch_view(task)
+        self._seq[task["id"]] = self._next_seq
+        self._next_seq += 1
+        self._index_values(task["id"], _indexed_values(task))
+        if self._deferred_resort is not None:
+            self._deferred_resort.add(task["id"])
+        else:
+            self._insert_sorted(task["id"])
+        if self._search_index_ready:
+            self.search_index.add(task)
+        self._note_tag_changes(self.tag_index.add(task["id"], task.get("tags")), ())
+        return task
+
+    def extend(self, tasks):
+        """複数のタスクを末尾に追加する（読み込み途中のバッチの追加など）"""
+        tasks = tasks if isinstance(tasks, list) else list(tasks)
+        with self._deferring_resort(len(tasks)):
+            for task in tasks:
+                self.add(task)
+
+    def apply_snapshot(self, tasks):
+        """
+        読み直したタスクの一覧との差分だけを適用する
+
+        IDで突き合わせ、新しいタスクは末尾に追加、値の変わったタスクは変わった項目だけを更新、
+        一覧にないタスクは削除する。タスクの版は読み直したものに合わせる。戻り値は (追加したID, 更新したID, 削除したID) のリスト。
+        """
+        new_by_id = {task["id"]: task for task in tasks}
+        removed = [task_id for task_id in self._by_id if task_id not in new_by_id]
+        added = []
+        updated = []
+        for task_id, new_task in new_by_id.items():
+            task = self._by_id.get(task_id)
+            if task is None:
+                added.append(new_task)
+                continue
+            if isinstance(task, TaskRecord):
+                # 読み直したときの版を、次に書き込むときの共通の祖先にする
+                task.version = task_version(new_task)
+            changes = {key: value for key, value in new_task.items() if task.get(key) != value}
+            if changes:
+                self.update(task_id, changes)
+                updated.append(task_id)
+        self.delete(removed)
+        self.extend(added)
+        return [task["id"] for task in added], updated, removed
+
+    def update(self, task_id, changes):
+        """タスクの項目を更新する（更新したタスクを返す。なければNone）"""
+        task = self.get(task_id)
+        if task is None:
+            return None
+        old_name, old_tags = task.get("name"), task.get("tags")
+        old_sort_fields = (task.get("priority"), task.get("due_date"), old_tags)
+        old_status = task.get("status")
+        old_values = _indexed_values(task)
+        # 変更前と変更後のどちらのビューにも影響する
+        self._touch_view(task)
+        task.update(changes)
+        self._version += 1
+        self._touch_view(task)
+        new_values = _indexed_values(task)
+        if new_values != old_values:
+            self._unindex_values(task_id, old_values)
+            self._index_values(task_id, new_values)
+        if (task.get("priority"), task.get("due_date"), task.get("tags")) != old_sort_fields:
+            if self._deferred_resort is not None:
+                self._deferred_resort.add(task_id)
+            else:
+                # 並び替えに関わる項目が変わったときだけ、キャッシュした変更前のキーで外して挿入し直す
+                self._remove_sorted(task_id)
+                self._insert_sorted(task_id)
+        elif old_status == "完了" and task.get("status") != "完了":
+            # 完了中に捨てたヒープの要素を積み直す（期限切れになったときに色を変えるため）
+            self._push_due(task_id)
+        if self._search_index_ready and (task.get("name") != old_name or task.get("tags") != old_tags):
+            self.search_index.add(task)
+        if "tags" in changes and changes["tags"] != old_tags:
+            # タグが変わったときだけ、そのタスクの分を付け替える
+            removed = self.tag_index.remove(task_id, old_tags)
+            added = self.tag_index.add(task_id, task.get("tags"))
+            self._note_tag_changes(added, removed)
+        return task
+
+    def update_many(self, changes_by_id):
+        """
+        複数のタスクをまとめて更新する（タスクID -> 変更内容。更新したタスクのリストを返す）
+
+        多くのタスクの並び替えに関わる項目が変わるときは、1件ずつ挿入し直さず、
+        最後に整列済みの列を1回の走査と並び替えで作り直す。
+        """
+        with self._deferring_resort(len(changes_by_id)):
+            updated = [self.update(task_id, changes) for task_id, changes in changes_by_id.items()]
+        return [task for task in updated if task is not None]
+
+    @contextmanager
+    def _deferring_resort(self, count):
+        """count 件の追加・更新のあいだ、整列済みの列への挿入を後回しにして最後にまとめて並べ直す"""
+        if self._sort_keys is None or count <= BULK_CHANGE_THRESHOLD or self._deferred_resort is not None:
+            yield
+            return
+        self._deferred_resort = set()
+        try:
+            yield
+        finally:
+            task_ids, self._deferred_resort = self._deferred_resort, None
+            self._resort(task_ids)
+
+    def _resort(self, task_ids):
+        """タスクの並び替えキーを作り直し、整列済みの列をまとめて並べ直す"""
+        if not task_ids or self._sort_keys is None:
+            return
+        # 列の要素は通し番号で見分ける（タスクの項目を読むより速い）。追加したタスクはまだ列にない
+        seqs = {self._seq[task_id] for task_id in task_ids if task_id in self._sort_keys}
+        for task_id in task_ids:
+            self._sort_keys[task_id] = task_sort_keys(self._by_id[task_id])
+            self._push_due(task_id)
+        for sort_option, entries in self._sorted.items():
+            if seqs:
+                entries[:] = [entry for entry in entries if entry[-2] not in seqs]
+            # 並んだ列の末尾に足して並び替えると、2つの整列済みの列の併合で済む
+            entries.extend(sorted(self._sort_entry(sort_option, task_id) for task_id in task_ids))
+            entries.sort()
+
+    def delete(self, task_ids):
+        """IDの集合に含まれるタスクを削除する（削除したタスクのリストを返す）"""
+        task_ids = {task_id for task_id in task_ids if task_id in self._by_id}
+        if not task_ids:
+            return []
+        bulk = self._sort_keys is not None and len(task_ids) > BULK_CHANGE_THRESHOLD
+        if bulk:
+            # 多く削除するときは1件ずつ外さず、最後に列を1回の走査で作り直す
+            for task_id in task_ids:
+                del self._sort_keys[task_id]
+            seqs = {self._seq[task_id] for task_id in task_ids}
+            for sort_option, entries in self._sorted.items():
+                entries[:] = [entry for entry in entries if entry[-2] not in seqs]
+        else:
+            for task_id in task_ids:
+                self._remove_sorted(task_id)
+        removed = [self._by_id.pop(task_id) for task_id in task_ids]
+        for task in removed:
+            self._touch_view(task)
+            self._seq.pop(task["id"], None)
+            self._unindex_values(task["id"], _indexed_values(task))
+            if self._search_index_ready:
+                self.search_index.remove(task["id"])
+            self._note_tag_changes((), self.tag_index.remove(task["id"], task.get("tags")))
+        # リストの作り直しは削除件数によらず1回の走査で済ませる
+        self._tasks = [task for task in self._tasks if task["id"] not in task_ids]
+        self._tasks_view = None
+        self._version += 1
+        return removed
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon コマンドライン
+
+画面を開かずにタスクをまとめて操作する。tkinter などのGUIライブラリは読み込まない。
+入出力はCSV（CSV_HEADERS形式）またはJSON Lines（1行1タスク）で、1件ずつ流して処理する。
+
+使い方:
+    python taskcon_cli.py import tasks.csv
+    python taskcon_cli.py export --tab 完了 --format jsonl --output done.jsonl
+    python taskcon_cli.py status 完了 --query "週次 レポート"
+    python taskcon_cli.py query "レポート" --limit 20
+    python taskcon_cli.py query "タグ:仕事 期限:..2024-06-30" --state 未着手 --explain
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from itertools import islice
+
+from storage import CSV_HEADERS
+from task_import import MAX_REPORTED_ERRORS, read_rows, validate_row
+from task_model import DEFAULT_DATA_FOLDER, SORT_OPTIONS, STATUS_OPTIONS, VIEW_TABS, TaskModel
+from task_query import TextMatches, split_search
+
+IMPORT_BATCH_SIZE = 1000  # 取り込みで1度に索引へ追加するタスク数
+FORMATS = ["csv", "jsonl"]
+TOGGLE = "toggle"
+
+
+def read_tasks(stream, fmt, errors):
+    """CSVまたはJSON Linesのストリームから有効なタスクを1件ずつ読み込む（不正な行は errors に説明を足して飛ばす）"""
+    for line_number, row in read_rows(stream, fmt):
+        try:
+            yield validate_row(row)
+        except ValueError as e:
+            errors.append(f"{line_number}行目: {e}")
+
+
+def write_tasks(stream, tasks, fmt):
+    """タスクをCSVまたはJSON Linesで1件ずつ書き出し、書き出した件数を返す"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=CSV_HEADERS, extrasaction='ignore')
+        writer.writeheader()
+        for task in tasks:
+            writer.writerow(task)
+            count += 1
+        return count
+    for task in tasks:
+        stream.write(json.dumps({key: task[key] for key in CSV_HEADERS}, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _open_input(path):
+    if path == "-":
+        return sys.stdin
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _open_output(path):
+    if not path or path == "-":
+        return sys.stdout
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _guess_format(path, fmt):
+    """形式の指定がなければファイルの拡張子から決める"""
+    if fmt:
+        return fmt
+    return "jsonl" if path and path.endswith((".jsonl", ".json")) else "csv"
+
+
+def select_tasks(model, tab=None, query="", sort_option=None, ranked=False, status=STATUS_OPTIONS[0]):
+    """タブ・検索語（「キー:値」の条件を含む）・状態で絞り込んだタスクを返す（ranked なら検索の関連度順）"""
+    words = split_search(query)[1]
+    if ranked and words.strip():
+        # 関連度順に並べた検索結果を、検索語以外の条件で絞り込む
+        tasks = model.build_query(tab, query, status).without(TextMatches).filter(model.search(words, ranked=True))
+        return model.sort_tasks(tasks, sort_option) if sort_option else tasks
+    return model.filter_tasks(tab, query, sort_option or SORT_OPTIONS[0], status)
+
+
+def cmd_import(model, args):
+    """ファイルのタスクをIDで突き合わせて取り込む（同じIDは上書き）"""
+    fmt = _guess_format(args.file, args.format)
+    added = updated = 0
+    errors = []
+    stream = _open_input(args.file)
+    try:
+        for batch in _batches(read_tasks(stream, fmt, errors), IMPORT_BATCH_SIZE):
+            batch_added, batch_updated = model.upsert_tasks(batch)
+            added += batch_added
+            updated += batch_updated
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    # 取り込みは1件ずつ記録せず、最後に全体を1回だけ保存する
+    model.save()
+    if model.extract_tags_from_tasks():
+        model.save_tags()
+    print(f"追加 {added} 件、更新 {updated} 件、不正 {len(errors)} 件", file=sys.stderr)
+    for error in errors[:MAX_REPORTED_ERRORS]:
+        print(error, file=sys.stderr)
+
+
+def cmd_export(model, args):
+    """絞り込んだタスクを書き出す"""
+    tasks = select_tasks(model, args.tab, args.query, args.sort, status=args.state)
+    stream = _open_output(args.output)
+    try:
+        count = write_tasks(stream, tasks, _guess_format(args.output, args.format))
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    print(f"{count} 件を書き出しました", file=sys.stderr)
+
+
+def cmd_status(model, args):
+    """指定したタスクの状態をまとめて変更する"""
+    task_ids = list(args.ids)
+    if args.ids_from:
+        stream = _open_input(args.ids_from)
+        try:
+            task_ids.extend(line.strip() for line in stream if line.strip())
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+    if args.tab or args.query or args.state != STATUS_OPTIONS[0]:
+        task_ids.extend(task["id"] for task in select_tasks(model, args.tab, args.query or "", status=args.state))
+    if not task_ids:
+        raise ValueError("対象のタスクをID・--ids-from・--tab・--query・--state のいずれかで指定してください。")
+    if args.status == TOGGLE:
+        changed = model.toggle_status(task_ids)
+    else:
+        changed = model.set_status(task_ids, args.status)
+    print(f"{len(changed)} 件の状態を変更しました", file=sys.stderr)
+
+
+def cmd_query(model, args):
+    """検索に一致するタスクを関連度の高い順に表示する"""
+    if args.explain:
+        print(model.build_query(args.tab, args.query, args.state).explain(model.store), file=sys.stderr)
+    tasks = select_tasks(model, args.tab, args.query, args.sort, ranked=True, status=args.state)
+    if args.limit is not None:
+        tasks = tasks[:args.limit]
+    if args.format:
+        write_tasks(sys.stdout, tasks, args.format)
+        return
+    for task in tasks:
+        fields = [task["status"], task["priority"], task["due_date"] or "-", task["name"]]
+        if task["tags"]:
+            fields.append(f"[{task['tags']}]")
+        print(f"{task['id']}\t" + "\t".join(fields))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="taskcon_cli", description="taskcon のタスクを画面なしでまとめて操作する")
+    parser.add_argument("--data-folder", default=DEFAULT_DATA_FOLDER, help="データフォルダ")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_filters(command, with_sort=True):
+        command.add_argument("--tab", choices=VIEW_TABS, help="タブで絞り込む")
+        command.add_argument("--query", default="", help="検索語（空白区切りですべてを含む。「タグ:A」などの条件も書ける）")
+        command.add_argument("--state", choices=STATUS_OPTIONS, default=STATUS_OPTIONS[0], help="状態で絞り込む")
+        if with_sort:
+            command.add_argument("--sort", choices=SORT_OPTIONS, help="並び替え")
+
+    command = commands.add_parser("import", help="CSV / JSON Lines のタスクを取り込む")
+    command.add_argument("file", help="取り込むファイル（- で標準入力）")
+    command.add_argument("--format", choices=FORMATS, help="形式（省略時は拡張子から判断）")
+    command.set_defaults(func=cmd_import)
+
+    command = commands.add_parser("export", help="タスクを CSV / JSON Lines で書き出す")
+    add_filters(command)
+    command.add_argument("--format", choices=FORMATS, help="形式（省略時は拡張子から判断）")
+    command.add_argument("--output", help="書き出すファイル（省略時は標準出力）")
+    command.set_defaults(func=cmd_export)
+
+    command = commands.add_parser("status", help="タスクの状態をまとめて変更する")
+    command.add_argument("status", choices=STATUS_OPTIONS[1:] + [TOGGLE], help="新しい状態（toggle で切り替え）")
+    command.add_argument("ids", nargs="*", help="タスクID")
+    command.add_argument("--ids-from", help="1行1件のタスクIDのファイル（- で標準入力）")
+    add_filters(command, with_sort=False)
+    command.set_defaults(func=cmd_status)
+
+    command = commands.add_parser("query", help="タスクを検索する")
+    command.add_argument("query", nargs="?", default="", help="検索語（空白区切りですべてを含む。「タグ:A」などの条件も書ける）")
+    command.add_argument("--tab", choices=VIEW_TABS, help="タブで絞り込む")
+    command.add_argument("--state", choices=STATUS_OPTIONS, default=STATUS_OPTIONS[0], help="状態で絞り込む")
+    command.add_argument("--sort", choices=SORT_OPTIONS, help="並び替え（省略時は関連度順）")
+    command.add_argument("--limit", type=int, help="表示する件数")
+    command.add_argument("--format", choices=FORMATS, help="CSV / JSON Lines で出力する")
+    command.add_argument("--explain", action="store_true", help="絞り込みに使う索引を標準エラー出力に表示する")
+    command.set_defaults(func=cmd_query)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # 1回の実行で検索するのは1度だけなので、全文検索インデックスは作らない
+    model = TaskModel(args.data_folder, use_search_index=False)
+    try:
+        model.load_tags()
+        model.load()
+        args.func(model, args)
+    except (ValueError, OSError, csv.Error, sqlite3.Error) as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return 1
+    finally:
+        model.storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon ベンチマークのタスク生成の単体テスト
+"""
+
+import unittest
+from datetime import date
+
+from bench_taskcon import PRIORITY_WEIGHTS, TAG_POOL, generate_tasks
+from storage import CSV_HEADERS
+
+
+class TestGenerateTasks(unittest.TestCase):
+    """generate_tasksのテスト"""
+
+    def test_deterministic(self):
+        """同じ種からは同じタスクが、違う種からは違うタスクが生成されることを確認"""
+        self.assertEqual(generate_tasks(200, seed=1), generate_tasks(200, seed=1))
+        self.assertNotEqual(generate_tasks(200, seed=1), generate_tasks(200, seed=2))
+        # 件数を増やしても先頭は変わらない
+        self.assertEqual(generate_tasks(300, seed=1)[:200], generate_tasks(200, seed=1))
+
+    def test_fields(self):
+        """生成したタスクの各項目がアプリで使う値になっていることを確認"""
+        tasks = generate_tasks(1000, base_date=date(2025, 1, 1))
+        self.assertEqual(len({task["id"] for task in tasks}), 1000)
+        for task in tasks:
+            self.assertEqual(sorted(task), sorted(CSV_HEADERS))
+            self.assertIn(task["priority"], PRIORITY_WEIGHTS)
+            self.assertIn(task["status"], ["未着手", "完了"])
+            self.assertIn(task["today"], ["〇", ""])
+            tags = task["tags"].split(",") if task["tags"] else []
+            self.assertTrue(set(tags) <= set(TAG_POOL))
+            self.assertEqual(len(tags), len(set(tags)))
+            if task["due_date"]:
+                due_date = date.fromisoformat(task["due_date"])
+                self.assertTrue(date(2024, 12, 1) <= due_date <= date(2025, 4, 1))
+        # 先頭のタグほど多く使われる
+        used = [tag for task in tasks for tag in task["tags"].split(",") if tag]
+        self.assertGreater(used.count(TAG_POOL[0]), used.count(TAG_POOL[-1]))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
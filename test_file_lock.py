@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon データフォルダのロックの単体テスト
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from file_lock import LOCK_FILE_NAME, FileLock
+
+
+class TestFileLock(unittest.TestCase):
+    """FileLockクラスのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "data", LOCK_FILE_NAME)
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_exclusive(self):
+        """別のインスタンスのロックは外れるまで取れないことを確認"""
+        first = FileLock(self.path)
+        other = FileLock(self.path, timeout=0.1)
+        with first:
+            self.assertTrue(os.path.exists(self.path))
+            with self.assertRaises(TimeoutError):
+                with other:
+                    pass
+        with other:
+            pass
+
+    def test_reentrant(self):
+        """同じスレッドなら入れ子にでき、最も外側で外れることを確認"""
+        lock = FileLock(self.path)
+        other = FileLock(self.path, timeout=0.1)
+        with lock:
+            with lock:
+                pass
+            with self.assertRaises(TimeoutError):
+                with other:
+                    pass
+        with other:
+            pass
+
+    def test_threads_wait(self):
+        """別のスレッドはロックが外れるまで待つことを確認"""
+        lock = FileLock(self.path)
+        order = []
+
+        def worker():
+            with lock:
+                order.append("thread")
+
+        with lock:
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join(0.1)
+            order.append("main")
+        thread.join()
+        self.assertEqual(order, ["main", "thread"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon ファイル監視の単体テスト
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import file_watcher
+from file_watcher import FileWatcher
+
+
+class TestFileWatcher(unittest.TestCase):
+    """FileWatcherのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.temp_dir, "tasks.csv")
+        self.tags_file = os.path.join(self.temp_dir, "tags.txt")
+        self._write(self.data_file, "id\n")
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, path, text):
+        """一時ファイルからの置き換えでファイルを書き換える"""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def _check_watcher(self, watcher):
+        self.assertEqual(watcher.poll(), set())
+        self._write(self.data_file, "id\n1\n")
+        self.assertEqual(watcher.poll(), {self.data_file})
+        self.assertEqual(watcher.poll(), set())
+
+        # 作成されたファイルも変更として検知する
+        self._write(self.tags_file, "仕事\n")
+        self.assertEqual(watcher.poll(), {self.tags_file})
+
+        # acknowledge したファイルは変更として扱わない
+        self._write(self.data_file, "id\n1\n2\n")
+        watcher.acknowledge([self.data_file])
+        self.assertEqual(watcher.poll(), set())
+
+        os.remove(self.tags_file)
+        self.assertEqual(watcher.poll(), {self.tags_file})
+        watcher.close()
+
+    def test_detect_changes(self):
+        """外部の変更を検知し、自分の書き込みは無視することを確認"""
+        self._check_watcher(FileWatcher([self.data_file, self.tags_file]))
+
+    def test_polling_fallback(self):
+        """inotify が使えなくても更新時刻とサイズで変更を検知することを確認"""
+        with patch.object(file_watcher._Inotify, "open", return_value=None):
+            watcher = FileWatcher([self.data_file, self.tags_file])
+        self.assertFalse(watcher.uses_inotify)
+        self._check_watcher(watcher)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
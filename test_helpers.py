@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon の単体テストで共通に使うヘルパー
+"""
+
+from task_record import TaskRecord
+
+
+def make_task(task_id, name, status="未着手", priority="中", due_date="", tags="", today=""):
+    """テスト用のタスク（CSV_HEADERS の7項目の辞書）を作成する"""
+    return {"id": task_id, "name": name, "status": status, "priority": priority,
+            "due_date": due_date, "tags": tags, "today": today}
+
+
+def make_record(task_id, name, version=0, **fields):
+    """テスト用のタスクのレコードを版つきで作成する（fields は make_task と同じ項目）"""
+    return TaskRecord(**make_task(task_id, name, **fields), version=version)
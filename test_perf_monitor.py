@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon 処理時間の計測の単体テスト
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from perf_monitor import PERF_SETTING, PerfMonitor, percentile, perf_enabled, timed
+
+
+class Worker:
+    """timed デコレーターを試すためのクラス"""
+
+    def __init__(self, perf):
+        self.perf = perf
+
+    @timed("work")
+    def work(self, value):
+        return value * 2
+
+
+class TestPerfMonitor(unittest.TestCase):
+    """PerfMonitorクラスのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_stats(self):
+        """直近の計測から p50 / p95 / 最大値が求まることを確認"""
+        monitor = PerfMonitor(enabled=True, window=100)
+        for ms in range(1, 201):
+            monitor.record("filter", ms / 1000)
+        stats = monitor.stats("filter")
+        # 直近100回（101〜200ms）だけを使う
+        self.assertEqual(stats["count"], 100)
+        self.assertAlmostEqual(stats["p50"], 150)
+        self.assertAlmostEqual(stats["p95"], 195)
+        self.assertAlmostEqual(stats["max"], 200)
+        self.assertAlmostEqual(stats["last"], 200)
+        self.assertIsNone(monitor.stats("save"))
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_disabled(self):
+        """無効のときは何も記録しないことを確認"""
+        monitor = PerfMonitor()
+        worker = Worker(monitor)
+        self.assertEqual(worker.work(2), 4)
+        with monitor.measure("block"):
+            pass
+        self.assertEqual(monitor.summary(), {})
+
+    def test_timed_and_log(self):
+        """デコレーターと with 文で計測し、JSON Lines に1行ずつ書き出すことを確認"""
+        log_path = os.path.join(self.temp_dir, "perf", "perf.jsonl")
+        recorded = []
+        monitor = PerfMonitor(enabled=True, log_path=log_path, context=lambda: {"tasks": 3},
+                              on_record=lambda stage, stats: recorded.append((stage, stats["count"])))
+        worker = Worker(monitor)
+        self.assertEqual(worker.work(3), 6)
+        with monitor.measure("block"):
+            pass
+        monitor.close()
+        self.assertEqual(recorded, [("work", 1), ("block", 1)])
+        with open(log_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([entry["stage"] for entry in entries], ["work", "block"])
+        self.assertEqual(entries[0]["tasks"], 3)
+        self.assertIn("ms", entries[0])
+
+        monitor.set_enabled(False)
+        self.assertEqual(monitor.summary(), {})
+
+    def test_perf_enabled(self):
+        """環境変数が設定より優先されることを確認"""
+        self.assertFalse(perf_enabled({}, {}))
+        self.assertTrue(perf_enabled({PERF_SETTING: True}, {}))
+        self.assertTrue(perf_enabled({}, {"TASKCON_PERF": "1"}))
+        self.assertFalse(perf_enabled({PERF_SETTING: True}, {"TASKCON_PERF": "0"}))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon 全文検索インデックスの単体テスト
+"""
+
+import unittest
+
+from search_index import SearchIndex, normalize_text, parse_query, scan
+from task_store import TaskStore
+from test_helpers import make_task
+
+
+class TestNormalize(unittest.TestCase):
+    """正規化のテスト"""
+
+    def test_normalize_text(self):
+        """全角/半角・大文字/小文字・ひらがな/カタカナの違いがなくなることを確認"""
+        self.assertEqual(normalize_text("ＰｙｔｈｏｎのﾀｽｸとタスクＡ"), "pythonのたすくとたすくa")
+        self.assertEqual(parse_query("　買い物  カイモノ "), ["買い物", "かいもの"])
+
+
+class TestSearchIndex(unittest.TestCase):
+    """SearchIndexのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.index = SearchIndex()
+        self.index.rebuild([
+            make_task("1", "レポート作成", tags="仕事"),
+            make_task("2", "れぽーと提出", tags="学校"),
+            make_task("3", "買い物", tags="家"),
+        ])
+
+    def test_kana_insensitive_search(self):
+        """ひらがな/カタカナの違いを無視して検索できることを確認"""
+        self.assertEqual(self.index.search(parse_query("ﾚﾎﾟｰﾄ")), {"1", "2"})
+        self.assertEqual(self.index.search(parse_query("れ")), {"1", "2"})
+
+    def test_and_query(self):
+        """空白区切りの語がすべて含まれるタスクだけが一致することを確認"""
+        self.assertEqual(self.index.search(parse_query("レポート 学校")), {"2"})
+        self.assertEqual(self.index.search(parse_query("レポート 家")), set())
+
+    def test_estimate(self):
+        """見積もりが一致件数以上で、索引の候補の数になることを確認"""
+        for query in ["レポート", "れ", "レポート 学校", "存在しない"]:
+            terms = parse_query(query)
+            self.assertGreaterEqual(self.index.estimate(terms), len(self.index.search(terms)))
+        self.assertEqual(self.index.estimate(parse_query("れ")), 2)
+        self.assertEqual(self.index.estimate([]), len(self.index))
+
+    def test_add_and_remove(self):
+        """登録と削除が検索結果に反映されることを確認"""
+        self.index.add(make_task("3", "レポート印刷", tags="家"))
+        self.assertEqual(self.index.search(parse_query("買い物")), set())
+        self.assertEqual(self.index.search(parse_query("レポート")), {"1", "2", "3"})
+        self.index.remove("1")
+        self.assertEqual(self.index.search(parse_query("作成")), set())
+
+
+class TestTaskStoreSearch(unittest.TestCase):
+    """TaskStoreの検索のテスト"""
+
+    def test_search_follows_crud(self):
+        """追加・更新・削除で検索結果が更新されることを確認"""
+        store = TaskStore([make_task("1", "資料作成"), make_task("2", "作成した資料の確認")])
+        store.add(make_task("3", "作成"))
+        self.assertEqual([t["id"] for t in store.search("作成")], ["1", "2", "3"])
+        # 関連度順では名前の先頭で一致する短いタスクが上位
+        self.assertEqual([t["id"] for t in store.search("作成", ranked=True)], ["3", "2", "1"])
+
+        store.update("1", {"name": "資料印刷"})
+        store.delete(["2"])
+        self.assertEqual([t["id"] for t in store.search("作成")], ["3"])
+
+
+class TestScan(unittest.TestCase):
+    """索引を使わない検索のテスト"""
+
+    def test_scan_matches_index(self):
+        """走査による検索が索引による検索と同じ結果になることを確認"""
+        tasks = [make_task("1", "資料作成"), make_task("2", "作成した資料の確認", tags="シリョウ"),
+                 make_task("3", "作成"), make_task("4", "買い物")]
+        store = TaskStore(tasks)
+        for query in ["作成", "しりょう", "作成 資料", "ない"]:
+            self.assertEqual(scan(tasks, parse_query(query)), store.search(query))
+            self.assertEqual(scan(tasks, parse_query(query), ranked=True), store.search(query, ranked=True))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon チェック状態の管理の単体テスト
+"""
+
+import unittest
+
+from selection_model import CHECKED, UNCHECKED, SelectionModel
+
+
+class TestSelectionModel(unittest.TestCase):
+    """SelectionModelクラスのテスト"""
+
+    def test_toggle(self):
+        """チェックの切り替えと表示文字を確認"""
+        selection = SelectionModel()
+        self.assertTrue(selection.toggle("2"))
+        self.assertTrue(selection.toggle("1"))
+        self.assertEqual(selection.glyph("1"), CHECKED)
+        self.assertEqual(selection.glyph("3"), UNCHECKED)
+        # チェックした順に返す
+        self.assertEqual(selection.ids(), ["2", "1"])
+        self.assertFalse(selection.toggle("2"))
+        self.assertEqual(selection.ids(), ["1"])
+
+    def test_toggle_all(self):
+        """すべてチェック済みなら外し、そうでなければすべてチェックすることを確認"""
+        selection = SelectionModel()
+        selection.toggle("1")
+        self.assertTrue(selection.toggle_all(["1", "2", "3"]))
+        self.assertEqual(len(selection), 3)
+        self.assertFalse(selection.toggle_all(["1", "2"]))
+        self.assertEqual(selection.ids(), ["3"])
+        self.assertFalse(selection.all_checked([]))
+
+    def test_discard_and_retain(self):
+        """削除されたタスクのチェックが外れることを確認"""
+        selection = SelectionModel()
+        selection.set_checked(["1", "2", "3", "4"])
+        selection.discard(["2", "9"])
+        selection.retain({"1", "4"}.__contains__)
+        self.assertEqual(selection.ids(), ["1", "4"])
+        selection.clear()
+        self.assertEqual(len(selection), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
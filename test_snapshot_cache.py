@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon タスクのスナップショットのキャッシュの単体テスト
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from snapshot_cache import SNAPSHOT_FILE_NAME, SnapshotCache, source_key
+from storage import OP_UPDATE, CsvStorage, JournalStorage, write_tasks_csv
+from task_record import TaskRecord, task_version
+from test_helpers import make_task
+
+
+class TestSnapshotCache(unittest.TestCase):
+    """SnapshotCacheクラスのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.temp_dir, "tasks.csv")
+        self.cache = SnapshotCache(os.path.join(self.temp_dir, SNAPSHOT_FILE_NAME))
+        self.tasks = [make_task("1", "一", tags="A,B"), make_task("2", "二"), make_task("3", "三", tags="B")]
+        write_tasks_csv(self.csv_path, self.tasks, versions=[1, 2, 3])
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """保存したタスク・版・タグの索引がそのまま読み込まれることを確認"""
+        self.cache.save(self.tasks, source_key(self.csv_path), versions=[1, 2, 3])
+        self.assertTrue(self.cache.is_fresh(self.csv_path))
+        tasks, tag_ids = self.cache.load(self.csv_path)
+        self.assertEqual(tasks, self.tasks)
+        self.assertTrue(all(type(task) is TaskRecord for task in tasks))
+        self.assertEqual([task_version(task) for task in tasks], [1, 2, 3])
+        self.assertEqual(tag_ids, {"A": ("1",), "B": ("1", "3")})
+
+    def test_stale_after_source_changes(self):
+        """元のCSVが書き換えられるとキャッシュが使われないことを確認"""
+        self.cache.save(self.tasks, source_key(self.csv_path))
+        write_tasks_csv(self.csv_path, self.tasks[:2])
+        self.assertFalse(self.cache.is_fresh(self.csv_path))
+        self.assertIsNone(self.cache.load(self.csv_path))
+
+    def test_same_size_and_mtime_but_different_content(self):
+        """サイズと更新時刻が同じでも内容が違えばハッシュで見分けることを確認"""
+        key = source_key(self.csv_path)
+        self.cache.save(self.tasks, key)
+        with open(self.csv_path, "r+b") as f:
+            data = f.read()
+            f.seek(0)
+            f.write(data.replace("一".encode(), "壱".encode()))
+        os.utime(self.csv_path, ns=(key[1], key[1]))
+        self.assertTrue(self.cache.is_fresh(self.csv_path))
+        self.assertIsNone(self.cache.load(self.csv_path))
+
+    def test_invalid_cache_is_ignored(self):
+        """壊れたキャッシュやないキャッシュはNoneになることを確認"""
+        self.assertIsNone(self.cache.load(self.csv_path))
+        self.cache.save(self.tasks, source_key(self.csv_path))
+        with open(self.cache.path, "r+b") as f:
+            f.write(b"XXXX")
+        self.assertFalse(self.cache.is_fresh(self.csv_path))
+        self.assertIsNone(self.cache.load(self.csv_path))
+        with open(self.cache.path, "wb") as f:
+            f.write(b"short")
+        self.assertIsNone(self.cache.load(self.csv_path))
+
+
+class TestStorageSnapshotCache(unittest.TestCase):
+    """ストレージからのキャッシュの使い方のテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.tasks = [make_task(str(i), f"タスク{i}", tags="偶数" if i % 2 == 0 else "") for i in range(10)]
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_csv_save_writes_cache(self):
+        """保存でキャッシュが作られ、次の読み込みでタグの索引も読まれることを確認"""
+        storage = CsvStorage(self.temp_dir)
+        storage.save(self.tasks)
+        self.assertTrue(storage.is_cached())
+        reader = CsvStorage(self.temp_dir)
+        self.assertEqual(reader.load(), self.tasks)
+        self.assertEqual(reader.loaded_tag_ids["偶数"], ("0", "2", "4", "6", "8"))
+        self.assertEqual(list(reader.iter_load()), self.tasks)
+
+    def test_csv_edited_outside_rebuilds_cache(self):
+        """外で書き換えたCSVはキャッシュを使わずに読み、キャッシュを作り直すことを確認"""
+        storage = CsvStorage(self.temp_dir)
+        storage.save(self.tasks)
+        write_tasks_csv(storage.data_file, self.tasks[:3])
+        self.assertFalse(storage.is_cached())
+        self.assertEqual(storage.load(), self.tasks[:3])
+        self.assertIsNone(storage.loaded_tag_ids)
+        self.assertTrue(storage.is_cached())
+        self.assertEqual(CsvStorage(self.temp_dir).load(), self.tasks[:3])
+
+    def test_journal_not_cached_while_journal_exists(self):
+        """ジャーナルがある間はキャッシュから読まないことを確認"""
+        storage = JournalStorage(self.temp_dir)
+        storage.save(self.tasks)
+        self.assertTrue(storage.is_cached())
+        changed = self.tasks[0].copy()
+        changed["name"] = "変更"
+        storage.record([changed] + self.tasks[1:], [(OP_UPDATE, "0", {"name": "変更"})])
+        self.assertFalse(storage.is_cached())
+        reader = JournalStorage(self.temp_dir)
+        self.assertEqual(reader.load()[0]["name"], "変更")
+        self.assertIsNone(reader.loaded_tag_ids)
+        storage.close()
+        reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
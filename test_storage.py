@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon ストレージバックエンドの単体テスト
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+from storage import (CSV_HEADERS, OP_ADD, OP_DELETE, OP_STATUS, OP_TODAY, OP_UPDATE, CsvStorage, JournalStorage,
+                     SqliteStorage, create_storage, load_settings, save_settings, write_tasks_csv)
+from task_loader import BackgroundLoader
+from task_query import FieldIs, TaskQuery, tab_query
+from test_helpers import make_task
+
+
+class TestJournalStorage(unittest.TestCase):
+    """JournalStorageのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = JournalStorage(self.temp_dir)
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_replay_journal(self):
+        """ジャーナルの再生で変更が復元されることを確認"""
+        tasks = [make_task("1", "タスク1"), make_task("2", "タスク2")]
+        self.storage.save(tasks)
+        self.storage.record(tasks, [
+            (OP_ADD, "3", make_task("3", "タスク3")),
+            (OP_UPDATE, "1", {"name": "変更後", "priority": "高"}),
+            (OP_STATUS, "2", "完了"),
+            (OP_TODAY, "3", "〇"),
+            (OP_DELETE, "1", None),
+        ])
+
+        # スナップショットは書き直されていない
+        with open(self.storage.data_file, encoding='utf-8', newline='') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 2)
+
+        loaded = JournalStorage(self.temp_dir).load()
+        self.assertEqual([t["id"] for t in loaded], ["2", "3"])
+        self.assertEqual(loaded[0]["status"], "完了")
+        self.assertEqual(loaded[1]["today"], "〇")
+
+    def test_ignore_truncated_line(self):
+        """書き込み途中の行は無視されることを確認"""
+        tasks = [make_task("1", "タスク1")]
+        self.storage.record(tasks, [(OP_ADD, "1", tasks[0])])
+        with open(self.storage.journal_file, 'a', encoding='utf-8') as f:
+            f.write('{"op": "delete", "id"')
+
+        loaded = self.storage.load()
+        self.assertEqual([t["name"] for t in loaded], ["タスク1"])
+
+    def test_compaction(self):
+        """しきい値を超えるとスナップショットに圧縮されることを確認"""
+        storage = JournalStorage(self.temp_dir, compact_threshold=1)
+        tasks = [make_task("1", "タスク1")]
+        storage.record(tasks, [(OP_ADD, "1", tasks[0])])
+        storage.wait_for_compaction()
+
+        self.assertFalse(os.path.exists(storage.journal_file))
+        self.assertFalse(os.path.exists(storage.compacting_file))
+        self.assertEqual(CsvStorage(self.temp_dir).load(), tasks)
+
+    def test_iter_load(self):
+        """iter_load の結果が load と同じことを確認（ジャーナルがあってもなくても）"""
+        tasks = [make_task("1", "タスク1"), make_task("2", "タスク2")]
+        self.storage.save(tasks)
+        self.assertEqual(list(self.storage.iter_load()), tasks)
+        self.storage.record(tasks, [(OP_DELETE, "1", None)])
+        self.assertEqual(list(self.storage.iter_load()), self.storage.load())
+        self.assertGreater(self.storage.data_size(), 0)
+
+    def test_iter_load_state_is_recorded_by_finish_load(self):
+        """iter_load は状態を変えずに読み込んだときのファイルの状態を返し、finish_load で記録することを確認"""
+        tasks = [make_task("1", "タスク1"), make_task("2", "タスク2")]
+        self.storage.save(tasks)
+        self.storage.record(tasks, [(OP_STATUS, "1", "完了")])
+        for finish in (False, True):
+            reader = JournalStorage(self.temp_dir)
+            loader = BackgroundLoader(reader.iter_load)
+            loader.start()
+            loader.join()
+            loaded = [task for batch in loader.poll() for task in batch]
+            self.assertEqual(loaded[0]["status"], "完了")
+            if finish:
+                reader.finish_load(loader.result)
+            reader.record(loaded, [(OP_TODAY, "2", "〇")])
+            # 記録していなければ、読み込んだ後に誰が書き込んだかわからないので他のインスタンスの変更として扱う
+            self.assertEqual(reader.merged_external, not finish)
+            reader.close()
+
+    def test_export_csv_layout(self):
+        """エクスポートが版の列を含まないCSV_HEADERS形式であることを確認"""
+        export_path = os.path.join(self.temp_dir, "export.csv")
+        self.storage.save([make_task("1", "タスク1")])
+        tasks = self.storage.load()
+        self.storage.export_csv(tasks, export_path)
+
+        with open(export_path, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], CSV_HEADERS)
+        self.assertEqual([len(row) for row in rows[1:]], [len(CSV_HEADERS)])
+
+
+class TestSqliteStorage(unittest.TestCase):
+    """SqliteStorageのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        tasks = [make_task("1", "タスクA"), make_task("2", "タスクB"), make_task("3", "買い物")]
+        tasks[0].update({"priority": "低", "due_date": "2024-01-03", "tags": "C"})
+        tasks[1].update({"priority": "高", "due_date": "", "tags": "A", "today": "〇"})
+        tasks[2].update({"priority": "中", "due_date": "2024-01-01", "tags": "B", "status": "完了"})
+        csv_storage = CsvStorage(self.temp_dir)
+        csv_storage.save(tasks)
+        csv_storage.save_tags(["A", "B", "C"])
+        self.storage = SqliteStorage(self.temp_dir)
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_import_from_csv(self):
+        """初回の読み込みで tasks.csv / tags.txt が取り込まれることを確認"""
+        self.assertEqual([t["id"] for t in self.storage.load()], ["1", "2", "3"])
+        self.assertEqual(self.storage.load_tags(), ["A", "B", "C"])
+
+    def test_select_ids(self):
+        """クエリのSQLで表せる条件で絞り込めることを確認"""
+        conditions, params, rest = TaskQuery(FieldIs("priority", ["低"], exclude=True)).sql()
+        self.assertFalse(rest)
+        self.assertEqual(self.storage.select_ids(conditions, params, "期限順"), ["3", "2"])
+        self.assertEqual(self.storage.select_ids([], (), "追加順"), ["1", "2", "3"])
+        self.assertEqual(self.storage.select_ids([], (), "タグ順"), ["2", "3", "1"])
+        # 優先度は 高<中<低 の順
+        self.assertEqual(self.storage.select_ids([], (), "優先度順"), ["2", "3", "1"])
+        for tab, expected in (("一覧", ["1"]), ("今日", ["2"]), ("完了", ["3"])):
+            conditions, params, _ = tab_query(tab).sql()
+            self.assertEqual(self.storage.select_ids(conditions, params), expected)
+
+    def test_iter_load(self):
+        """読み込み用の別接続で追加順に読み込めることを確認"""
+        self.assertEqual(list(self.storage.iter_load()), self.storage.load())
+
+    def test_record(self):
+        """変更操作がデータベースに反映されることを確認"""
+        self.storage.load()
+        self.storage.record([], [
+            (OP_ADD, "4", make_task("4", "タスクD")),
+            (OP_STATUS, "1", "完了"),
+            (OP_DELETE, "2", None),
+        ])
+        loaded = SqliteStorage(self.temp_dir).load()
+        self.assertEqual([t["id"] for t in loaded], ["1", "3", "4"])
+        self.assertEqual(loaded[0]["status"], "完了")
+
+
+class TestMultiInstance(unittest.TestCase):
+    """同じデータフォルダを使う複数のインスタンスのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        CsvStorage(self.temp_dir).save([make_task("1", "タスク1"), make_task("2", "タスク2")])
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def edit(self, storage, tasks, task_id, op, data):
+        """メモリ上のタスクを変えて変更操作を記録する"""
+        task = next(task for task in tasks if task["id"] == task_id)
+        task.update({"status": data} if op == OP_STATUS else data)
+        storage.record(tasks, [(op, task_id, data)])
+
+    def test_csv_merge(self):
+        """CSVの書き直しで他のインスタンスの変更が消えないことを確認"""
+        first, second = CsvStorage(self.temp_dir), CsvStorage(self.temp_dir)
+        first_tasks, second_tasks = first.load(), second.load()
+        self.edit(first, first_tasks, "1", OP_UPDATE, {"name": "変更後"})
+        self.assertFalse(first.merged_external)
+        self.assertEqual(first.record_paths(), [first.data_file])
+
+        self.edit(second, second_tasks, "2", OP_STATUS, "完了")
+        self.assertTrue(second.merged_external)
+        self.assertEqual(second.record_paths(), [])
+        loaded = CsvStorage(self.temp_dir).load()
+        self.assertEqual([(t["name"], t["status"]) for t in loaded], [("変更後", "未着手"), ("タスク2", "完了")])
+        self.assertEqual([t.version for t in loaded], [2, 2])
+
+        # 終了時の保存も、読み直していない相手の変更を消さない
+        second.save(second_tasks)
+        self.assertEqual(CsvStorage(self.temp_dir).load(), loaded)
+
+    def test_journal_merge(self):
+        """ジャーナルの追記と保存で他のインスタンスの変更が消えないことを確認"""
+        first, second = JournalStorage(self.temp_dir), JournalStorage(self.temp_dir)
+        try:
+            first_tasks, second_tasks = first.load(), second.load()
+            self.edit(first, first_tasks, "1", OP_UPDATE, {"name": "変更後"})
+            self.assertEqual(first.record_paths(), [first.journal_file])
+            self.edit(second, second_tasks, "1", OP_UPDATE, {"priority": "高"})
+            self.assertEqual(second.record_paths(), [])
+
+            first.save(first_tasks)
+            loaded = JournalStorage(self.temp_dir).load()
+            self.assertEqual((loaded[0]["name"], loaded[0]["priority"]), ("変更後", "高"))
+            self.assertFalse(os.path.exists(first.journal_file))
+        finally:
+            first.close()
+            second.close()
+
+    def test_own_changes_are_not_external(self):
+        """自分が記録した変更は、保存しても他のインスタンスの変更と見なされず、版もファイルと揃うことを確認"""
+        for storage_class in (JournalStorage, SqliteStorage):
+            with self.subTest(storage_class.name):
+                storage = storage_class(self.temp_dir)
+                try:
+                    tasks = storage.load()
+                    self.edit(storage, tasks, "1", OP_UPDATE, {"name": "変更後"})
+                    self.edit(storage, tasks, "2", OP_STATUS, "完了")
+                    storage.save(tasks)
+                    self.assertFalse(storage.merged_external)
+                    loaded = storage_class(self.temp_dir).load()
+                    self.assertEqual([t.version for t in tasks], [t.version for t in loaded])
+                finally:
+                    storage.close()
+
+    def test_deleted_legacy_task_stays_deleted(self):
+        """版の列のない古い tasks.csv のタスクを他のインスタンスが削除しても、保存で復活しないことを確認"""
+        for storage_class in (CsvStorage, JournalStorage):
+            with self.subTest(storage_class.name):
+                write_tasks_csv(os.path.join(self.temp_dir, "tasks.csv"),
+                                [make_task("1", "タスク1"), make_task("2", "タスク2")])
+                first, second = storage_class(self.temp_dir), storage_class(self.temp_dir)
+                try:
+                    first_tasks, second_tasks = first.load(), second.load()
+                    second.record([second_tasks[1]], [(OP_DELETE, "1", None)])
+                    first.save(first_tasks)
+                    self.assertTrue(first.merged_external)
+                    self.assertEqual([t["id"] for t in storage_class(self.temp_dir).load()], ["2"])
+                finally:
+                    first.close()
+                    second.close()
+
+    def test_journal_compaction_keeps_others(self):
+        """圧縮はメモリ上のタスクではなくファイルを再生した結果を書き出すことを確認"""
+        first, second = JournalStorage(self.temp_dir, compact_threshold=1), JournalStorage(self.temp_dir)
+        try:
+            first_tasks, second_tasks = first.load(), second.load()
+            self.edit(second, second_tasks, "2", OP_STATUS, "完了")
+            self.edit(first, first_tasks, "1", OP_UPDATE, {"name": "変更後"})
+            first.wait_for_compaction()
+            self.assertFalse(os.path.exists(first.journal_file))
+            loaded = CsvStorage(self.temp_dir).load()
+            self.assertEqual([(t["name"], t["status"]) for t in loaded], [("変更後", "未着手"), ("タスク2", "完了")])
+        finally:
+            first.close()
+            second.close()
+
+    def test_sqlite_merge(self):
+        """SQLiteの全体の書き直しで他のインスタンスの変更が消えないことを確認"""
+        first, second = SqliteStorage(self.temp_dir), SqliteStorage(self.temp_dir)
+        try:
+            first_tasks, second_tasks = first.load(), second.load()
+            self.edit(first, first_tasks, "1", OP_UPDATE, {"name": "変更後"})
+            self.assertEqual(first.record_paths(), [first.db_file])
+            self.edit(second, second_tasks, "2", OP_STATUS, "完了")
+            self.assertEqual(second.record_paths(), [])
+
+            second.save(second_tasks)
+            self.assertTrue(second.merged_external)
+            loaded = first.load()
+            self.assertEqual([(t["name"], t["status"]) for t in loaded], [("変更後", "未着手"), ("タスク2", "完了")])
+        finally:
+            first.close()
+            second.close()
+
+
+class TestAtomicWrite(unittest.TestCase):
+    """書き出しの原子性のテスト"""
+
+    def test_failed_write_keeps_original(self):
+        """書き出しが途中で失敗しても元のファイルが残ることを確認"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "tasks.csv")
+            write_tasks_csv(path, [make_task("1", "元のタスク")])
+
+            def broken_tasks():
+                yield make_task("2", "新しいタスク")
+                raise OSError("書き込み失敗")
+
+            with self.assertRaises(OSError):
+                write_tasks_csv(path, broken_tasks())
+            self.assertEqual(CsvStorage(temp_dir).load(), [make_task("1", "元のタスク")])
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestSettings(unittest.TestCase):
+    """設定ファイルのテスト"""
+
+    def test_save_and_load_settings(self):
+        """設定の保存と読み込みを確認"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            self.assertEqual(load_settings(temp_dir), {})
+            save_settings(temp_dir, {"storage_backend": "sqlite"})
+            self.assertEqual(load_settings(temp_dir), {"storage_backend": "sqlite"})
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestCreateStorage(unittest.TestCase):
+    """create_storageのテスト"""
+
+    def test_backend_names(self):
+        """バックエンド名に応じたクラスが作成されることを確認"""
+        self.assertIsInstance(create_storage("csv", "data"), CsvStorage)
+        self.assertIsInstance(create_storage("journal", "data"), JournalStorage)
+        self.assertIsInstance(create_storage("sqlite", "data"), SqliteStorage)
+        # 不明な名前は既定のバックエンドになる
+        self.assertIsInstance(create_storage("unknown", "data"), JournalStorage)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
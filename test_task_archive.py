@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon 完了タスクのアーカイブの単体テスト
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from task_archive import ARCHIVE_SETTING, DEFAULT_ARCHIVE_AFTER_DAYS, TaskArchive, archive_after_days
+from test_helpers import make_task
+
+TODAY = date(2024, 6, 15)
+
+
+class TestTaskArchive(unittest.TestCase):
+    """TaskArchiveクラスのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive = TaskArchive(self.temp_dir)
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_archive_after_days_setting(self):
+        """設定の日数が読み取られ、不正な値は既定値になることを確認"""
+        # 既定ではアーカイブしない
+        self.assertEqual(archive_after_days({}), DEFAULT_ARCHIVE_AFTER_DAYS)
+        self.assertEqual(DEFAULT_ARCHIVE_AFTER_DAYS, 0)
+        self.assertEqual(archive_after_days({ARCHIVE_SETTING: "30"}), 30)
+        self.assertEqual(archive_after_days({ARCHIVE_SETTING: -1}), 0)
+        self.assertEqual(archive_after_days({ARCHIVE_SETTING: "x"}), DEFAULT_ARCHIVE_AFTER_DAYS)
+
+    def test_archive_by_completed_date(self):
+        """完了を見つけた日から数えて日数がたったタスクだけが、見つけた月ごとに移ることを確認"""
+        tasks = [
+            make_task("1", "期限が過ぎている", status="完了", due_date="2023-12-31"),
+            make_task("2", "期限なし", status="完了"),
+            make_task("3", "未着手", status="未着手", due_date="2023-01-01"),
+        ]
+        # 期限日がとうに過ぎていても、初めて見つけた日にはアーカイブしない
+        self.assertEqual(self.archive.archive(tasks, 30, TODAY), [])
+        self.assertEqual(self.archive.archive(tasks, 30, date(2024, 7, 14)), [])
+        later = make_task("4", "後で完了", status="完了")
+        archived = self.archive.archive(tasks + [later], 30, date(2024, 7, 15))
+        self.assertEqual({task["id"] for task in archived}, {"1", "2"})
+        self.assertEqual(self.archive.months(), ["2024-06"])
+        archived = self.archive.archive([later], 30, date(2024, 8, 14))
+        self.assertEqual([task["id"] for task in archived], ["4"])
+        self.assertEqual(self.archive.months(), ["2024-07", "2024-06"])
+
+    def test_reopened_task_restarts_count(self):
+        """未着手に戻したタスクは、また完了した日から数え直すことを確認"""
+        task = make_task("1", "タスク", status="完了")
+        self.archive.archive([task], 30, TODAY)
+        task["status"] = "未着手"
+        self.archive.archive([task], 30, date(2024, 7, 1))
+        task["status"] = "完了"
+        self.assertEqual(self.archive.archive([task], 30, date(2024, 7, 20)), [])
+        self.assertEqual(len(self.archive.archive([task], 30, date(2024, 8, 19))), 1)
+        self.assertEqual(self.archive.months(), ["2024-07"])
+
+    def test_load_and_search(self):
+        """月ごとの読み込みで重複と除外が飛ばされ、検索は一致した行だけを返すことを確認"""
+        tasks = [make_task(str(i), f"レポート{i}" if i % 2 else f"買い物{i}", status="完了", due_date="2024-01-01",
+                           tags="仕事")
+                 for i in range(6)]
+        self.archive.archive(tasks, 30, TODAY)
+        self.archive.archive(tasks, 30, TODAY + timedelta(days=30))
+        # 削除の保存前に終了して同じタスクがもう一度追記された場合
+        self.archive._append("2024-06", tasks[:2])
+        loaded = self.archive.load_month("2024-06", exclude={"5"}.__contains__)
+        self.assertEqual([task["id"] for task in loaded], ["0", "1", "2", "3", "4"])
+        self.assertEqual(self.archive.month_of("3"), "2024-06")
+        self.assertIsNone(self.archive.month_of("5"))
+        found = list(self.archive.search(["れぽーと", "仕事"]))
+        self.assertEqual([(month, task["id"]) for month, task in found],
+                         [("2024-06", "1"), ("2024-06", "3"), ("2024-06", "5")])
+        # 検索は月を覚えず（ワーカースレッドから呼ぶため）、remember で覚える
+        self.assertIsNone(self.archive.month_of("5"))
+        self.archive.remember(found)
+        self.assertEqual(self.archive.month_of("5"), "2024-06")
+
+    def test_remove(self):
+        """読み込んだタスクを取り除くと月のファイルが書き直され、空になれば消えることを確認"""
+        tasks = [make_task("1", "A", status="完了"), make_task("2", "B", status="完了")]
+        self.archive.archive(tasks[:1], 30, TODAY)
+        self.archive.archive(tasks, 30, date(2024, 7, 1))
+        self.archive.archive(tasks, 30, date(2024, 8, 1))
+        self.assertEqual(self.archive.months(), ["2024-07", "2024-06"])
+        for month in self.archive.months():
+            self.archive.load_month(month)
+        removed = self.archive.remove(["1", "9"])
+        self.assertEqual([task["id"] for task in removed], ["1"])
+        self.assertEqual(self.archive.months(), ["2024-07"])
+        self.assertFalse(os.path.exists(self.archive.month_file("2024-06")))
+        self.assertIsNone(self.archive.month_of("1"))
+        self.assertEqual(self.archive.remove(["1"]), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
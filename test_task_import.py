@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon ファイル取り込みの単体テスト
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from task_import import TaskImporter, guess_format, read_rows, validate_row
+from task_record import TaskRecord
+from test_helpers import make_task
+
+
+class TestReadRows(unittest.TestCase):
+    """形式の判定と行の読み込みのテスト"""
+
+    def test_guess_format(self):
+        """拡張子から形式が決まることを確認"""
+        self.assertEqual(guess_format("a.CSV"), "csv")
+        self.assertEqual(guess_format("a.json"), "jsonl")
+        self.assertEqual(guess_format("a.jsonl"), "jsonl")
+        self.assertEqual(guess_format("a.txt"), "txt")
+        self.assertEqual(guess_format("memo", default="txt"), "txt")
+        self.assertEqual(guess_format("-"), "csv")
+
+    def test_formats(self):
+        """CSV・JSON Lines・テキストを行番号付きで読めることを確認"""
+        rows = list(read_rows(io.StringIO("id,name\n1,A\n2,B\n"), "csv"))
+        self.assertEqual([(number, row["name"]) for number, row in rows], [(2, "A"), (3, "B")])
+        rows = list(read_rows(io.StringIO('{"name": "A", "priority": null}\n\n{"name": 1}\n'), "jsonl"))
+        self.assertEqual(rows, [(1, {"name": "A"}), (3, {"name": "1"})])
+        rows = list(read_rows(io.StringIO("  買い物 \n\n掃除\n"), "txt"))
+        self.assertEqual(rows, [(1, {"name": "買い物"}), (3, {"name": "掃除"})])
+        with self.assertRaises(ValueError):
+            list(read_rows(io.StringIO("[1, 2]\n"), "jsonl"))
+
+    def test_validate_row(self):
+        """項目を確かめてタスクになり、不正な行は ValueError になることを確認"""
+        task = validate_row({"name": " A ", "priority": "高", "tags": " 仕事 , 急ぎ ", "status": ""})
+        self.assertIsInstance(task, TaskRecord)
+        self.assertTrue(task["id"])
+        self.assertEqual((task["name"], task["priority"], task["status"], task["tags"]),
+                         ("A", "高", "未着手", "仕事,急ぎ"))
+        for row in ({"name": " "}, {"name": "A", "priority": "最高"}, {"name": "A", "due_date": "3/1"},
+                    {"name": "A", "status": "保留"}):
+            with self.assertRaises(ValueError):
+                validate_row(row)
+
+
+class TestTaskImporter(unittest.TestCase):
+    """TaskImporterのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, text):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            f.write(text)
+        return path
+
+    def test_deduplicate_and_count(self):
+        """既存のタスクとファイル内の重複・不正な行が飛ばされ、件数が数えられることを確認"""
+        csv_path = self.write("tasks.csv", "id,name,due_date,priority\n"
+                                           "1,既存のID,,\n"
+                                           ",既存の名前,2024-01-01,\n"
+                                           ",新規,2024-01-01,\n"
+                                           ",新規,2024-01-02,\n"
+                                           ",不正,,最高\n")
+        txt_path = self.write("memo.txt", "新規\n新規\nメモ\n")
+        existing = [make_task("1", "別の名前"), make_task("2", "既存の名前", due_date="2024-01-01")]
+        importer = TaskImporter([csv_path, txt_path], existing)
+        tasks = list(importer.iter_tasks())
+        self.assertEqual([(task["name"], task["due_date"]) for task in tasks],
+                         [("新規", "2024-01-01"), ("新規", "2024-01-02"), ("新規", ""), ("メモ", "")])
+        self.assertEqual(len({task["id"] for task in tasks}), 4)
+        self.assertEqual((importer.read_count, importer.added_count, importer.duplicate_count,
+                          importer.invalid_count), (8, 4, 3, 1))
+        self.assertEqual(len(importer.errors), 1)
+        self.assertIn("tasks.csv 6行目", importer.errors[0])
+        self.assertEqual(importer.summary(), "追加 4 件、重複 3 件、不正 1 件")
+
+    def test_jsonl(self):
+        """JSON Linesのファイルを取り込めることを確認"""
+        path = self.write("tasks.jsonl", '{"id": "a", "name": "A", "today": "〇"}\n{"id": "a", "name": "B"}\n')
+        tasks = list(TaskImporter([path]).iter_tasks())
+        self.assertEqual([(task["id"], task["today"]) for task in tasks], [("a", "〇")])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon バックグラウンド読み込みの単体テスト
+"""
+
+import threading
+import unittest
+
+from task_loader import BackgroundLoader
+
+
+class TestBackgroundLoader(unittest.TestCase):
+    """BackgroundLoaderのテスト"""
+
+    def test_batches(self):
+        """タスクがバッチに分かれて届き、最後に完了することを確認"""
+        loader = BackgroundLoader(lambda: iter(range(5)), batch_size=2)
+        loader.start()
+        loader.join()
+        self.assertEqual(loader.poll(max_batches=1), [[0, 1]])
+        self.assertEqual(loader.poll(), [[2, 3], [4]])
+        self.assertTrue(loader.done)
+        self.assertIsNone(loader.error)
+        self.assertEqual(loader.loaded_count, 5)
+
+    def test_result(self):
+        """ジェネレーターの戻り値が、最後のバッチを取り出した後に result に入ることを確認"""
+        def tasks():
+            yield from range(3)
+            return "読み込んだ状態"
+
+        loader = BackgroundLoader(tasks)
+        loader.start()
+        loader.join()
+        self.assertIsNone(loader.result)
+        self.assertEqual(loader.poll(), [[0, 1, 2]])
+        self.assertEqual(loader.result, "読み込んだ状態")
+
+    def test_error(self):
+        """読み込み中の例外が error に入ることを確認"""
+        def broken():
+            yield 1
+            raise OSError("読み込み失敗")
+
+        loader = BackgroundLoader(broken)
+        loader.start()
+        loader.join()
+        loader.poll()
+        self.assertTrue(loader.done)
+        self.assertIsInstance(loader.error, OSError)
+
+    def test_cancel(self):
+        """中止するとワーカーが止まることを確認"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            yield 1
+            release.wait()
+            for i in range(1000):
+                yield i
+
+        loader = BackgroundLoader(slow, batch_size=1)
+        loader.start()
+        started.wait()
+        loader.cancel()
+        release.set()
+        loader.join(timeout=5)
+        self.assertTrue(loader.done)
+        self.assertLessEqual(loader.loaded_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon タスクの三方向マージの単体テスト
+"""
+
+import unittest
+
+from task_merge import DELETED, merge_tasks
+from task_record import TASK_FIELDS
+from test_helpers import make_record, make_task
+
+
+class TestMergeTasks(unittest.TestCase):
+    """merge_tasks関数のテスト"""
+
+    def test_unchanged_by_others(self):
+        """相手が変えていなければ自分の内容になり、変えたタスクの版が進むことを確認"""
+        ours = [make_record("1", "変更後", version=1), make_record("2", "B", version=1)]
+        theirs = [make_record("1", "A", version=1), make_record("2", "B", version=1)]
+        merged, versions, external = merge_tasks(ours, theirs, {"1": {"name"}}, {"1", "2"})
+        self.assertEqual([task["name"] for task in merged], ["変更後", "B"])
+        self.assertEqual(versions, [2, 1])
+        self.assertFalse(external)
+
+    def test_changed_by_others(self):
+        """相手だけが変えたタスクは相手の内容になることを確認"""
+        ours = [make_record("1", "A", version=1), make_record("2", "B", version=1)]
+        theirs = [make_record("1", "相手", version=2), make_record("2", "B", version=1)]
+        merged, versions, external = merge_tasks(ours, theirs, {"2": {"status"}}, {"1", "2"})
+        self.assertEqual([task["name"] for task in merged], ["相手", "B"])
+        self.assertEqual(versions, [2, 2])
+        self.assertTrue(external)
+
+    def test_both_changed(self):
+        """両方が変えたタスクは、相手の内容に自分が変えた項目を重ねることを確認"""
+        ours = [make_record("1", "自分", status="完了", version=1)]
+        theirs = [make_record("1", "相手", version=3)]
+        merged, versions, _ = merge_tasks(ours, theirs, {"1": {"status"}}, {"1"})
+        self.assertEqual((merged[0]["name"], merged[0]["status"]), ("相手", "完了"))
+        self.assertEqual(versions, [4])
+        # 自分が追加し直したタスク（すべての項目を変えた）は自分の内容
+        merged, _, _ = merge_tasks(ours, theirs, {"1": set(TASK_FIELDS)}, {"1"})
+        self.assertEqual(merged[0]["name"], "自分")
+
+    def test_deletions(self):
+        """削除と追加がタスクIDごとにマージされることを確認"""
+        ours = [make_record("1", "A", version=1), make_record("2", "変更後", version=1),
+                make_record("4", "自分が追加", version=0)]
+        theirs = [make_record("3", "C", version=1), make_record("5", "相手が追加", version=1)]
+        changes = {"2": {"name"}, "3": DELETED, "4": set(TASK_FIELDS)}
+        merged, versions, external = merge_tasks(ours, theirs, changes, {"1", "2", "3"})
+        # 1 は相手が削除、2 は相手が削除したが自分が変えたので残し、3 は自分が削除
+        self.assertEqual([task["id"] for task in merged], ["2", "4", "5"])
+        self.assertEqual(versions, [2, 1, 1])
+        self.assertTrue(external)
+
+    def test_deleted_legacy_task(self):
+        """版を持たない古いファイルから読んだタスク（版0）も、相手が削除すれば削除されることを確認"""
+        ours = [make_record("1", "読み込んだ", version=0), make_record("2", "自分が追加", version=0)]
+        merged, versions, external = merge_tasks(ours, [], {}, {"1"})
+        self.assertEqual([task["id"] for task in merged], ["2"])
+        self.assertEqual(versions, [1])
+        self.assertTrue(external)
+
+    def test_plain_dicts(self):
+        """版を持たない辞書のタスク（版0）も書き込めることを確認"""
+        merged, versions, external = merge_tasks([make_task("1", "A")], [], {}, set())
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(versions, [1])
+        self.assertFalse(external)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon タスクモデルの単体テスト（画面を使わない）
+"""
+
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+from storage import OP_ADD, OP_DELETE, OP_STATUS, OP_TODAY, OP_UPDATE, CsvStorage, SqliteStorage
+from task_model import TaskModel, tab_tasks
+from test_helpers import make_task
+
+
+class TestTaskModel(unittest.TestCase):
+    """TaskModelのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.recorded = []
+        self.model = TaskModel(self.temp_dir, storage=CsvStorage(self.temp_dir), record_changes=self.recorded.extend)
+        self.model.tasks = [
+            make_task("1", "資料作成", priority="低", due_date="2024-03-01", tags="仕事"),
+            make_task("2", "買い物", today="〇", tags="家"),
+            make_task("3", "レポート提出", status="完了", due_date="2024-01-01"),
+        ]
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_filter_and_sort(self):
+        """タブ・検索・並び替えの組み合わせを確認"""
+        self.assertEqual([t["id"] for t in self.model.filter_tasks("一覧")], ["1"])
+        self.assertEqual([t["id"] for t in self.model.filter_tasks("今日")], ["2"])
+        self.assertEqual([t["id"] for t in self.model.filter_tasks(None, "", "期限順")], ["3", "1", "2"])
+        self.assertEqual([t["id"] for t in self.model.filter_tasks(None, "レポート")], ["3"])
+        self.assertEqual(tab_tasks(self.model.tasks, "完了"), [self.model.store.get("3")])
+        self.assertEqual([t["id"] for t in self.model.sort_tasks(list(self.model.tasks), "タグ順")], ["3", "1", "2"])
+        # 優先度は文字列の順ではなく 高<中<低 の順
+        self.model.update_task("3", {"priority": "高"})
+        self.assertEqual([t["id"] for t in self.model.filter_tasks(None, "", "優先度順")], ["3", "2", "1"])
+
+    def test_status_filter_and_search_conditions(self):
+        """状態フィルターと検索欄の「キー:値」の条件がタブと組み合わさることを確認"""
+        ids = lambda tasks: [t["id"] for t in tasks]
+        self.assertEqual(ids(self.model.filter_tasks(None, status="未着手")), ["1", "2"])
+        self.assertEqual(ids(self.model.filter_tasks(None, status="完了")), ["3"])
+        self.assertEqual(ids(self.model.filter_tasks("一覧", status="完了")), [])
+        self.assertEqual(ids(self.model.filter_tasks(None, "タグ:仕事")), ["1"])
+        self.assertEqual(ids(self.model.filter_tasks(None, "期限:..2024-02-01")), ["3"])
+        self.assertEqual(ids(self.model.filter_tasks(None, "今日:〇 買い")), ["2"])
+        self.assertEqual(ids(self.model.filter_tasks(None, "優先度:低,高", "期限順")), ["1"])
+
+    def test_query_storage_sqlite(self):
+        """SQLiteではSQLで表せる条件をデータベースで、残りを索引で絞り込むことを確認"""
+        self.model.save()
+        model = TaskModel(self.temp_dir, storage=SqliteStorage(self.temp_dir))
+        model.load()
+        try:
+            self.assertTrue(model.queries_storage)
+            self.assertFalse(self.model.queries_storage)
+            for tab, query, status in [("一覧", "", "すべて"), (None, "", "完了"), (None, "タグ:家", "未着手"),
+                                       (None, "期限:2024-01-01..2024-12-31 資料", "すべて")]:
+                self.assertEqual(model.query_storage(tab, query, "期限順", status),
+                                 model.filter_tasks(tab, query, "期限順", status))
+        finally:
+            model.storage.close()
+
+    def test_scan_search(self):
+        """索引を使わない検索でも同じ結果になることを確認"""
+        scanning = TaskModel(self.temp_dir, storage=CsvStorage(self.temp_dir), use_search_index=False)
+        scanning.tasks = list(self.model.tasks)
+        for query in ["作成", "れぽーと", "家"]:
+            self.assertEqual(scanning.search(query), self.model.search(query))
+
+    def test_crud_records_changes(self):
+        """追加・更新・状態変更・削除が変更操作として記録されることを確認"""
+        task = self.model.add_task(" 新しいタスク ", tags="家")
+        self.assertEqual(task["name"], "新しいタスク")
+        self.model.update_task(task["id"], {"priority": "高"})
+        self.assertEqual(self.model.toggle_status(["1", "missing"]), ["1"])
+        self.assertEqual(self.model.set_status(["1", "2"], "完了"), ["2"])
+        self.assertEqual(self.model.toggle_today(["1"]), ["1"])
+        self.model.delete_tasks(["3", "missing"])
+        self.assertEqual([(op, task_id) for op, task_id, _ in self.recorded], [
+            (OP_ADD, task["id"]), (OP_UPDATE, task["id"]), (OP_STATUS, "1"), (OP_STATUS, "2"),
+            (OP_TODAY, "1"), (OP_DELETE, "3"),
+        ])
+        self.assertEqual([t["id"] for t in self.model.filter_tasks("完了")], ["1", "2"])
+
+    def test_invalid_input(self):
+        """入力の誤りが ValueError になることを確認"""
+        with self.assertRaises(ValueError):
+            self.model.add_task("  ")
+        with self.assertRaises(ValueError):
+            self.model.update_task("1", {"name": ""})
+        with self.assertRaises(ValueError):
+            self.model.set_status(["1"], "すべて")
+        self.assertEqual(self.recorded, [])
+
+    def test_bulk_update(self):
+        """まとめた変更が値の変わるタスクだけに適用され、1回で記録されることを確認"""
+        calls = []
+        self.model.record_changes = calls.append
+        changed = self.model.bulk_update(["1", "2", "3", "9", "1"], {"priority": "低", "tags": " 仕事 , 急ぎ "})
+        self.assertEqual(changed, ["1", "2", "3"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][0], (OP_UPDATE, "1", {"tags": "仕事,急ぎ"}))
+        self.assertEqual(self.model.store.get("2")["priority"], "低")
+        self.assertEqual(self.model.store.ids_with_tag("急ぎ"), {"1", "2", "3"})
+        self.assertEqual(self.model.bulk_update(["1"], {"priority": "低"}), [])
+
+        for changes in ({"name": "x"}, {"status": "保留"}, {"priority": "最高"}, {"due_date": "3/1"}):
+            with self.assertRaises(ValueError):
+                self.model.bulk_update(["1"], changes)
+
+    def test_import_tasks(self):
+        """まとめて取り込んだタスクが末尾に追加され、追加操作が1回で記録されることを確認"""
+        calls = []
+        self.model.record_changes = calls.append
+        count = self.model.import_tasks(make_task(str(i), f"取り込み{i}", tags="新規") for i in range(4, 104))
+        self.assertEqual(count, 100)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][0], (OP_ADD, "4", make_task("4", "取り込み4", tags="新規")))
+        self.assertEqual(self.model.tasks[-1]["id"], "103")
+        self.assertEqual(len(self.model.store.ids_with_tag("新規")), 100)
+
+    def test_archive_completed(self):
+        """古い完了タスクがアーカイブへ移って削除が記録され、戻すと未着手で末尾に戻ることを確認"""
+        self.assertEqual(self.model.archive_completed(0), [])
+        self.assertEqual(self.model.archive_completed(30, today=date(2024, 3, 1)), [])
+        archived = self.model.archive_completed(30, today=date(2024, 3, 31))
+        self.assertEqual([task["id"] for task in archived], ["3"])
+        self.assertIsNone(self.model.store.get("3"))
+        self.assertEqual(self.recorded, [(OP_DELETE, "3", None)])
+        self.assertEqual(self.model.archive.months(), ["2024-03"])
+
+        self.model.archive.load_month("2024-03")
+        restored = self.model.restore_archived(["3"])
+        self.assertEqual([task["id"] for task in restored], ["3"])
+        self.assertEqual(self.model.tasks[-1]["status"], "未着手")
+        self.assertEqual(self.recorded[-1][:2], (OP_ADD, "3"))
+        self.assertEqual(self.model.archive.months(), [])
+
+    def test_upsert_tasks(self):
+        """取り込みがIDで突き合わせて追加・更新されることを確認"""
+        added, updated = self.model.upsert_tasks([make_task("1", "資料作成（改）"), make_task("4", "新規")])
+        self.assertEqual((added, updated), (1, 1))
+        self.assertEqual(self.model.store.get("1")["name"], "資料作成（改）")
+        self.assertEqual(self.recorded, [])
+
+    def test_tags(self):
+        """タグリストの抽出と、使われなくなったタグの整理を確認"""
+        self.assertEqual(self.model.extract_tags_from_tasks(), ["仕事", "家"])
+        self.model.reset_tag_changes()
+        self.assertEqual(self.model.add_tags_from_text("旅行, 家"), ["旅行"])
+        self.model.delete_tasks(["2"])
+        self.assertTrue(self.model.sync_tags())
+        self.assertEqual(self.model.tags, ["仕事"])
+
+    def test_persistence(self):
+        """保存したタスクとタグを読み込めることを確認"""
+        self.model.extract_tags_from_tasks()
+        self.model.save()
+        self.model.save_tags()
+        loaded = TaskModel(self.temp_dir, storage=CsvStorage(self.temp_dir))
+        self.assertEqual(loaded.load(), self.model.tasks)
+        self.assertEqual(loaded.load_tags(), ["仕事", "家"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
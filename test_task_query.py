@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon タスクの絞り込みクエリの単体テスト
+"""
+
+import random
+import unittest
+from datetime import date, timedelta
+
+from task_query import (DueBetween, FieldIs, HasTags, TaskQuery, TextMatches, parse_search, split_search,
+                        status_query, tab_query)
+from task_store import TaskStore
+from test_helpers import make_task
+
+SORT_OPTIONS = ["追加順", "期限順", "優先度順", "タグ順"]
+
+
+def random_tasks(count, seed=1):
+    """いろいろな値のタスクを作る"""
+    rng = random.Random(seed)
+    tags = ["仕事", "家", "急ぎ", "会議"]
+    return [make_task(str(i), rng.choice(["レポート作成", "買い物", "会議の準備", "メール返信"]),
+                      status=rng.choice(["未着手", "未着手", "完了"]),
+                      priority=rng.choice(["高", "中", "低"]),
+                      due_date=rng.choice(["", (date(2024, 6, 1) + timedelta(days=rng.randrange(60))).isoformat()]),
+                      tags=",".join(rng.sample(tags, rng.randrange(3))),
+                      today=rng.choice(["〇", "", ""]))
+            for i in range(count)]
+
+
+class TestTaskQuery(unittest.TestCase):
+    """TaskQueryとプランナーのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.tasks = random_tasks(400)
+        self.store = TaskStore([dict(task) for task in self.tasks])
+
+    def assert_same_as_scan(self, query):
+        """索引を使った結果が、すべてのタスクを1件ずつ確かめて並べた結果と同じことを確認"""
+        for sort_option in SORT_OPTIONS:
+            expected = self.store.ordered(sort_option)
+            expected = [task["id"] for task in query.filter(expected)]
+            self.assertEqual([task["id"] for task in query.run(self.store, sort_option)], expected,
+                             (query.explain(self.store), sort_option))
+
+    def test_queries_match_scan(self):
+        """いろいろな条件の組み合わせで、索引を使っても走査と同じ結果になることを確認"""
+        queries = [
+            TaskQuery(),
+            tab_query("一覧"), tab_query("今日"), tab_query("完了"),
+            tab_query("一覧") & status_query("完了"),
+            TaskQuery(HasTags("仕事,急ぎ")),
+            TaskQuery(HasTags(["家", "会議"], match_any=True), FieldIs("priority", ["高"])),
+            TaskQuery(DueBetween("2024-06-10", "2024-06-12")),
+            TaskQuery(DueBetween(end=date(2024, 6, 5)), FieldIs("status", ["完了"], exclude=True)),
+            TaskQuery(TextMatches("れぽーと"), HasTags("仕事")),
+            TaskQuery(TextMatches("会議 準備"), DueBetween(start="2024-07-01")),
+            parse_search("タグ:急ぎ 優先度:高,低 期限:2024-06-01..2024-06-30 買い物"),
+        ]
+        for query in queries:
+            self.assert_same_as_scan(query)
+        # タスクを変えた後も索引が結果と食い違わない
+        self.store.update("1", {"status": "完了", "priority": "高", "tags": "急ぎ"})
+        self.store.delete(["2", "3"])
+        self.store.add(make_task("new", "新しいレポート", priority="高", due_date="2024-06-11", tags="仕事,急ぎ"))
+        for query in queries:
+            self.assert_same_as_scan(query)
+
+    def test_tab_query_matches_tabs(self):
+        """タブのクエリが一覧/今日/完了のタブの見方と同じことを確認"""
+        for task in self.tasks:
+            done = task["status"] == "完了"
+            self.assertEqual(bool(tab_query("完了").filter([task])), done)
+            self.assertEqual(bool(tab_query("今日").filter([task])), not done and task["today"] == "〇")
+            self.assertEqual(bool(tab_query("一覧").filter([task])), not done and task["today"] != "〇")
+        self.assertEqual(len(tab_query(None).filter(self.tasks)), len(self.tasks))
+
+    def test_plan_picks_most_selective_index(self):
+        """候補の最も少ない索引から始め、候補が多ければ全体を走査することを確認"""
+        store = TaskStore([make_task(str(i), f"タスク{i}", tags="珍しい" if i == 5 else "よくある",
+                                     due_date="2024-06-01" if i < 10 else "")
+                           for i in range(100)])
+        rare = HasTags("珍しい")
+        due = DueBetween("2024-06-01", "2024-06-01")
+        first, rest = TaskQuery(tab_query("一覧").predicates[0], due, rare).plan(store)
+        self.assertIs(first, rare)
+        self.assertEqual(len(rest), 2)
+        self.assertIs(TaskQuery(due, HasTags("よくある")).plan(store)[0], due)
+        # 候補が全体の多くを占めるときは索引を使わない
+        self.assertIsNone(TaskQuery(HasTags("よくある")).plan(store)[0])
+        self.assertIsNone(tab_query("一覧").plan(store)[0])
+        self.assertIn("index: tags all {珍しい}", TaskQuery(rare).explain(store))
+
+    def test_sql(self):
+        """SQLで表せる条件だけがWHERE句になり、残りはクエリとして返ることを確認"""
+        conditions, params, rest = (tab_query("今日") & TaskQuery(FieldIs("priority", ["高", "中"]),
+                                                               HasTags("仕事"))).sql()
+        self.assertEqual(conditions, ["today IN (?)", "status NOT IN (?)", "priority IN (?, ?)"])
+        self.assertEqual(params, ["〇", "完了", "中", "高"])
+        self.assertEqual([type(p) for p in rest.predicates], [HasTags])
+
+
+class TestParseSearch(unittest.TestCase):
+    """検索欄の入力の読み取りのテスト"""
+
+    def test_split_search(self):
+        """「キー:値」の語と検索語に分かれ、知らないキーは検索語に残ることを確認"""
+        filters, words = split_search("レポート タグ:仕事 ＴＡＧ：家 url:http://x 今日:〇")
+        self.assertEqual([(field, value) for field, value, _ in filters],
+                         [("tags", "仕事"), ("tags", "家"), ("today", "〇")])
+        self.assertEqual(words, "レポート url:http://x")
+
+    def test_parse_search(self):
+        """条件がそれぞれの種類のクエリになることを確認"""
+        query = parse_search("状態:未着手 優先度:高 期限:2024-06-01.. タグ:A,B 今日:× 検索")
+        status, priority, due, tags, today, text = query.predicates
+        self.assertEqual((status.values, status.exclude), (frozenset(["完了"]), True))
+        self.assertEqual(priority.values, frozenset(["高"]))
+        self.assertEqual((due.start, due.end), (date(2024, 6, 1).toordinal(), date.max.toordinal()))
+        self.assertEqual(tags.tags, ("A", "B"))
+        self.assertTrue(today.exclude)
+        self.assertEqual(text.terms, ["検索"])
+        # 期限日が1つならその日だけ、読めない期限日は検索語として扱う
+        (day,) = parse_search("期限:2024-06-01").predicates
+        self.assertEqual(day.start, day.end)
+        (text,) = parse_search("期限:2024-0").predicates
+        self.assertIsInstance(text, TextMatches)
+        self.assertFalse(parse_search("  "))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
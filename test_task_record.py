@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon タスクレコードの単体テスト
+"""
+
+import copy
+import csv
+import io
+import pickle
+import unittest
+
+from storage import CSV_HEADERS, task_from_row
+from task_record import SHARED_TEXT_CACHE_SIZE, TaskRecord, shared_text, tag_tuple
+
+
+def make_record(task_id="1", name="タスク"):
+    return TaskRecord(task_id, name, "未着手", "高", "2024-01-01", "仕事,急ぎ", "〇")
+
+
+class TestTaskRecord(unittest.TestCase):
+    """TaskRecordクラスのテスト"""
+
+    def test_mapping_access(self):
+        """辞書と同じように読み書きでき、辞書と等しく比べられることを確認"""
+        task = make_record()
+        self.assertEqual(task["name"], "タスク")
+        self.assertEqual(task.name, "タスク")
+        self.assertEqual(task.get("tags"), "仕事,急ぎ")
+        self.assertIsNone(task.get("unknown"))
+        self.assertEqual(list(task), CSV_HEADERS)
+        self.assertEqual(dict(task), {"id": "1", "name": "タスク", "status": "未着手", "priority": "高",
+                                      "due_date": "2024-01-01", "tags": "仕事,急ぎ", "today": "〇"})
+        self.assertEqual(task, dict(task))
+
+        task.update({"status": "完了"}, today="")
+        task["name"] = "変更"
+        self.assertEqual((task.status, task.today, task.name), ("完了", "", "変更"))
+        with self.assertRaises(KeyError):
+            task["unknown"]
+        with self.assertRaises(KeyError):
+            task["unknown"] = "x"
+
+    def test_shared_values(self):
+        """同じ値の文字列とタグのタプルが共有されることを確認"""
+        rows = [{"id": str(i), "name": "A", "status": "".join(["完", "了"]), "tags": ",".join(["仕事", "急ぎ"])}
+                for i in range(2)]
+        first, second = (task_from_row(row) for row in rows)
+        self.assertIs(first.status, second.status)
+        self.assertIs(first.tags, second.tags)
+        self.assertIs(first.tag_list, second.tag_list)
+        self.assertEqual(first.tag_list, ("仕事", "急ぎ"))
+        self.assertIs(tag_tuple("仕事,急ぎ"), first.tag_list)
+        # 値の種類に限りのないタグ・期限日は上限のあるキャッシュで共有し、タスク名は共有しない
+        self.assertEqual(shared_text.cache_info().maxsize, SHARED_TEXT_CACHE_SIZE)
+        first["name"] = "".join(["名", "前"])
+        second["name"] = "".join(["名", "前"])
+        self.assertIsNot(first.name, second.name)
+
+    def test_copy_and_pickle(self):
+        """コピーとpickleで同じ内容の別のレコードになることを確認"""
+        task = make_record()
+        task.version = 3
+        for other in (task.copy(), copy.copy(task), pickle.loads(pickle.dumps(task))):
+            self.assertIsInstance(other, TaskRecord)
+            self.assertIsNot(other, task)
+            self.assertEqual(other, task)
+            self.assertEqual(other.version, 3)
+
+    def test_version(self):
+        """版は項目に含まれず、比較にも使われないことを確認"""
+        task = make_record()
+        self.assertEqual(task.version, 0)
+        other = make_record()
+        other.version = 5
+        self.assertEqual(task, other)
+        self.assertNotIn("version", dict(other))
+        self.assertEqual(task_from_row({"id": "1", "version": "7"}).version, 7)
+        self.assertEqual(task_from_row({"id": "1", "version": "x"}).version, 0)
+
+    def test_csv_writer(self):
+        """CSV_HEADERS形式のDictWriterでそのまま書き出せることを確認"""
+        stream = io.StringIO()
+        writer = csv.DictWriter(stream, fieldnames=CSV_HEADERS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerow(make_record())
+        stream.seek(0)
+        self.assertEqual(next(csv.DictReader(stream)), dict(make_record()))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
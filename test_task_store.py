@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon タスクストアの単体テスト
+"""
+
+import unittest
+from datetime import date
+
+from task_store import TagIndex, TaskStore
+from test_helpers import make_task
+
+
+class TestTaskStore(unittest.TestCase):
+    """TaskStoreのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.store = TaskStore([make_task("1", "同じ名前"), make_task("2", "同じ名前")])
+
+    def test_get_by_id(self):
+        """同じ名前のタスクでもIDで区別して取得できることを確認"""
+        self.assertEqual(self.store.get("2")["id"], "2")
+        self.assertIsNone(self.store.get("unknown"))
+
+    def test_add_update_delete(self):
+        """追加・更新・削除で索引とリストが一致することを確認"""
+        self.store.add(make_task("3", "追加"))
+        self.store.update("1", {"status": "完了"})
+        removed = self.store.delete(["2", "unknown"])
+
+        self.assertEqual([t["id"] for t in removed], ["2"])
+        self.assertEqual([t["id"] for t in self.store.tasks], ["1", "3"])
+        self.assertEqual(self.store.get("1")["status"], "完了")
+        self.assertIsNone(self.store.get("2"))
+
+    def test_tasks_read_only(self):
+        """マスターリストは直接変更できず、追加・削除のたびに新しい内容を返すことを確認"""
+        tasks = self.store.tasks
+        with self.assertRaises(AttributeError):
+            tasks.append(make_task("4", "直接追加"))
+        self.assertIs(self.store.tasks, tasks)
+        self.store.add(make_task("4", "追加"))
+        self.assertEqual([t["id"] for t in self.store.tasks], ["1", "2", "4"])
+        self.assertEqual(len(tasks), 2)
+
+
+    def test_apply_snapshot(self):
+        """読み直した一覧との差分だけが適用されることを確認"""
+        kept = self.store.get("2")
+        changed = make_task("1", "変更後")
+        changed["tags"] = "外部"
+        version = self.store.version
+        result = self.store.apply_snapshot([changed, dict(kept), make_task("3", "追加")])
+        self.assertEqual(result, (["3"], ["1"], []))
+        self.assertIs(self.store.get("2"), kept)
+        self.assertEqual(self.store.get("1")["name"], "変更後")
+        self.assertGreater(self.store.version, version)
+        self.assertEqual(self.store.used_tags(), ["外部"])
+        self.assertEqual(self.store.search("追加"), [self.store.get("3")])
+
+        result = self.store.apply_snapshot([make_task("3", "追加")])
+        self.assertEqual(result, ([], [], ["1", "2"]))
+        self.assertEqual([task["id"] for task in self.store], ["3"])
+        self.assertEqual(self.store.apply_snapshot([make_task("3", "追加")]), ([], [], []))
+
+    def test_sorted_sequences(self):
+        """整列済みの列が追加・更新・削除に合わせて保たれることを確認"""
+        store = TaskStore([
+            make_task("1", "A", priority="低", due_date="2024-01-03", tags="ｂ"),
+            make_task("2", "B", priority="高", due_date="", tags="a"),
+            make_task("3", "C", priority="中", due_date="2024-01-01", tags="B"),
+        ])
+
+        def ids(sort_option, task_ids=None):
+            return [task["id"] for task in store.ordered(sort_option, task_ids)]
+
+        self.assertEqual(ids("優先度順"), ["2", "3", "1"])
+        self.assertEqual(ids("期限順"), ["3", "1", "2"])
+        # タグは全角/半角・大文字/小文字を区別しない（同じタグなら期限順）
+        self.assertEqual(ids("タグ順"), ["2", "3", "1"])
+        self.assertEqual(ids("追加順"), ["1", "2", "3"])
+
+        store.add(make_task("4", "D", priority="高", due_date="2023-12-31", tags="a"))
+        store.update("1", {"priority": "高", "due_date": "2023-12-01"})
+        store.update("2", {"name": "並びに関わらない変更"})
+        self.assertEqual(ids("優先度順"), ["1", "4", "2", "3"])
+        self.assertEqual(ids("期限順"), ["1", "4", "3", "2"])
+        self.assertEqual(ids("タグ順"), ["4", "2", "1", "3"])
+        store.delete(["4"])
+        self.assertEqual(ids("期限順"), ["1", "3", "2"])
+        self.assertEqual(ids("期限順", {"2", "3"}), ["3", "2"])
+        self.assertEqual(store.sort([store.get("2"), store.get("1")], "優先度順"), [store.get("1"), store.get("2")])
+
+        # 多く削除したときも列が保たれる
+        store.extend(make_task(str(i), "E", due_date="2024-02-01") for i in range(10, 110))
+        store.delete([str(i) for i in range(10, 100)])
+        self.assertEqual(ids("期限順")[:3], ["1", "3", "100"])
+        self.assertEqual(len(ids("期限順")), len(store))
+
+    def test_update_many(self):
+        """多くのタスクをまとめて更新しても整列済みの列が保たれることを確認"""
+        store = TaskStore([make_task(str(i), "A", priority="中", due_date=f"2024-01-{i % 28 + 1:02d}")
+                           for i in range(200)])
+        store.ordered("優先度順")
+        store.ordered("期限順")
+        updated = store.update_many({str(i): {"priority": "高", "due_date": ""} for i in range(0, 200, 2)})
+        self.assertEqual(len(updated), 100)
+        expected = TaskStore([dict(task) for task in store.tasks])
+        for sort_option in ("優先度順", "期限順"):
+            self.assertEqual([task["id"] for task in store.ordered(sort_option)],
+                             [task["id"] for task in expected.ordered(sort_option)])
+        # 少ない件数は1件ずつ挿入し直す
+        store.update_many({"1": {"priority": "低"}, "999": {"priority": "高"}})
+        self.assertEqual(store.ordered("優先度順")[-1]["id"], "1")
+
+    def test_extend_many(self):
+        """多くのタスクをまとめて追加しても整列済みの列が保たれることを確認"""
+        store = TaskStore([make_task(str(i), "A", due_date=f"2024-02-{i % 28 + 1:02d}") for i in range(50)])
+        store.ordered("期限順")
+        store.extend([make_task(str(i), "B", priority="高", due_date=f"2024-01-{i % 28 + 1:02d}")
+                      for i in range(50, 250)])
+        expected = TaskStore([dict(task) for task in store.tasks])
+        for sort_option in ("優先度順", "期限順"):
+            self.assertEqual([task["id"] for task in store.ordered(sort_option)],
+                             [task["id"] for task in expected.ordered(sort_option)])
+        self.assertEqual(store.get("249")["name"], "B")
+
+    def test_due_heap(self):
+        """期限日の近い順に期限切れのタスクが1回ずつ取り出されることを確認"""
+        store = TaskStore([
+            make_task("1", "A", due_date="2024-01-03"),
+            make_task("2", "B", due_date=""),
+            make_task("3", "C", due_date="2024-01-01"),
+            make_task("4", "D", due_date="2024-01-02", status="完了"),
+        ])
+        jan = lambda day: date(2024, 1, day).toordinal()
+        self.assertEqual(store.task_due_ordinal(store.get("1")), jan(3))
+        self.assertEqual(store.next_due_ordinal(), jan(1))
+        self.assertEqual(store.pop_overdue(jan(2)), ["3"])
+        self.assertEqual(store.pop_overdue(jan(2)), [])
+
+        # 期限日が変わった古い要素や削除したタスクは取り出さない
+        store.update("1", {"due_date": "2024-01-10"})
+        store.update("4", {"status": "未着手"})
+        store.add(make_task("5", "E", due_date="2024-01-05"))
+        store.delete(["5"])
+        self.assertEqual(store.next_due_ordinal(), jan(2))
+        self.assertEqual(store.pop_overdue(jan(20)), ["4", "1"])
+        self.assertIsNone(store.next_due_ordinal())
+
+    def test_value_ids(self):
+        """状態などの値ごとのタスクIDが追加・更新・削除に合わせて変わることを確認"""
+        store = TaskStore([make_task("1", "A"), make_task("2", "B", status="完了")])
+        self.assertEqual(store.value_ids("status"), {"未着手": {"1"}, "完了": {"2"}})
+        store.add(make_task("3", "C", priority="高"))
+        store.update("1", {"status": "完了", "name": "変更"})
+        store.delete(["2"])
+        self.assertEqual(store.value_ids("status"), {"未着手": {"3"}, "完了": {"1"}})
+        self.assertEqual(store.value_ids("priority"), {"中": {"1"}, "高": {"3"}})
+        # マスターリストを置き換えたら作り直す
+        store.reset([make_task("9", "Z")])
+        self.assertEqual(store.value_ids("status"), {"未着手": {"9"}})
+
+    def test_due_between(self):
+        """期限日の範囲のタスクを期限順の列の二分探索で数えて取り出せることを確認"""
+        store = TaskStore([make_task(str(day), "A", due_date=f"2024-01-{day:02d}") for day in (5, 1, 3)]
+                          + [make_task("none", "期限なし")])
+        jan = lambda day: date(2024, 1, day).toordinal()
+        self.assertEqual(store.count_due_between(jan(2), jan(5)), 2)
+        self.assertEqual(store.ids_due_between(jan(1), jan(4)), ["1", "3"])
+        store.update("5", {"due_date": "2024-01-02"})
+        self.assertEqual(store.ids_due_between(jan(1), jan(4)), ["1", "5", "3"])
+        self.assertEqual(store.count_due_between(jan(6), jan(31)), 0)
+
+    def test_view_version(self):
+        """変更されたタスクのビューだけ変更番号が進むことを確認"""
+        store = TaskStore([make_task("1", "A"), make_task("2", "B")], view_of=lambda task: task["status"])
+        before = store.view_version("完了")
+        store.update("1", {"name": "変更"})
+        self.assertEqual(store.view_version("完了"), before)
+        store.update("1", {"status": "完了"})
+        self.assertNotEqual(store.view_version("完了"), before)
+
+
+class TestTagIndex(unittest.TestCase):
+    """タグの転置索引のテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        tasks = [make_task("1", "タスク1"), make_task("2", "タスク2")]
+        tasks[0]["tags"] = "仕事, 急ぎ"
+        tasks[1]["tags"] = "仕事"
+        self.store = TaskStore(tasks)
+        self.store.pop_tag_changes()
+
+    def test_reference_count(self):
+        """タグごとの参照数とタスクIDが数えられることを確認"""
+        index = TagIndex()
+        index.rebuild(self.store.tasks)
+        self.assertEqual(index.count("仕事"), 2)
+        self.assertEqual(index.task_ids("急ぎ"), {"1"})
+        self.assertEqual(list(index), ["仕事", "急ぎ"])
+
+    def test_update_changes_only_changed_tags(self):
+        """タグの付け替えで増減したタグだけが記録されることを確認"""
+        self.store.update("1", {"tags": "仕事, 家"})
+        self.assertEqual(self.store.pop_tag_changes(), (["家"], {"急ぎ"}))
+        self.assertEqual(self.store.tag_count("仕事"), 2)
+        # タグ以外の更新では変化なし
+        self.store.update("2", {"status": "完了"})
+        self.assertEqual(self.store.pop_tag_changes(), ([], set()))
+
+    def test_delete_and_add_cancel_out(self):
+        """同じタグの増減は打ち消し合うことを確認"""
+        self.store.delete(["1"])
+        task = make_task("3", "タスク3")
+        task["tags"] = "急ぎ"
+        self.store.add(task)
+        self.assertEqual(self.store.pop_tag_changes(), ([], set()))
+        self.store.delete(["2"])
+        self.assertEqual(self.store.pop_tag_changes(), ([], {"仕事"}))
+        self.assertEqual(self.store.used_tags(), ["急ぎ"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
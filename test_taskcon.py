@@ -6,6 +6,7 @@ taskcon 単体テスト
 
 import unittest
 import os
+import json
 import tempfile
 import shutil
 from datetime import datetime, date
@@ -14,10 +15,14 @@ from unittest.mock import patch, MagicMock
 
 # テスト用のモックTkinterDnD
 class MockTkinterDnD:
+    DND_FILES = 'DND_Files'
+
     class Tk:
         def __init__(self):
             pass
 
+MockTkinterDnD.TkinterDnD = MockTkinterDnD
+
 # モックを設定
 import sys
 sys.modules['tkinterdnd2'] = MockTkinterDnD()
@@ -27,6 +32,9 @@ class MockDateEntry:
     def __init__(self, *args, **kwargs):
         self._date = None
     
+    def grid(self, *args, **kwargs):
+        pass
+    
     def get_date(self):
         return self._date
     
@@ -37,7 +45,11 @@ sys.modules['tkcalendar'] = MagicMock()
 sys.modules['tkcalendar'].DateEntry = MockDateEntry
 
 # メインアプリケーションをインポート
-from main import TaskApp, SettingsWindow, CSV_HEADERS, PRIORITY_LEVELS, STATUS_OPTIONS, SORT_OPTIONS, TODAY_OPTIONS
+from main import TaskApp, SettingsWindow, BulkEditWindow, CSV_HEADERS, PRIORITY_LEVELS, STATUS_OPTIONS, SORT_OPTIONS, TODAY_OPTIONS
+from virtual_tree import VirtualTreeview
+from storage import save_settings, write_tasks_csv
+from task_archive import ARCHIVE_SETTING, TaskArchive
+from tkinter import ttk
 
 
 class TestTaskDataStructure(unittest.TestCase):
@@ -107,6 +119,7 @@ class TestTaskApp(unittest.TestCase):
     
     def tearDown(self):
         """テスト後のクリーンアップ"""
+        self.app.writer.close()  # 書き込み待ちの変更を書き終えてから削除する
         self.root.destroy()
         shutil.rmtree(self.temp_dir)
     
@@ -153,7 +166,7 @@ class TestTaskApp(unittest.TestCase):
             "tags": "",
             "today": ""
         }
-        self.app.tasks.append(test_task)
+        self.app.store.add(test_task)
         
         # 削除対象のタスクをview_tasksに設定
         self.app.view_tasks = [test_task]
@@ -179,7 +192,7 @@ class TestTaskApp(unittest.TestCase):
             "tags": "",
             "today": ""
         }
-        self.app.tasks.append(test_task)
+        self.app.store.add(test_task)
         
         # モックでチェックボックスを選択状態にする
         with patch.object(self.app, 'get_selected_task_ids', return_value=["test-id"]):
@@ -203,7 +216,7 @@ class TestTaskApp(unittest.TestCase):
             "tags": "",
             "today": ""
         }
-        self.app.tasks.append(test_task)
+        self.app.store.add(test_task)
         
         # モックでチェックボックスを選択状態にする
         with patch.object(self.app, 'get_selected_task_ids', return_value=["test-id"]):
@@ -215,6 +228,79 @@ class TestTaskApp(unittest.TestCase):
             self.app.toggle_today_status()
             self.assertEqual(test_task["today"], "")
     
+    def test_checkbox_selection(self):
+        """チェックが表示の更新後も残り、タブごとにまとめてチェックできることを確認"""
+        self.app.tasks = [
+            {"id": str(i), "name": f"タスク{i}", "status": "完了" if i == 3 else "未着手", "priority": "中",
+             "due_date": "", "tags": "", "today": ""}
+            for i in range(4)
+        ]
+        self.app.apply_filters_and_sort()
+        self.app._toggle_checkbox(self.app.task_view, "1")
+        self.assertEqual(self.app.task_tree.item("1", "values")[0], "☑")
+
+        # 表示を作り直してもチェックは消えない
+        self.app.apply_filters_and_sort()
+        self.assertEqual(self.app.get_selected_task_ids(), ["1"])
+        self.assertEqual(self.app.task_tree.item("1", "values")[0], "☑")
+
+        self.app.toggle_check_all("一覧")
+        self.assertEqual(sorted(self.app.get_selected_task_ids()), ["0", "1", "2"])
+        self.app.toggle_check_all("一覧")
+        self.assertEqual(self.app.get_selected_task_ids(), [])
+
+        # 削除したタスクのチェックは外れる
+        self.app.apply_filters_and_sort(tab="完了")
+        self.app.toggle_check_all("完了")
+        with patch('tkinter.messagebox.askyesno', return_value=True):
+            self.app.delete_task()
+        self.assertIsNone(self.app.store.get("3"))
+        self.assertEqual(self.app.get_selected_task_ids(), [])
+
+    def test_bulk_edit(self):
+        """チェックしたタスクの変更が1回の更新・1回の記録で反映されることを確認"""
+        self.app.tasks = [
+            {"id": str(i), "name": f"タスク{i}", "status": "未着手", "priority": "中",
+             "due_date": "", "tags": "", "today": ""}
+            for i in range(3)
+        ]
+        self.app.apply_filters_and_sort()
+        self.app.selection.set_checked(["0", "2"])
+        with patch.object(self.app.model, "record_changes") as mock_record, \
+                patch.object(self.app, "apply_filters_and_sort") as mock_apply, \
+                patch.object(BulkEditWindow, "show", return_value={"priority": "高", "tags": "一括"}):
+            self.app.bulk_edit()
+            mock_record.assert_called_once()
+            mock_apply.assert_called_once_with()
+        self.assertEqual([t["priority"] for t in self.app.tasks], ["高", "中", "高"])
+        self.assertIn("一括", self.app.tags)
+
+        with patch('tkinter.messagebox.showwarning') as mock_warning:
+            self.assertEqual(self.app.apply_bulk_changes(["0"], {"due_date": "明日"}), [])
+            mock_warning.assert_called_once()
+
+    def test_perf_monitor(self):
+        """計測を有効にすると段階ごとの処理時間がステータスバーとログに出ることを確認"""
+        self.addCleanup(self.app.perf.close)
+        with patch.dict(os.environ, {"TASKCON_PERF": "1"}):
+            self.app._configure_perf()
+        self.app.tasks = [
+            {"id": "1", "name": "タスク", "status": "未着手", "priority": "中",
+             "due_date": "", "tags": "", "today": ""}
+        ]
+        self.app.apply_filters_and_sort()
+        self.assertEqual(self.app.perf.stats("apply_filters_and_sort")["count"], 1)
+        self.assertEqual(self.app.perf.stats("_populate_listbox")["count"], 1)
+        self.assertIn("絞込", self.app.perf_status_label.cget("text"))
+        with open(os.path.join(self.test_data_folder, "perf.jsonl"), encoding="utf-8") as f:
+            stages = [json.loads(line)["stage"] for line in f]
+        self.assertEqual(stages, ["_populate_listbox", "apply_filters_and_sort"])
+
+        with patch.dict(os.environ, {"TASKCON_PERF": "0"}):
+            self.app._configure_perf()
+        self.app.apply_filters_and_sort()
+        self.assertIsNone(self.app.perf.stats("apply_filters_and_sort"))
+
     def test_apply_filters_and_sort(self):
         """フィルタリングとソートのテスト"""
         # テスト用のタスクを追加
@@ -365,6 +451,189 @@ class TestTaskApp(unittest.TestCase):
         self.assertEqual(self.app.view_tasks[2]["tags"], "C")
 
 
+    def _set_search_tasks(self):
+        """検索テスト用のタスクを設定する"""
+        self.app.tasks = [
+            {"id": str(i), "name": f"タスク{name}", "status": "未着手", "priority": "中",
+             "due_date": "", "tags": "", "today": ""}
+            for i, name in enumerate(["A", "B", "AB"], start=1)
+        ]
+
+    def test_search_debounce(self):
+        """連続したキー入力がまとめられ、検索語が同じなら絞り込まないことを確認"""
+        self._set_search_tasks()
+        with patch.object(self.app.root, "after", return_value="after#1") as mock_after, \
+                patch.object(self.app.root, "after_cancel") as mock_cancel, \
+                patch.object(self.app, "apply_filters_and_sort", wraps=self.app.apply_filters_and_sort) as mock_apply:
+            self.app.search_entry.insert(0, "A")
+            self.app.on_search_key()
+            self.app.on_search_key()
+            self.assertEqual(mock_after.call_count, 2)
+            mock_cancel.assert_called_once_with("after#1")
+            mock_apply.assert_not_called()
+
+            self.app._run_search()
+            self.app._run_search()
+            mock_apply.assert_called_once_with(refine=True)
+        self.assertEqual([t["id"] for t in self.app.view_tasks], ["1", "3"])
+
+    def test_incremental_search(self):
+        """検索語を延ばしたときは直前の結果から絞り込むことを確認"""
+        self._set_search_tasks()
+        self.app.search_entry.insert(0, "タスクa")
+        self.app._run_search()
+        self.app.search_entry.insert(tk.END, "b")
+        with patch.object(self.app.model, "filter_tasks", wraps=self.app.model.filter_tasks) as mock_filter:
+            self.app._run_search()
+            mock_filter.assert_not_called()
+        self.assertEqual([t["id"] for t in self.app.view_tasks], ["3"])
+
+        # タスクが変わったら直前の結果は使わない
+        self.app.store.add({"id": "4", "name": "タスクAB2", "status": "未着手", "priority": "中",
+                               "due_date": "", "tags": "", "today": ""})
+        self.app.search_entry.insert(tk.END, "2")
+        self.app._run_search()
+        self.assertEqual([t["id"] for t in self.app.view_tasks], ["4"])
+
+    def test_status_filter_and_search_conditions(self):
+        """状態フィルターと検索欄の「キー:値」の条件で絞り込み、変えたらタブを切り替えても作り直すことを確認"""
+        self.app.tasks = [
+            {"id": "1", "name": "資料", "status": "未着手", "priority": "高", "due_date": "", "tags": "仕事", "today": ""},
+            {"id": "2", "name": "買い物", "status": "未着手", "priority": "中", "due_date": "", "tags": "家", "today": ""},
+            {"id": "3", "name": "報告", "status": "完了", "priority": "中", "due_date": "", "tags": "仕事", "today": ""},
+        ]
+        self.app.apply_filters_and_sort(tab="一覧")
+        self.assertEqual([t["id"] for t in self.app.view_tasks], ["1", "2"])
+        self.app.status_filter_var.set("完了")
+        self.app.apply_filters_and_sort(tab="一覧")
+        self.assertEqual(self.app.view_tasks, [])
+        self.app.apply_filters_and_sort(tab="完了")
+        self.assertEqual([t["id"] for t in self.app.view_completed_tasks], ["3"])
+
+        self.app.status_filter_var.set("すべて")
+        self.app.search_entry.insert(0, "タグ:仕事")
+        with patch.object(self.app.notebook, "tab", return_value="一覧"):
+            self.app.on_tab_changed()
+        self.assertEqual([t["id"] for t in self.app.view_tasks], ["1"])
+        self.app.search_entry.delete(0, tk.END)
+        self.app.search_entry.insert(0, "優先度:中")
+        self.app._run_search()
+        self.assertEqual([t["id"] for t in self.app.view_tasks], ["2"])
+
+    def test_stale_search_abandoned(self):
+        """新しい検索が始まると実行中の古い絞り込みが打ち切られることを確認"""
+        self._set_search_tasks()
+        with patch('main.SEARCH_CHUNK_SIZE', 1), \
+                patch.object(self.app, "_finish_filter", wraps=self.app._finish_filter) as mock_finish:
+            self.app.search_entry.insert(0, "タスク")
+            self.app.apply_filters_and_sort()
+            self.app.search_entry.insert(tk.END, "A")
+            self.app.apply_filters_and_sort(refine=True)
+            self.app.search_entry.insert(tk.END, "B")
+            self.app.apply_filters_and_sort(refine=True)
+            self.root.update()
+            # 古い検索語の絞り込みは最後まで進まない
+            self.assertEqual(mock_finish.call_count, 2)
+        self.assertEqual([t["id"] for t in self.app.view_tasks], ["3"])
+
+
+    def test_tab_cache(self):
+        """変更のないタブへの切り替えでは再計算せず、変更に関わるタブだけ再計算することを確認"""
+        self._set_search_tasks()
+        self.app.tasks[1]["today"] = "〇"
+        self.app.tasks = list(self.app.tasks)
+        for tab in ["一覧", "今日", "完了"]:
+            self.app.apply_filters_and_sort(tab=tab)
+        self.assertEqual([t["id"] for t in self.app.view_today_tasks], ["2"])
+
+        with patch.object(self.app, "apply_filters_and_sort") as mock_apply:
+            self.app.notebook.select(1)
+            self.app.on_tab_changed()
+            mock_apply.assert_not_called()
+
+            # 一覧のタスクの変更では今日タブは無効にならない
+            self.app.store.update("1", {"name": "変更"})
+            self.app.on_tab_changed()
+            mock_apply.assert_not_called()
+
+            # 今日のタスクが完了すると今日タブを再計算する
+            self.app.store.update("2", {"status": "完了"})
+            self.app.on_tab_changed()
+            mock_apply.assert_called_once_with()
+        self.app.notebook.select(0)
+
+
+class TestVirtualTreeview(unittest.TestCase):
+    """VirtualTreeviewクラスのテスト"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.tree = ttk.Treeview(self.root, columns=('選択', 'タスク名'), show='headings', height=10)
+        self.scrollbar = ttk.Scrollbar(self.root, orient=tk.VERTICAL)
+        self.view = VirtualTreeview(self.tree, self.scrollbar, threshold=100, buffer_rows=5)
+        self.rows = [(f"id{i}", ("□", f"タスク{i}"), ("black",)) for i in range(1000)]
+    
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.root.destroy()
+    
+    def test_small_list_is_fully_materialized(self):
+        """しきい値以下の行数ではすべての行が挿入されることを確認"""
+        self.view.set_rows(self.rows[:50])
+        self.assertFalse(self.view.virtual)
+        self.assertEqual(len(self.tree.get_children()), 50)
+    
+    def test_large_list_is_virtualized(self):
+        """しきい値を超えると表示範囲の行だけが挿入されることを確認"""
+        self.view.set_rows(self.rows)
+        self.assertTrue(self.view.virtual)
+        self.assertLess(len(self.tree.get_children()), 100)
+        
+        # スクロールバーで中央へ移動すると、その付近の行が実体化される
+        self.view.yview("moveto", "0.5")
+        self.assertEqual(self.view.first, 500)
+        self.assertIn("id500", self.tree.get_children())
+        self.assertEqual(self.tree.item("id500", 'values')[1], "タスク500")
+    
+    def test_checkbox_survives_scroll(self):
+        """チェック状態がスクロール後も保持されることを確認"""
+        self.view.set_rows(self.rows)
+        self.view.set_row_values(0, ("☑", "タスク0"))
+        self.view.yview("moveto", "0.9")
+        self.assertNotIn("id0", self.tree.get_children())
+        self.view.yview("moveto", "0")
+        self.assertEqual(self.tree.item("id0", 'values')[0], "☑")
+    
+    def test_incremental_update(self):
+        """変更された行だけがTreeviewに反映されることを確認"""
+        self.view.set_rows(self.rows[:50])
+        rows = list(self.rows[:50])
+        rows[10] = ("id10", ("□", "変更後"), ("black",))
+        rows.insert(0, rows.pop(30))
+        del rows[5]
+        self.view.set_rows(rows)
+        
+        # 削除1回・移動(detach/move)2回・更新1回
+        self.assertEqual(self.view.last_tk_calls, 4)
+        self.assertEqual(list(self.tree.get_children()), [key for key, _, _ in rows])
+        self.assertEqual(self.tree.item("id10", 'values')[1], "変更後")
+
+
+    def test_scroll_end(self):
+        """末尾の行まで表示したときだけ on_scroll_end が呼ばれることを確認"""
+        reached = []
+        self.view.on_scroll_end = lambda: reached.append(self.view.first)
+        self.view.set_rows(self.rows)
+        self.view.yview("moveto", "0.5")
+        self.assertEqual(reached, [])
+        self.view.yview("moveto", "1.0")
+        self.view.yview("scroll", "1", "units")
+        self.assertEqual(len(reached), 2)
+        self.assertGreaterEqual(reached[0] + self.view.visible_rows(), len(self.rows))
+
+
 class TestSettingsWindow(unittest.TestCase):
     """SettingsWindowクラスのテスト"""
     
@@ -391,6 +660,23 @@ class TestSettingsWindow(unittest.TestCase):
         self.settings_window._ok_clicked()
         self.assertEqual(self.settings_window.result_data_folder, new_folder)
     
+    def test_perf_monitor_setting(self):
+        """処理時間の計測の設定が結果に反映されることを確認"""
+        self.assertFalse(self.settings_window.result_perf_monitor)
+        self.settings_window.perf_monitor_var.set(True)
+        self.settings_window._ok_clicked()
+        self.assertTrue(self.settings_window.result_perf_monitor)
+    
+    def test_archive_after_days_setting(self):
+        """アーカイブするまでの日数が結果に反映され、不正な値は元の値のままであることを確認"""
+        self.settings_window.archive_days_var.set("30")
+        self.settings_window._ok_clicked()
+        self.assertEqual(self.settings_window.result_archive_after_days, 30)
+        window = SettingsWindow(self.root, self.test_data_folder, archive_after_days=90)
+        window.archive_days_var.set("x")
+        window._ok_clicked()
+        self.assertEqual(window.result_archive_after_days, 90)
+    
     def test_cancel_clicked(self):
         """キャンセルボタンクリックのテスト"""
         self.settings_window.data_folder_var.set("/different/path")
@@ -399,6 +685,35 @@ class TestSettingsWindow(unittest.TestCase):
         self.assertEqual(self.settings_window.result_data_folder, self.test_data_folder)
 
 
+class TestBulkEditWindow(unittest.TestCase):
+    """BulkEditWindowクラスのテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.window = BulkEditWindow(self.root, 3)
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.root.destroy()
+
+    def test_ok_clicked(self):
+        """チェックした項目だけが変更内容になることを確認"""
+        self.window.enabled_vars["priority"].set(True)
+        self.window.value_vars["priority"].set("低")
+        self.window.enabled_vars["due_date"].set(True)
+        self.window.value_vars["tags"].set("無視される")
+        self.window._ok_clicked()
+        self.assertEqual(self.window.result_changes, {"priority": "低", "due_date": ""})
+
+    def test_cancel_clicked(self):
+        """キャンセルすると変更内容がないことを確認"""
+        self.window.enabled_vars["status"].set(True)
+        self.window._cancel_clicked()
+        self.assertIsNone(self.window.result_changes)
+
+
 class TestDataPersistence(unittest.TestCase):
     """データ永続化のテスト"""
     
@@ -416,6 +731,7 @@ class TestDataPersistence(unittest.TestCase):
     
     def tearDown(self):
         """テスト後のクリーンアップ"""
+        self.app.writer.close()  # 書き込み待ちの変更を書き終えてから削除する
         self.root.destroy()
         shutil.rmtree(self.temp_dir)
     
@@ -431,7 +747,7 @@ class TestDataPersistence(unittest.TestCase):
             "tags": "テスト",
             "today": "〇"
         }
-        self.app.tasks.append(test_task)
+        self.app.store.add(test_task)
         
         # タスクを保存
         self.app.save_tasks()
@@ -452,6 +768,7 @@ class TestDataPersistence(unittest.TestCase):
             self.assertEqual(loaded_task["due_date"], "2024-01-01")
             self.assertEqual(loaded_task["tags"], "テスト")
             self.assertEqual(loaded_task["today"], "〇")
+            new_app.writer.close()
     
     def test_save_and_load_tags(self):
         """タグの保存と読み込みのテスト"""
@@ -474,6 +791,214 @@ class TestDataPersistence(unittest.TestCase):
             self.assertIn("タグ1", new_app.tags)
             self.assertIn("タグ2", new_app.tags)
             self.assertIn("タグ3", new_app.tags)
+            new_app.writer.close()
+
+
+    def test_background_load(self):
+        """大きなデータはバックグラウンドで読み込まれ、読み込み中は編集できないことを確認"""
+        self.app.tasks = [
+            {"id": str(i), "name": f"タスク{i}", "status": "未着手", "priority": "中",
+             "due_date": "", "tags": "", "today": ""}
+            for i in range(1200)
+        ]
+        self.app.save_tasks()
+
+        with patch('main.DEFAULT_DATA_FOLDER', self.test_data_folder), \
+                patch('main.BACKGROUND_LOAD_THRESHOLD', 0), patch('main.CACHED_BACKGROUND_LOAD_THRESHOLD', 0):
+            new_app = TaskApp(self.root)
+        self.assertTrue(new_app.loading)
+        with patch.object(new_app, "get_selected_task_ids") as mock_selected:
+            new_app.toggle_task_status()
+            new_app.delete_task()
+            mock_selected.assert_not_called()
+
+        new_app._loader.join()
+        new_app._poll_background_load()
+        self.assertFalse(new_app.loading)
+        self.assertEqual(len(new_app.tasks), 1200)
+        self.assertEqual(len(new_app.view_tasks), 1200)
+        new_app.writer.close()
+
+    def test_cached_load_is_synchronous(self):
+        """スナップショットのキャッシュから読めるときは、その場で読み込まれることを確認"""
+        self.app.tasks = [
+            {"id": str(i), "name": f"タスク{i}", "status": "未着手", "priority": "中",
+             "due_date": "", "tags": "タグ" if i % 2 else "", "today": ""}
+            for i in range(1200)
+        ]
+        self.app.save_tasks()
+        self.app.writer.flush()
+        self.assertTrue(self.app.storage.is_cached())
+
+        with patch('main.DEFAULT_DATA_FOLDER', self.test_data_folder), \
+                patch('main.BACKGROUND_LOAD_THRESHOLD', 0):
+            new_app = TaskApp(self.root)
+        self.assertFalse(new_app.loading)
+        self.assertEqual(len(new_app.tasks), 1200)
+        self.assertIn("タグ", new_app.tags)
+        self.assertEqual(new_app.store.tag_index.count("タグ"), 600)
+        new_app.writer.close()
+
+    def test_import_files(self):
+        """ドロップしたファイルがワーカースレッドで取り込まれ、重複は飛ばされることを確認"""
+        self.app.tasks = [{"id": "1", "name": "既存", "status": "未着手", "priority": "中",
+                           "due_date": "", "tags": "", "today": ""}]
+        self.app.save_tasks()
+        path = os.path.join(self.temp_dir, "drop.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write("name,tags\n既存,\n" + "".join(f"取り込み{i},取込\n" for i in range(1500)))
+
+        with patch.object(self.app.model, "add_task") as mock_add:
+            self.assertTrue(self.app.import_files([path]))
+            self.assertTrue(self.app.importing)
+            # 取り込み中は次のドロップを受け付けない
+            self.assertFalse(self.app.import_files([path]))
+            self.app._import_loader.join()
+            with patch('tkinter.messagebox.showinfo') as mock_info:
+                while self.app.importing:
+                    self.app._poll_import()
+            mock_add.assert_not_called()
+        self.assertIn("追加 1500 件、重複 1 件", mock_info.call_args[0][1])
+        self.assertEqual(len(self.app.tasks), 1501)
+        self.assertEqual(len(self.app.view_tasks), 1501)
+        self.assertIn("取込", self.app.tags)
+        self.app.writer.flush()
+        self.assertEqual(len(self.app.storage.load()), 1501)
+
+    def test_cancel_import(self):
+        """取り込みを中止すると、それまでに取り込んだタスクだけが残ることを確認"""
+        path = os.path.join(self.temp_dir, "drop.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("".join(f"メモ{i}\n" for i in range(1200)))
+        self.app.import_files([path])
+        self.app._import_loader.join()
+        self.app._commit_import_batch(self.app._import_loader.poll(1)[0])
+        with patch('tkinter.messagebox.showinfo'):
+            self.app.cancel_import()
+        self.assertFalse(self.app.importing)
+        self.assertEqual(len(self.app.tasks), 500)
+        self.assertEqual(len(self.app.view_tasks), 500)
+
+    def test_archive(self):
+        """古い完了タスクが起動時にアーカイブへ移り、スクロールと検索で完了タブに表示されることを確認"""
+        self.app.tasks = [
+            {"id": str(i), "name": f"古い{i}" if i % 2 else f"報告{i}", "status": "完了", "priority": "中",
+             "due_date": f"2020-0{i % 2 + 1}-01", "tags": "", "today": ""}
+            for i in range(6)
+        ] + [{"id": "new", "name": "報告new", "status": "完了", "priority": "中",
+              "due_date": "", "tags": "", "today": ""}]
+        self.app.save_tasks()
+        # アーカイブは設定で日数を決めたときだけ行い、完了を初めて見つけた日から数える
+        save_settings(self.test_data_folder, {ARCHIVE_SETTING: 90})
+        archive = TaskArchive(self.test_data_folder)
+        archive._save_ledger({str(i): f"2020-0{i % 2 + 1}-01" for i in range(6)})
+        with patch('main.DEFAULT_DATA_FOLDER', self.test_data_folder):
+            app = TaskApp(self.root)
+        app.writer.flush()
+        self.assertEqual([task["id"] for task in app.tasks], ["new"])
+        self.assertEqual(len(app.storage.load()), 1)
+        self.assertEqual(app.model.archive.months(), ["2020-02", "2020-01"])
+        app.apply_filters_and_sort(tab="完了")
+        self.assertEqual([task["id"] for task in app.view_completed_tasks], ["new"])
+
+        # 末尾までスクロールするたびに新しい月から1か月分ずつ表示する
+        self.assertTrue(app.load_next_archive_month())
+        self.assertEqual([task["id"] for task in app.view_completed_tasks], ["new", "1", "3", "5"])
+        self.assertTrue(app.load_next_archive_month())
+        self.assertFalse(app.load_next_archive_month())
+        self.assertEqual(len(app.view_completed_tasks), 7)
+
+        # 検索はアーカイブをワーカースレッドで探し、一致したタスクだけを表示する
+        app.search_entry.insert(0, "報告")
+        app.apply_filters_and_sort(tab="完了")
+        self.assertEqual([task["id"] for task in app.view_completed_tasks], ["new"])
+        loader = app._archive_search[1]
+        loader.join()
+        app._poll_archive_search(loader)
+        self.assertEqual([task["id"] for task in app.view_completed_tasks], ["new", "0", "2", "4"])
+
+        # 今日やるの切り替えとまとめて変更はアーカイブのタスクを変えず、その件数を知らせる
+        app.selection.set_checked(["2", "new"])
+        with patch('tkinter.messagebox.showinfo') as mock_info:
+            app.toggle_today_status()
+        self.assertIn("1個", mock_info.call_args[0][1])
+        self.assertEqual(app.store.get("new")["today"], "〇")
+        self.assertIsNone(app.store.get("2"))
+        app.selection.set_checked(["new"], checked=False)
+        with patch('tkinter.messagebox.showinfo') as mock_info, patch('main.BulkEditWindow') as mock_window:
+            app.bulk_edit()
+        mock_info.assert_called_once()
+        mock_window.assert_not_called()
+
+        # アーカイブのタスクを完了/未着手で切り替えると、未着手に戻ってマスターリストに戻る
+        app.selection.set_checked(["2"])
+        app.toggle_task_status()
+        self.assertEqual(app.store.get("2")["status"], "未着手")
+        app.apply_filters_and_sort(tab="完了")
+        self.assertEqual([task["id"] for task in app.view_completed_tasks], ["new", "0", "4"])
+
+        # 状態フィルターと検索欄の条件はアーカイブのタスクにも効く
+        app.search_entry.insert(tk.END, " 期限:2020-01-01")
+        app.apply_filters_and_sort(tab="完了")
+        self.assertEqual([task["id"] for task in app.view_completed_tasks], ["0", "4"])
+        app.status_filter_var.set("未着手")
+        app.apply_filters_and_sort(tab="完了")
+        self.assertEqual(app.view_completed_tasks, [])
+        app.writer.close()
+
+    def test_external_change(self):
+        """外部で変更されたファイルを検知し、差分だけを反映することを確認"""
+        self.app.tasks = [
+            {"id": str(i), "name": f"タスク{i}", "status": "未着手", "priority": "中",
+             "due_date": "", "tags": "", "today": ""}
+            for i in range(3)
+        ]
+        self.app.save_tasks()
+        self.app.apply_filters_and_sort()
+        # 自分で保存した変更は外部の変更として扱わない
+        self.assertEqual(self.app.watcher.poll(), set())
+
+        external = [dict(task) for task in self.app.tasks[1:]]
+        external[0]["name"] = "外部で変更"
+        external.append({"id": "9", "name": "外部で追加", "status": "未着手", "priority": "中",
+                         "due_date": "", "tags": "", "today": ""})
+        write_tasks_csv(self.app.data_file, external)
+        self.assertEqual(self.app.watcher.poll(), {os.path.abspath(self.app.data_file)})
+
+        kept = self.app.store.get("2")
+        added, updated, removed = self.app.apply_external_tasks(external)
+        self.assertEqual((added, updated, removed), (["9"], ["1"], ["0"]))
+        # 変わっていないタスクは同じオブジェクトのまま
+        self.assertIs(self.app.store.get("2"), kept)
+        self.assertEqual([t["name"] for t in self.app.view_tasks], ["外部で変更", "タスク2", "外部で追加"])
+
+    def test_overdue_recolor(self):
+        """日付が変わると期限切れになったタスクの行だけ色が変わることを確認"""
+        from main import COLOR_INCOMPLETE, COLOR_OVERDUE
+        today = date.today()
+        self.app.tasks = [
+            {"id": "1", "name": "期限切れ", "status": "未着手", "priority": "中",
+             "due_date": date.fromordinal(today.toordinal() - 1).isoformat(), "tags": "", "today": ""},
+            {"id": "2", "name": "今日まで", "status": "未着手", "priority": "中",
+             "due_date": today.isoformat(), "tags": "", "today": ""},
+        ]
+        self.app.apply_filters_and_sort()
+        view = self.app.task_view
+        self.assertEqual(view.rows[view.find("1")][2], (COLOR_OVERDUE,))
+        self.assertEqual(view.rows[view.find("2")][2], (COLOR_INCOMPLETE,))
+        self.assertIsNotNone(self.app._overdue_after_id)
+
+        class Tomorrow(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.combine(date.fromordinal(today.toordinal() + 1), datetime.min.time())
+
+        with patch("main.datetime", Tomorrow), \
+                patch.object(view, "set_rows") as mock_set_rows:
+            self.app._check_overdue()
+            mock_set_rows.assert_not_called()
+        self.assertEqual(view.rows[view.find("2")][2], (COLOR_OVERDUE,))
+        self.assertEqual(tuple(view.tree.item("2", "tags")), (COLOR_OVERDUE,))
 
 
 class TestTagManagement(unittest.TestCase):
@@ -493,6 +1018,7 @@ class TestTagManagement(unittest.TestCase):
     
     def tearDown(self):
         """テスト後のクリーンアップ"""
+        self.app.writer.close()  # 書き込み待ちの変更を書き終えてから削除する
         self.root.destroy()
         shutil.rmtree(self.temp_dir)
     
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon コマンドラインの単体テスト
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import taskcon_cli
+from storage import write_tasks_csv
+from task_model import open_storage
+from test_helpers import make_task
+
+
+class TestTaskconCli(unittest.TestCase):
+    """taskcon_cli のテスト"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_folder = os.path.join(self.temp_dir, "data")
+        self.import_file = os.path.join(self.temp_dir, "import.csv")
+        write_tasks_csv(self.import_file, [
+            make_task("1", "週次レポート作成", tags="仕事"),
+            make_task("2", "買い物", tags="家"),
+            make_task("3", "レポート提出", status="完了"),
+        ])
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        shutil.rmtree(self.temp_dir)
+
+    def run_cli(self, *args):
+        """コマンドを実行して (終了コード, 標準出力) を返す"""
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            code = taskcon_cli.main(["--data-folder", self.data_folder] + list(args))
+        return code, stdout.getvalue()
+
+    def saved_tasks(self):
+        return {task["id"]: task for task in open_storage(self.data_folder).load()}
+
+    def test_import_and_export(self):
+        """取り込んだタスクが保存され、絞り込んで書き出せることを確認"""
+        self.assertEqual(self.run_cli("import", self.import_file)[0], 0)
+        self.assertEqual(sorted(self.saved_tasks()), ["1", "2", "3"])
+        self.assertEqual(open_storage(self.data_folder).load_tags(), ["仕事", "家"])
+
+        # 同じIDは上書き、JSON Lines も取り込める
+        jsonl_file = os.path.join(self.temp_dir, "more.jsonl")
+        with open(jsonl_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "2", "name": "買い物（済）", "status": "完了"}, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"id": "4", "name": "新しいレポート"}, ensure_ascii=False) + "\n")
+        self.assertEqual(self.run_cli("import", jsonl_file)[0], 0)
+        self.assertEqual(self.saved_tasks()["2"]["name"], "買い物（済）")
+
+        code, output = self.run_cli("export", "--tab", "一覧", "--query", "れぽーと", "--format", "jsonl")
+        self.assertEqual(code, 0)
+        self.assertEqual([json.loads(line)["id"] for line in output.splitlines()], ["1", "4"])
+
+    def test_import_invalid_rows(self):
+        """不正な項目の行は保存せずに数えることを確認"""
+        jsonl_file = os.path.join(self.temp_dir, "invalid.jsonl")
+        with open(jsonl_file, "w", encoding="utf-8") as f:
+            for row in ({"id": "1", "name": "正しいタスク", "due_date": "2024-06-30"},
+                        {"id": "2", "name": "状態が不正", "status": "保留"},
+                        {"id": "3", "name": "期限日が不正", "due_date": "6/30"},
+                        {"id": "4", "name": "優先度が不正", "priority": "最高"}):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+            self.assertEqual(taskcon_cli.main(["--data-folder", self.data_folder, "import", jsonl_file]), 0)
+        self.assertEqual(sorted(self.saved_tasks()), ["1"])
+        self.assertIn("不正 3 件", stderr.getvalue())
+
+    def test_status_and_query(self):
+        """検索で選んだタスクの状態をまとめて変更し、検索結果を表示できることを確認"""
+        self.run_cli("import", self.import_file)
+        self.assertEqual(self.run_cli("status", "完了", "--query", "レポート")[0], 0)
+        self.assertEqual(self.saved_tasks()["1"]["status"], "完了")
+        self.assertEqual(self.run_cli("status", "toggle", "2")[0], 0)
+        self.assertEqual(self.saved_tasks()["2"]["status"], "完了")
+
+        code, output = self.run_cli("query", "レポート", "--limit", "1")
+        self.assertEqual(code, 0)
+        # 関連度順では名前の先頭で一致するタスクが上位
+        self.assertEqual([line.split("\t")[0] for line in output.splitlines()], ["3"])
+
+    def test_state_and_search_conditions(self):
+        """状態の絞り込みと検索語の「キー:値」の条件で選べることを確認"""
+        self.run_cli("import", self.import_file)
+        code, output = self.run_cli("export", "--state", "未着手", "--query", "タグ:仕事", "--format", "jsonl")
+        self.assertEqual(code, 0)
+        self.assertEqual([json.loads(line)["id"] for line in output.splitlines()], ["1"])
+        code, output = self.run_cli("query", "レポート 状態:未着手")
+        self.assertEqual([line.split("\t")[0] for line in output.splitlines()], ["1"])
+        self.assertEqual(self.run_cli("status", "完了", "--state", "未着手")[0], 0)
+        self.assertEqual({task["status"] for task in self.saved_tasks().values()}, {"完了"})
+
+    def test_error(self):
+        """対象の指定がないときはエラー終了することを確認"""
+        self.assertEqual(self.run_cli("status", "完了")[0], 1)
+
+    def test_no_gui_import(self):
+        """コマンドラインがGUIライブラリを読み込まないことを確認"""
+        code = ("import sys, taskcon_cli; "
+                "print(any(m in sys.modules for m in ('tkinter', 'tkcalendar', 'tkinterdnd2')))")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(taskcon_cli.__file__)))
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taskcon 書き込みキューの単体テスト
+"""
+
+import threading
+import time
+import unittest
+
+from write_queue import WriteBehindQueue
+
+
+class RecordingStorage:
+    """書き込みを記録するテスト用のストレージ"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.records = []
+        self.saved_tags = []
+        self.started = threading.Event()
+
+    def record(self, tasks, ops):
+        self.started.set()
+        time.sleep(self.delay)
+        if self.fail:
+            raise OSError("書き込み失敗")
+        self.records.append((tasks, ops))
+
+    def save_tags(self, tags):
+        self.saved_tags.append(tags)
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    """WriteBehindQueueのテスト"""
+
+    def test_coalesce(self):
+        """続けて積んだ変更が1回の書き込みにまとまることを確認"""
+        storage = RecordingStorage()
+        queue = WriteBehindQueue(storage, interval=10)
+        queue.submit(["a"], [("add", "1", None)])
+        queue.submit(["a", "b"], [("add", "2", None)])
+        queue.submit_tags(["x"])
+        queue.submit_tags(["x", "y"])
+        self.assertTrue(queue.pending)
+        self.assertTrue(queue.flush(timeout=5))
+
+        self.assertEqual(storage.records, [(["a", "b"], [("add", "1", None), ("add", "2", None)])])
+        self.assertEqual(storage.saved_tags, [["x", "y"]])
+        self.assertFalse(queue.pending)
+        queue.close()
+
+    def test_submit_does_not_block(self):
+        """書き込み中でも積む操作は待たないことを確認"""
+        storage = RecordingStorage(delay=0.3)
+        queue = WriteBehindQueue(storage, interval=0)
+        queue.submit([], [("add", "1", None)])
+        storage.started.wait(5)
+        start = time.monotonic()
+        queue.submit([], [("add", "2", None)])
+        self.assertLess(time.monotonic() - start, 0.1)
+        queue.close()
+        self.assertEqual([ops for _, ops in storage.records], [[("add", "1", None)], [("add", "2", None)]])
+
+    def test_errors(self):
+        """書き込みの例外が取り出せることを確認"""
+        queue = WriteBehindQueue(RecordingStorage(fail=True), interval=0)
+        queue.submit([], [("add", "1", None)])
+        queue.close()
+        errors = queue.pop_errors()
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], OSError)
+        self.assertEqual(queue.pop_errors(), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
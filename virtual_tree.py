@@ -0,0 +1,301 @@
+"""
+taskcon 仮想化Treeview
+
+大量の行を表示するとき、表示範囲と前後のバッファ分の行だけを
+Treeviewに実体化し、スクロールバーは論理的な全行数に対応させる。
+再描画は前回との差分（挿入・移動・更新・削除）だけをTreeviewに適用する。
+"""
+
+from bisect import bisect_left
+
+VIRTUAL_THRESHOLD = 1000  # この行数を超えたら仮想化する
+VIRTUAL_BUFFER_ROWS = 20  # 表示範囲の前後に実体化しておく行数
+DEFAULT_ROW_HEIGHT = 20  # 行の高さ（ピクセル）の目安
+
+
+class VirtualTreeview:
+    """
+    Treeviewの仮想リスト表示を管理するクラス
+
+    行データ（key, values, tags）はすべてこのクラスが保持し、Treeviewには
+    rows[start:end] の範囲だけを挿入する。アイテムのiidは行のキー（タスクID）。
+    行数がしきい値以下のときは全行を実体化し、通常のTreeviewと同じように動作する。
+    last_tk_calls には直近の描画で発行したTreeview/スクロールバーの操作回数が入る。
+    on_scroll_end を設定すると、末尾の行まで表示したときに呼ぶ（続きの行を読み込むため）。
+    """
+
+    def __init__(self, tree, scrollbar, threshold=VIRTUAL_THRESHOLD, buffer_rows=VIRTUAL_BUFFER_ROWS):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.threshold = threshold
+        self.buffer_rows = buffer_rows
+        self.rows = []  # 論理行 [key, values, tags] のリスト
+        self._index = {}  # key -> 論理行番号
+        self._materialized = []  # Treeviewに挿入済みの (key, values, tags)
+        self.last_tk_calls = 0
+        self.first = 0  # 表示範囲の先頭の論理行番号
+        self.start = 0  # 実体化している範囲 [start, end)
+        self.end = 0
+        self.virtual = False
+        self._selected = set()  # 実体化範囲外も含めた選択中の行のキー
+        self._rendering = False
+        self.on_scroll_end = None
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_mouse_wheel, add="+")
+
+    def __len__(self):
+        return len(self.rows)
+
+    def set_rows(self, rows):
+        """表示する行（key, values, tags）のリストを設定し、差分だけを再描画する"""
+        self.rows = []
+        self._index = {}
+        for key, values, tags in rows:
+            key = str(key)
+            if key in self._index:
+                # iidは一意でなければならないため、重複したキーには連番を付ける
+                key = f"{key}#{len(self.rows)}"
+            self._index[key] = len(self.rows)
+            self.rows.append([key, tuple(values), tuple(tags)])
+        self.virtual = len(self.rows) > self.threshold
+        self.first = max(0, min(self.first, len(self.rows) - self.visible_rows())) if self.virtual else 0
+        # 表示内容が作り直されたときは、以前の選択状態は引き継がない
+        self._selected.clear()
+        self._render(keep_selection=False)
+
+    def row_values(self, index):
+        """論理行の値を返す"""
+        return self.rows[index][1]
+
+    def set_row_values(self, index, values):
+        """論理行の値を更新する（実体化されていればTreeviewにも反映）"""
+        key = self.rows[index][0]
+        self.rows[index][1] = tuple(values)
+        if self.start <= index < self.end:
+            self.tree.item(key, values=values)
+            self._materialized[index - self.start] = tuple(self.rows[index])
+
+    def set_row_tags(self, index, tags):
+        """論理行のタグ（文字色など）を更新する（実体化されていればTreeviewにも反映）"""
+        key = self.rows[index][0]
+        tags = tuple(tags)
+        if self.rows[index][2] == tags:
+            return
+        self.rows[index][2] = tags
+        if self.start <= index < self.end:
+            self.tree.item(key, tags=tags)
+            self._materialized[index - self.start] = tuple(self.rows[index])
+
+    def index_of(self, item):
+        """Treeviewのアイテム（iid）から論理行番号を返す"""
+        return self._index[item]
+
+    def find(self, key):
+        """キーの論理行番号を返す（表示していなければNone）"""
+        return self._index.get(str(key))
+
+    def key_of(self, index):
+        """論理行のキーを返す"""
+        return self.rows[index][0]
+
+    def visible_rows(self):
+        """一度に表示できる行数"""
+        try:
+            height = int(self.tree.cget("height") or 0)
+        except (TypeError, ValueError):
+            height = 0
+        return max(1, height, self.tree.winfo_height() // DEFAULT_ROW_HEIGHT)
+
+    def _render(self, keep_selection=True):
+        """表示範囲と前後のバッファをTreeviewに実体化する"""
+        total = len(self.rows)
+        if self.virtual:
+            start = max(0, self.first - self.buffer_rows)
+            end = min(total, self.first + self.visible_rows() + self.buffer_rows)
+        else:
+            start, end = 0, total
+
+        tk_calls = 0
+        current_selection = self.tree.selection()
+        # スクロールで範囲外に出る行の選択状態を保持する
+        if keep_selection:
+            self._selected.update(current_selection)
+
+        self._rendering = True
+        try:
+            new_rows = [tuple(row) for row in self.rows[start:end]]
+            tk_calls += reconcile_tree(self.tree, self._materialized, new_rows)
+            self._materialized = new_rows
+            self.start, self.end = start, end
+
+            selected = [self.rows[index][0] for index in
+                        sorted(self._index[key] for key in self._selected if key in self._index)
+                        if start <= index < end]
+            if selected or current_selection:
+                if tuple(selected) != tuple(self.tree.selection()):
+                    self.tree.selection_set(selected)
+                    tk_calls += 1
+            if self.virtual:
+                self.tree.yview_moveto((self.first - start) / max(1, end - start))
+                tk_calls += 1
+        finally:
+            self._rendering = False
+        tk_calls += self._update_scrollbar()
+        self.last_tk_calls = tk_calls
+
+    def _update_scrollbar(self):
+        """スクロールバーを論理的な全行数に合わせる（発行した操作回数を返す）"""
+        if not self.virtual:
+            return 0
+        total = max(1, len(self.rows))
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible_rows()) / total))
+        return 1
+
+    def scroll_to(self, first):
+        """表示範囲の先頭を論理行番号で指定してスクロールする"""
+        first = max(0, min(first, len(self.rows) - self.visible_rows()))
+        if first == self.first and self.start <= first < self.end:
+            # 末尾でさらにスクロールしたときも続きの読み込みを知らせる
+            self._notify_scroll_end()
+            return
+        self.first = first
+        if first < self.start or first + self.visible_rows() > self.end:
+            self._render()
+        else:
+            self._rendering = True
+            try:
+                self.tree.yview_moveto((first - self.start) / max(1, self.end - self.start))
+            finally:
+                self._rendering = False
+            self._update_scrollbar()
+        self._notify_scroll_end()
+
+    def _notify_scroll_end(self):
+        """末尾の行まで表示していれば on_scroll_end を呼ぶ"""
+        if self.on_scroll_end is not None and self.first + self.visible_rows() >= len(self.rows):
+            self.on_scroll_end()
+
+    def yview(self, *args):
+        """スクロールバーからのスクロール要求を処理する"""
+        if not self.virtual:
+            return self.tree.yview(*args)
+        if args and args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args and args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_rows()
+            self.scroll_to(self.first + amount)
+        return None
+
+    def _on_tree_yscroll(self, first_fraction, last_fraction):
+        """Treeview内部のスクロール（キー操作など）を論理位置に反映する"""
+        if not self.virtual:
+            self.scrollbar.set(first_fraction, last_fraction)
+            if self.on_scroll_end is not None and float(last_fraction) >= 1.0:
+                self.on_scroll_end()
+            return
+        if self._rendering:
+            return
+        materialized = self.end - self.start
+        first = self.start + round(float(first_fraction) * materialized)
+        if first == self.first:
+            return
+        self.first = first
+        # 実体化範囲の端に近づいたら範囲を移動する
+        near_top = self.start > 0 and first - self.start < self.buffer_rows // 2
+        near_bottom = self.end < len(self.rows) and self.end - (first + self.visible_rows()) < self.buffer_rows // 2
+        if near_top or near_bottom:
+            self.tree.after_idle(self._render)
+        else:
+            self._update_scrollbar()
+        self._notify_scroll_end()
+
+    def _on_mouse_wheel(self, event):
+        """マウスホイールで論理位置をスクロールする"""
+        if not self.virtual:
+            return None
+        if getattr(event, "num", None) == 4:
+            amount = -3
+        elif getattr(event, "num", None) == 5:
+            amount = 3
+        else:
+            amount = -3 if event.delta > 0 else 3
+        self.scroll_to(self.first + amount)
+        return "break"
+
+
+def diff_rows(old_rows, new_rows):
+    """
+    表示中の行と新しい行の差分を計算する
+
+    行は (key, values, tags) のタプル。戻り値は
+    (削除するキー, 移動するキーの集合, 挿入するキーの集合, 値を更新するキーの集合)。
+    旧順序での位置が増加する最長部分列（LIS）に含まれる行は動かさず、それ以外を移動する。
+    """
+    new_keys = {row[0] for row in new_rows}
+    old_by_key = {row[0]: row for row in old_rows}
+    old_position = {row[0]: i for i, row in enumerate(old_rows)}
+
+    removed = [row[0] for row in old_rows if row[0] not in new_keys]
+    kept = [row[0] for row in new_rows if row[0] in old_by_key]
+    inserted = {row[0] for row in new_rows if row[0] not in old_by_key}
+    stable = _longest_increasing_keys(kept, old_position)
+    moved = {key for key in kept if key not in stable}
+    updated = {row[0] for row in new_rows if row[0] in old_by_key and old_by_key[row[0]][1:] != row[1:]}
+    return removed, moved, inserted, updated
+
+
+def _longest_increasing_keys(keys, position):
+    """旧順序での位置が増加する最長部分列のキー集合を返す（O(n log n)）"""
+    tails = []  # 長さ i+1 の部分列の末尾の位置
+    tail_keys = []
+    previous = {}
+    for key in keys:
+        pos = position[key]
+        i = bisect_left(tails, pos)
+        previous[key] = tail_keys[i - 1] if i > 0 else None
+        if i == len(tails):
+            tails.append(pos)
+            tail_keys.append(key)
+        else:
+            tails[i] = pos
+            tail_keys[i] = key
+    result = set()
+    key = tail_keys[-1] if tail_keys else None
+    while key is not None:
+        result.add(key)
+        key = previous[key]
+    return result
+
+
+def reconcile_tree(tree, old_rows, new_rows):
+    """
+    Treeviewの内容を old_rows から new_rows へ差分で更新する
+
+    発行したTreeview操作の回数を返す。移動する行は一度 detach してから
+    正しい位置へ move し直すので、動かさない行の位置は常に正しく保たれる。
+    """
+    removed, moved, inserted, updated = diff_rows(old_rows, new_rows)
+    tk_calls = 0
+    if removed:
+        tree.delete(*removed)
+        tk_calls += 1
+    if moved:
+        tree.detach(*moved)
+        tk_calls += 1
+    for index, (key, values, tags) in enumerate(new_rows):
+        if key in inserted:
+            tree.insert("", index, iid=key, values=values, tags=tags)
+            tk_calls += 1
+            continue
+        if key in moved:
+            tree.move(key, "", index)
+            tk_calls += 1
+        if key in updated:
+            tree.item(key, values=values, tags=tags)
+            tk_calls += 1
+    return tk_calls
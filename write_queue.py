@@ -0,0 +1,134 @@
+"""
+taskcon 書き込みキュー
+
+GUIスレッドから渡された変更操作とタグリストをワーカースレッドでストレージに書き込む。
+短い間に続いた変更は WRITE_INTERVAL 秒ごとに1回の書き込みにまとめる。
+"""
+
+import threading
+import time
+
+WRITE_INTERVAL = 0.5  # 変更をまとめて書き込む間隔（秒）
+
+
+class WriteBehindQueue:
+    """
+    ストレージへの書き込みを後回しにしてまとめるキュー
+
+    submit / submit_tags はロックを取ってキューに積むだけで、ファイルの入出力は行わない。
+    ワーカースレッドは最初の変更から interval 秒待ってから、その間に積まれた変更操作を
+    1回の record に、タグリストは最後のものだけを1回の save_tags にまとめて書き込む。
+    書き込みで起きた例外は pop_errors で取り出す。
+    on_written を渡すと、書き込みが終わるたびに書き換えたファイルのリストを渡して
+    ワーカースレッドから呼ぶ（ファイル監視で自分の書き込みを無視するため）。
+    """
+
+    def __init__(self, storage, interval=WRITE_INTERVAL, on_written=None):
+        self.storage = storage
+        self.interval = interval
+        self.on_written = on_written
+        self._cond = threading.Condition()
+        self._ops = []  # まだ書き込んでいない変更操作
+        self._tasks = None  # 変更操作と一緒に渡すタスクリスト（最新のもの）
+        self._tags = None  # まだ書き込んでいないタグリスト（最新のもの）
+        self._writing = False
+        self._flush_requested = False
+        self._closed = False
+        self._errors = []
+        self._thread = None
+
+    @property
+    def pending(self):
+        """まだ書き込みが終わっていない変更があるか"""
+        with self._cond:
+            return self._has_work() or self._writing
+
+    def _has_work(self):
+        return bool(self._ops) or self._tags is not None
+
+    def submit(self, tasks, ops):
+        """変更操作を積む（tasks はその時点のマスターリスト。並びだけを写して持つ）"""
+        if not ops:
+            return
+        with self._cond:
+            self._ops.extend(ops)
+            self._tasks = list(tasks)
+            self._wake()
+
+    def submit_tags(self, tags):
+        """タグリストの書き込みを積む（まだ書き込んでいないものは置き換える）"""
+        with self._cond:
+            self._tags = list(tags)
+            self._wake()
+
+    def _wake(self):
+        """ワーカーを起こす（まだなければ開始する）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def _worker(self):
+        """変更をまとめてストレージに書き込む"""
+        while True:
+            with self._cond:
+                while not self._has_work() and not self._closed:
+                    self._cond.wait()
+                if not self._has_work():
+                    return
+                # 続けて届く変更を待ってまとめる（flush・close のときは待たない）
+                deadline = time.monotonic() + self.interval
+                while not self._flush_requested and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                ops, tasks, tags = self._ops, self._tasks, self._tags
+                self._ops, self._tasks, self._tags = [], None, None
+                self._writing = True
+            try:
+                if ops:
+                    self.storage.record(tasks, ops)
+                    self._notify_written("record_paths")
+                if tags is not None:
+                    self.storage.save_tags(tags)
+                    self._notify_written("tags_paths")
+            except Exception as e:
+                with self._cond:
+                    self._errors.append(e)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    if not self._has_work():
+                        self._flush_requested = False
+                    self._cond.notify_all()
+
+    def _notify_written(self, paths_method):
+        """書き換えたファイル（ストレージの paths_method の結果）を on_written に知らせる"""
+        if self.on_written is not None:
+            self.on_written(getattr(self.storage, paths_method)())
+
+    def flush(self, timeout=None):
+        """積まれている変更をすぐに書き込み、終わるまで待つ（書き込みが終われば True）"""
+        with self._cond:
+            if not self._has_work() and not self._writing:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._has_work() and not self._writing, timeout)
+
+    def close(self):
+        """残りの変更を書き込んでワーカーを止める"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def pop_errors(self):
+        """書き込みで起きた例外を取り出す"""
+        with self._cond:
+            errors, self._errors = self._errors, []
+        return errors